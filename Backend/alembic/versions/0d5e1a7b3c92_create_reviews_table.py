@@ -0,0 +1,61 @@
+"""create reviews table
+
+Revision ID: 0d5e1a7b3c92
+Revises: e4b7d2a91c55
+Create Date: 2026-10-20 09:41:18.602731
+
+The reviews table came from the restored database dump and was never
+created by a migration, so a database built only with alembic had no
+reviews and the review stats trigger was skipped. This creates it with
+the dump's definition when it is missing, plus the keyset index that
+a7f2c9d41b38 could not create on such a database.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d5e1a7b3c92'
+down_revision: Union[str, None] = 'e4b7d2a91c55'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Mismo esquema que el dump: en las bases restauradas ya existe
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS reviews (
+            id                 uuid DEFAULT gen_random_uuid() PRIMARY KEY,
+            room_id            uuid NOT NULL REFERENCES rooms(id) ON DELETE CASCADE,
+            guest_id           uuid REFERENCES guests(id) ON DELETE SET NULL,
+            rating_overall     numeric(2,1) NOT NULL,
+            rating_cleanliness integer,
+            rating_comfort     integer,
+            rating_location    integer,
+            rating_staff       integer,
+            rating_value       integer,
+            comment_title      varchar(200),
+            comment_text       text,
+            traveler_type      varchar(50),
+            would_recommend    boolean,
+            stay_date          date,
+            verified           boolean DEFAULT false,
+            created_at         timestamp without time zone DEFAULT now()
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS idx_reviews_room_id ON reviews (room_id)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_reviews_guest_id ON reviews (guest_id)")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_reviews_room_verified_created_id
+            ON reviews (room_id, created_at DESC, id DESC)
+            WHERE verified = true
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # No se borra: en las bases restauradas la tabla y sus reviews son anteriores
+    pass
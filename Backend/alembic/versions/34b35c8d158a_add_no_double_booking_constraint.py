@@ -0,0 +1,61 @@
+"""add no double booking constraint
+
+Revision ID: 34b35c8d158a
+Revises: 42705543c998
+Create Date: 2026-10-18 11:47:03.220915
+
+Adds reservations.stay (daterange) and a GiST exclusion constraint so two
+active reservations of the same unit cannot overlap. Reservations of room
+types without room_units share the '' unit, so the whole room is exclusive.
+
+If legacy data already contains overlapping active stays for the same unit
+the constraint cannot be created; cancel or reassign those rows first.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '34b35c8d158a'
+down_revision: Union[str, None] = '42705543c998'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Necesaria para combinar igualdad de uuid/varchar con && en un índice GiST
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    op.execute("""
+        ALTER TABLE reservations
+        ADD COLUMN stay daterange
+        GENERATED ALWAYS AS (daterange(check_in_date, check_out_date, '[)')) STORED
+    """)
+
+    # Las habitaciones sin unidades no tienen número de unidad real
+    op.execute("""
+        UPDATE reservations r
+        SET room_number = NULL
+        WHERE r.room_number IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM room_units u WHERE u.room_id = r.room_id)
+    """)
+
+    op.execute("""
+        ALTER TABLE reservations
+        ADD CONSTRAINT reservations_no_double_booking
+        EXCLUDE USING gist (
+            room_id WITH =,
+            coalesce(room_number, '') WITH =,
+            stay WITH &&
+        )
+        WHERE (status NOT IN ('cancelled', 'checked_out'))
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE reservations DROP CONSTRAINT reservations_no_double_booking")
+    op.drop_column('reservations', 'stay')
@@ -0,0 +1,52 @@
+"""add room_number to reservations
+
+Revision ID: 42705543c998
+Revises: b6c7e0b97bd8
+Create Date: 2026-10-18 09:12:40.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '42705543c998'
+down_revision: Union[str, None] = 'b6c7e0b97bd8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reservations', sa.Column('room_number', sa.String(length=20), nullable=True))
+
+    # Backfill: mover la etiqueta "room_number::101" de la primera línea de
+    # special_requests a la nueva columna y dejar solo las notas del huésped.
+    op.execute(r"""
+        UPDATE reservations
+        SET room_number      = NULLIF(btrim(substring(btrim(special_requests) FROM '^[^:]*::([^\r\n]*)')), ''),
+            special_requests = btrim(regexp_replace(btrim(special_requests), '^[^\n]*\n?', ''))
+        WHERE lower(btrim(special_requests)) LIKE 'room\_number::%'
+    """)
+
+    op.create_index(
+        'ix_reservations_room_unit_dates',
+        'reservations',
+        ['room_id', 'room_number', 'check_in_date', 'check_out_date'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(r"""
+        UPDATE reservations
+        SET special_requests = CASE
+                WHEN coalesce(btrim(special_requests), '') = '' THEN 'room_number::' || room_number
+                ELSE 'room_number::' || room_number || E'\n' || special_requests
+            END
+        WHERE room_number IS NOT NULL
+    """)
+    op.drop_index('ix_reservations_room_unit_dates', table_name='reservations')
+    op.drop_column('reservations', 'room_number')
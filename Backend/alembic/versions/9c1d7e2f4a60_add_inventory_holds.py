@@ -0,0 +1,61 @@
+"""add inventory holds
+
+Revision ID: 9c1d7e2f4a60
+Revises: 34b35c8d158a
+Create Date: 2026-10-18 17:05:21.734118
+
+Short-lived unit holds (POST /holds) shared by every API worker. Two
+unexpired holds of the same unit cannot overlap; expired rows are deleted
+before a new hold is inserted.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1d7e2f4a60'
+down_revision: Union[str, None] = '34b35c8d158a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'inventory_holds',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('token', sa.String(length=64), nullable=False, unique=True),
+        sa.Column('room_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('room_number', sa.String(length=20), nullable=True),
+        sa.Column('check_in_date', sa.Date(), nullable=False),
+        sa.Column('check_out_date', sa.Date(), nullable=False),
+        sa.Column(
+            'stay',
+            postgresql.DATERANGE(),
+            sa.Computed("daterange(check_in_date, check_out_date, '[)')", persisted=True),
+        ),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.CheckConstraint('check_out_date > check_in_date', name='check_hold_dates'),
+    )
+    op.create_index('ix_inventory_holds_room_expires', 'inventory_holds', ['room_id', 'expires_at'])
+
+    # btree_gist ya la crea 34b35c8d158a
+    op.execute("""
+        ALTER TABLE inventory_holds
+        ADD CONSTRAINT inventory_holds_no_overlap
+        EXCLUDE USING gist (
+            room_id WITH =,
+            coalesce(room_number, '') WITH =,
+            stay WITH &&
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inventory_holds_room_expires', table_name='inventory_holds')
+    op.drop_table('inventory_holds')
@@ -0,0 +1,47 @@
+"""add keyset pagination indexes
+
+Revision ID: a7f2c9d41b38
+Revises: d3a8b61f0c27
+Create Date: 2026-10-18 20:41:36.118204
+
+Indexes matching the (sort key, id) order used by cursor pagination on
+/guests, /users, /reservations and /rooms/{id}/reviews.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7f2c9d41b38'
+down_revision: Union[str, None] = 'd3a8b61f0c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_guests_created_at_id', 'guests', ['created_at', 'id'])
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'])
+    op.create_index('ix_reservations_check_in_id', 'reservations', ['check_in_date', 'id'])
+
+    # reviews no se crea desde las migraciones; solo si existe
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regclass('public.reviews') IS NOT NULL THEN
+                CREATE INDEX IF NOT EXISTS ix_reviews_room_verified_created_id
+                    ON reviews (room_id, created_at DESC, id DESC)
+                    WHERE verified = true;
+            END IF;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_reviews_room_verified_created_id")
+    op.drop_index('ix_reservations_check_in_id', table_name='reservations')
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_guests_created_at_id', table_name='guests')
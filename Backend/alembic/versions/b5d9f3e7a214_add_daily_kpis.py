@@ -0,0 +1,152 @@
+"""add daily kpis
+
+Revision ID: b5d9f3e7a214
+Revises: f1c8e5a3b742
+Create Date: 2026-10-18 22:48:12.907355
+
+Date x room type rollup of room-nights sold, per-night revenue and
+arrivals. A trigger on reservations applies every change as a delta;
+daily_kpis_rebuild(start, end) recomputes a range (or everything) from
+scratch and is what scripts/rebuild_daily_kpis.py calls.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d9f3e7a214'
+down_revision: Union[str, None] = 'f1c8e5a3b742'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'daily_kpis',
+        sa.Column('date', sa.Date(), primary_key=True),
+        sa.Column('room_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('rooms.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('rooms_sold', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'),
+        sa.Column('arrivals', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+    # Noche i de una reserva: total_amount / noches en céntimos; el resto
+    # de la división va a las primeras noches para que la suma cuadre
+    op.execute("""
+        CREATE OR REPLACE FUNCTION daily_kpis_apply(r reservations, s integer) RETURNS void
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            nights integer := r.check_out_date - r.check_in_date;
+            cents  bigint  := round(r.total_amount * 100);
+        BEGIN
+            IF r.status = 'cancelled' OR nights <= 0 THEN
+                RETURN;
+            END IF;
+
+            INSERT INTO daily_kpis AS k (date, room_id, rooms_sold, revenue, arrivals, updated_at)
+            SELECT r.check_in_date + i,
+                   r.room_id,
+                   s,
+                   s * (cents / nights + CASE WHEN i < cents % nights THEN 1 ELSE 0 END) / 100.0,
+                   s * (i = 0)::integer,
+                   now()
+            FROM generate_series(0, nights - 1) AS i
+            ON CONFLICT (date, room_id) DO UPDATE SET
+                rooms_sold = k.rooms_sold + EXCLUDED.rooms_sold,
+                revenue    = k.revenue + EXCLUDED.revenue,
+                arrivals   = k.arrivals + EXCLUDED.arrivals,
+                updated_at = now();
+        END
+        $$
+    """)
+
+    # Solo importan los cambios que mueven noches o ingreso: un check-in o
+    # check-out (status sin pasar por 'cancelled') no toca el rollup
+    op.execute("""
+        CREATE OR REPLACE FUNCTION reservations_daily_kpis_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND (OLD.status = 'cancelled') = (NEW.status = 'cancelled')
+               AND OLD.room_id = NEW.room_id
+               AND OLD.check_in_date = NEW.check_in_date
+               AND OLD.check_out_date = NEW.check_out_date
+               AND OLD.total_amount = NEW.total_amount THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM daily_kpis_apply(OLD, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM daily_kpis_apply(NEW, 1);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_reservations_daily_kpis
+        AFTER INSERT OR DELETE OR UPDATE OF
+            status, room_id, check_in_date, check_out_date, total_amount
+        ON reservations
+        FOR EACH ROW EXECUTE FUNCTION reservations_daily_kpis_trigger()
+    """)
+
+    # Reconstrucción de [p_start, p_end) o de todo con NULL. Bloquea las
+    # escrituras en reservations mientras tanto para no perder deltas del
+    # trigger a medio recalcular.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION daily_kpis_rebuild(p_start date DEFAULT NULL, p_end date DEFAULT NULL)
+        RETURNS integer
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            written integer;
+        BEGIN
+            LOCK TABLE reservations IN SHARE MODE;
+
+            DELETE FROM daily_kpis
+            WHERE (p_start IS NULL OR date >= p_start)
+              AND (p_end IS NULL OR date < p_end);
+
+            INSERT INTO daily_kpis (date, room_id, rooms_sold, revenue, arrivals, updated_at)
+            SELECT n.night, n.room_id, COUNT(*), SUM(n.amount), COUNT(*) FILTER (WHERE n.i = 0), now()
+            FROM (
+                SELECT r.room_id,
+                       r.check_in_date + i AS night,
+                       i,
+                       (c.cents / c.nights + CASE WHEN i < c.cents % c.nights THEN 1 ELSE 0 END) / 100.0 AS amount
+                FROM reservations r
+                CROSS JOIN LATERAL (
+                    SELECT round(r.total_amount * 100)::bigint AS cents,
+                           r.check_out_date - r.check_in_date AS nights
+                ) c
+                CROSS JOIN LATERAL generate_series(0, c.nights - 1) AS i
+                WHERE r.status <> 'cancelled'
+                  AND (p_end IS NULL OR r.check_in_date < p_end)
+                  AND (p_start IS NULL OR r.check_out_date > p_start)
+            ) n
+            WHERE (p_start IS NULL OR n.night >= p_start)
+              AND (p_end IS NULL OR n.night < p_end)
+            GROUP BY n.night, n.room_id;
+
+            GET DIAGNOSTICS written = ROW_COUNT;
+            RETURN written;
+        END
+        $$
+    """)
+
+    op.execute("SELECT daily_kpis_rebuild()")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trg_reservations_daily_kpis ON reservations")
+    op.execute("DROP FUNCTION IF EXISTS reservations_daily_kpis_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS daily_kpis_rebuild(date, date)")
+    op.execute("DROP FUNCTION IF EXISTS daily_kpis_apply(reservations, integer)")
+    op.drop_table('daily_kpis')
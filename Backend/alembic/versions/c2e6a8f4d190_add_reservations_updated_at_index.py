@@ -0,0 +1,30 @@
+"""add reservations updated_at index
+
+Revision ID: c2e6a8f4d190
+Revises: b5d9f3e7a214
+Create Date: 2026-10-18 23:31:40.552087
+
+Lets the /dashboard/pace snapshot fetch only reservations changed since
+its last refresh.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e6a8f4d190'
+down_revision: Union[str, None] = 'b5d9f3e7a214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_reservations_updated_at', 'reservations', ['updated_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reservations_updated_at', table_name='reservations')
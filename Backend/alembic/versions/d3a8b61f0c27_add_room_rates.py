@@ -0,0 +1,38 @@
+"""add room rates
+
+Revision ID: d3a8b61f0c27
+Revises: 9c1d7e2f4a60
+Create Date: 2026-10-18 18:22:09.405117
+
+Nightly rate calendar (room_id x date -> rate). Nights without a row are
+priced at rooms.price_per_night.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8b61f0c27'
+down_revision: Union[str, None] = '9c1d7e2f4a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'room_rates',
+        sa.Column('room_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('rooms.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('date', sa.Date(), primary_key=True),
+        sa.Column('rate', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.CheckConstraint('rate >= 0', name='check_rate_positive'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('room_rates')
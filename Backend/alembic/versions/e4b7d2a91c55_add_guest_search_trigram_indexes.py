@@ -0,0 +1,63 @@
+"""add guest search trigram indexes
+
+Revision ID: e4b7d2a91c55
+Revises: a7f2c9d41b38
+Create Date: 2026-10-18 21:27:05.630114
+
+GIN (pg_trgm) indexes so substring/fuzzy search on /guests, /users and
+/guests/typeahead stops scanning the whole table. The expressions must
+match the ones in utils/search.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7d2a91c55'
+down_revision: Union[str, None] = 'a7f2c9d41b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Trigramas: ILIKE '%x%', similarity() y <% pueden usar un índice GIN
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # ILIKE por columna de la búsqueda simple (se combinan con BitmapOr)
+    op.execute("CREATE INDEX ix_guests_first_name_trgm ON guests USING gin (first_name gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_guests_last_name_trgm ON guests USING gin (last_name gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_guests_email_trgm ON guests USING gin (email gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_users_name_trgm ON users USING gin (name gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_users_email_trgm ON users USING gin (email gin_trgm_ops)")
+
+    # Búsqueda por relevancia y typeahead
+    op.execute("""
+        CREATE INDEX ix_guests_full_name_trgm ON guests
+        USING gin ((first_name || ' ' || last_name) gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX ix_guests_phone_digits_trgm ON guests
+        USING gin ((regexp_replace(phone, '[^0-9]', '', 'g')) gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX ix_guests_document_upper ON guests
+        (upper(document_number) text_pattern_ops)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in (
+        'ix_guests_document_upper',
+        'ix_guests_phone_digits_trgm',
+        'ix_guests_full_name_trgm',
+        'ix_users_email_trgm',
+        'ix_users_name_trgm',
+        'ix_guests_email_trgm',
+        'ix_guests_last_name_trgm',
+        'ix_guests_first_name_trgm',
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
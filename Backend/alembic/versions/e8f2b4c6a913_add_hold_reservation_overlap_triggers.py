@@ -0,0 +1,106 @@
+"""add hold reservation overlap triggers
+
+Revision ID: e8f2b4c6a913
+Revises: c2e6a8f4d190
+Create Date: 2026-10-19 10:12:37.418205
+
+Holds and reservations each have their own exclusion constraint, but no
+constraint can span both tables. These triggers reject, with the same
+exclusion_violation (23P01) the constraints raise, a reservation that
+overlaps an unexpired hold of the same unit and a hold that overlaps an
+active reservation. Both take a transaction-level advisory lock per unit
+before checking, so two workers cannot slip a hold and a reservation in
+at the same time.
+
+A reservation that consumes a hold must delete it before inserting the
+reservation in the same transaction.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8f2b4c6a913'
+down_revision: Union[str, None] = 'c2e6a8f4d190'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las habitaciones sin unidades usan la unidad '' (como reservations_no_double_booking)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION lock_room_unit(p_room_id uuid, p_room_number text) RETURNS void
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtextextended(p_room_id::text || ':' || coalesce(p_room_number, ''), 0));
+        END
+        $$
+    """)
+
+    # expires_at se guarda en hora local sin zona (datetime.now()): LOCALTIMESTAMP
+    op.execute("""
+        CREATE OR REPLACE FUNCTION reservations_hold_overlap_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF NEW.status::text IN ('cancelled', 'checked_out') THEN
+                RETURN NEW;
+            END IF;
+            PERFORM lock_room_unit(NEW.room_id, NEW.room_number);
+            IF EXISTS (
+                SELECT 1 FROM inventory_holds h
+                WHERE h.room_id = NEW.room_id
+                  AND coalesce(h.room_number, '') = coalesce(NEW.room_number, '')
+                  AND h.expires_at > LOCALTIMESTAMP
+                  AND h.stay && daterange(NEW.check_in_date, NEW.check_out_date, '[)')
+            ) THEN
+                RAISE EXCEPTION 'reservation overlaps an active hold on unit %', coalesce(NEW.room_number, '')
+                    USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'reservations_no_hold_overlap';
+            END IF;
+            RETURN NEW;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_reservations_hold_overlap
+        BEFORE INSERT OR UPDATE OF room_id, room_number, check_in_date, check_out_date, status
+        ON reservations
+        FOR EACH ROW EXECUTE FUNCTION reservations_hold_overlap_trigger()
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION inventory_holds_reservation_overlap_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM lock_room_unit(NEW.room_id, NEW.room_number);
+            IF EXISTS (
+                SELECT 1 FROM reservations r
+                WHERE r.room_id = NEW.room_id
+                  AND coalesce(r.room_number, '') = coalesce(NEW.room_number, '')
+                  AND r.status NOT IN ('cancelled', 'checked_out')
+                  AND r.stay && daterange(NEW.check_in_date, NEW.check_out_date, '[)')
+            ) THEN
+                RAISE EXCEPTION 'hold overlaps an active reservation on unit %', coalesce(NEW.room_number, '')
+                    USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'inventory_holds_no_reservation_overlap';
+            END IF;
+            RETURN NEW;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_inventory_holds_reservation_overlap
+        BEFORE INSERT OR UPDATE OF room_id, room_number, check_in_date, check_out_date
+        ON inventory_holds
+        FOR EACH ROW EXECUTE FUNCTION inventory_holds_reservation_overlap_trigger()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trg_inventory_holds_reservation_overlap ON inventory_holds")
+    op.execute("DROP FUNCTION IF EXISTS inventory_holds_reservation_overlap_trigger()")
+    op.execute("DROP TRIGGER IF EXISTS trg_reservations_hold_overlap ON reservations")
+    op.execute("DROP FUNCTION IF EXISTS reservations_hold_overlap_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS lock_room_unit(uuid, text)")
@@ -0,0 +1,146 @@
+"""add room review stats
+
+Revision ID: f1c8e5a3b742
+Revises: 0d5e1a7b3c92
+Create Date: 2026-10-18 22:03:51.274416
+
+Per-room aggregate of verified reviews, kept up to date by a trigger on
+reviews that applies each change as a delta and refreshes rooms.rating /
+rooms.total_reviews.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c8e5a3b742'
+down_revision: Union[str, None] = '0d5e1a7b3c92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CATEGORIES = ('cleanliness', 'comfort', 'location', 'staff', 'value')
+STARS      = (1, 2, 3, 4, 5)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'room_review_stats',
+        sa.Column('room_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('rooms.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('review_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sum_overall', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'),
+        *[
+            column
+            for category in CATEGORIES
+            for column in (
+                sa.Column(f'sum_{category}', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'),
+                sa.Column(f'count_{category}', sa.Integer(), nullable=False, server_default='0'),
+            )
+        ],
+        sa.Column('recommend_yes', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('recommend_answered', sa.Integer(), nullable=False, server_default='0'),
+        *[sa.Column(f'stars_{n}', sa.Integer(), nullable=False, server_default='0') for n in STARS],
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+    columns = ', '.join(
+        ['room_id', 'review_count', 'sum_overall']
+        + [f'sum_{c}, count_{c}' for c in CATEGORIES]
+        + ['recommend_yes', 'recommend_answered']
+        + [f'stars_{n}' for n in STARS]
+        + ['updated_at']
+    )
+
+    # Delta de una review (s = 1 al entrar en el agregado, -1 al salir)
+    deltas = ',\n                '.join(
+        ['r.room_id', 's', 's * r.rating_overall']
+        + [f's * coalesce(r.rating_{c}, 0), s * (r.rating_{c} IS NOT NULL)::integer' for c in CATEGORIES]
+        + ['s * (r.would_recommend IS TRUE)::integer', 's * (r.would_recommend IS NOT NULL)::integer']
+        + [f's * (star = {n})::integer' for n in STARS]
+        + ['now()']
+    )
+    increments = ',\n                '.join(
+        [f'{name} = st.{name} + EXCLUDED.{name}' for name in columns.split(', ')[1:-1]]
+        + ['updated_at = now()']
+    )
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION room_review_stats_apply(r reviews, s integer) RETURNS void
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            star integer := greatest(1, least(5, round(r.rating_overall)::integer));
+        BEGIN
+            INSERT INTO room_review_stats AS st ({columns})
+            VALUES (
+                {deltas}
+            )
+            ON CONFLICT (room_id) DO UPDATE SET
+                {increments};
+
+            UPDATE rooms
+            SET rating        = CASE WHEN st.review_count > 0
+                                     THEN round(st.sum_overall / st.review_count, 1)
+                                     ELSE 0 END,
+                total_reviews = st.review_count
+            FROM room_review_stats st
+            WHERE st.room_id = r.room_id AND rooms.id = r.room_id;
+        END
+        $$
+    """)
+
+    # Una review cuenta mientras está verificada; una edición resta la
+    # versión vieja y suma la nueva (también si cambia de habitación)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION reviews_stats_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.verified THEN
+                PERFORM room_review_stats_apply(OLD, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.verified THEN
+                PERFORM room_review_stats_apply(NEW, 1);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute(f"""
+        CREATE TRIGGER trg_reviews_stats
+        AFTER INSERT OR DELETE OR UPDATE OF
+            verified, room_id, rating_overall, {', '.join(f'rating_{c}' for c in CATEGORIES)}, would_recommend
+        ON reviews
+        FOR EACH ROW EXECUTE FUNCTION reviews_stats_trigger()
+    """)
+
+    # Carga inicial con las reviews ya verificadas
+    aggregates = ',\n               '.join(
+        ['room_id', 'count(*)', 'coalesce(sum(rating_overall), 0)']
+        + [f'coalesce(sum(rating_{c}), 0), count(rating_{c})' for c in CATEGORIES]
+        + ['count(*) FILTER (WHERE would_recommend)', 'count(would_recommend)']
+        + [f'count(*) FILTER (WHERE greatest(1, least(5, round(rating_overall)::integer)) = {n})' for n in STARS]
+        + ['now()']
+    )
+    op.execute(f"""
+        INSERT INTO room_review_stats ({columns})
+        SELECT {aggregates}
+        FROM reviews
+        WHERE verified
+        GROUP BY room_id
+    """)
+    op.execute("""
+        UPDATE rooms
+        SET rating        = round(st.sum_overall / st.review_count, 1),
+            total_reviews = st.review_count
+        FROM room_review_stats st
+        WHERE st.room_id = rooms.id AND st.review_count > 0
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trg_reviews_stats ON reviews")
+    op.execute("DROP FUNCTION IF EXISTS reviews_stats_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS room_review_stats_apply(reviews, integer)")
+    op.drop_table('room_review_stats')
@@ -0,0 +1,34 @@
+"""add hold client ip
+
+Revision ID: f3a9c1d7b5e2
+Revises: e8f2b4c6a913
+Create Date: 2026-10-20 11:26:04.915372
+
+POST /holds is public, so each hold records the client address that
+created it. The route caps active holds per client and per client and
+room type (HOLD_MAX_PER_CLIENT / HOLD_MAX_PER_CLIENT_ROOM) by counting
+these rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c1d7b5e2'
+down_revision: Union[str, None] = 'e8f2b4c6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('inventory_holds', sa.Column('client_ip', sa.String(length=45), nullable=True))
+    op.create_index('ix_inventory_holds_client_expires', 'inventory_holds', ['client_ip', 'expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inventory_holds_client_expires', table_name='inventory_holds')
+    op.drop_column('inventory_holds', 'client_ip')
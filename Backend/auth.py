@@ -1,26 +1,22 @@
-import bcrypt
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from config import settings
+from utils.passwords import bcrypt_hash, bcrypt_verify
+from utils.token_cache import token_cache
 
 security = HTTPBearer()
 
 
 def hash_password(password: str) -> str:
-    """Hash password usando bcrypt"""
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
+    """Hash password usando bcrypt (bloqueante; las rutas usan utils.passwords.password_hasher)"""
+    return bcrypt_hash(password, settings.BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verificar password contra el hash"""
-    password_bytes = plain_password.encode('utf-8')
-    hashed_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
+    """Verificar password contra el hash (bloqueante)"""
+    return bcrypt_verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -30,39 +26,43 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # 'iat' permite revocar los tokens emitidos antes de cierto momento
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verificar y decodificar el JWT token"""
+    """Verificar y decodificar el JWT token (los ya verificados salen de utils/token_cache.py)"""
     token = credentials.credentials
-    
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        email: str = payload.get("email")
-        role: str = payload.get("role")
-        name: str = payload.get("name")
-        
-        if user_id is None:
+
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido o expirado"
+            )
+        if payload.get("sub") is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido"
             )
-        
-        return {
-            "id": user_id,
-            "email": email,
-            "role": role,
-            "name": name
-        }
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido o expirado"
-        )
+        if token_cache.is_revoked(payload):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revocado"
+            )
+        token_cache.put(token, payload)
+
+    return {
+        "id": payload.get("sub"),
+        "email": payload.get("email"),
+        "role": payload.get("role"),
+        "name": payload.get("name")
+    }
 
 
 def require_admin(current_user: dict = Depends(get_current_user)):
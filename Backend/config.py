@@ -17,6 +17,88 @@ class Settings:
         self.ACCESS_TOKEN_EXPIRE_MINUTES = int(
             os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
         )
+        # JWT ya verificados que get_current_user guarda en memoria (0 = sin caché)
+        self.TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "4096"))
+        # Coste de bcrypt para hashes nuevos; los que tengan otro se
+        # re-hashean en el siguiente login correcto
+        self.BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+        # Procesos por worker para bcrypt (0 = en el propio proceso) y
+        # operaciones en cola antes de responder 503
+        self.PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+        self.PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+        # Pool de conexiones, por engine: el síncrono y el async (asyncpg) de
+        # cada worker tienen el suyo, así que cada uno puede abrir hasta
+        # DB_POOL_SIZE + DB_MAX_OVERFLOW conexiones
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        # Segundos esperando una conexión libre antes de fallar
+        self.DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+        # Segundos tras los que se reabre una conexión (-1 = nunca)
+        self.DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+        # SELECT 1 en cada checkout para descartar conexiones caídas; con
+        # DB_POOL_RECYCLE por debajo del idle timeout del servidor se puede
+        # desactivar y ahorrar ese viaje
+        self.DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+        # statement_timeout de PostgreSQL para cada conexión (0 = sin límite)
+        self.DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+        # Segundos que el índice de disponibilidad en memoria confía en su copia
+        # de una habitación antes de recargarla (cambios hechos por otros workers)
+        self.AVAILABILITY_INDEX_TTL_SECONDS = int(
+            os.getenv("AVAILABILITY_INDEX_TTL_SECONDS", "60")
+        )
+        # Días (desde hoy) que cubren los bitmaps de ocupación del calendario
+        self.AVAILABILITY_HORIZON_DAYS = int(
+            os.getenv("AVAILABILITY_HORIZON_DAYS", "365")
+        )
+        # Cómo se elige unidad al auto-asignar (utils/assignment.py):
+        # "best_fit" (menos huecos entre estancias) o "first_available"
+        self.ASSIGNMENT_STRATEGY = os.getenv("ASSIGNMENT_STRATEGY", "best_fit")
+        # Cómo calcula paginate() el total: "auto", "exact", "cached" o "estimate"
+        # (ver utils/pagination.py)
+        self.PAGINATION_COUNT_STRATEGY = os.getenv("PAGINATION_COUNT_STRATEGY", "auto")
+        self.PAGINATION_COUNT_CACHE_TTL_SECONDS = int(
+            os.getenv("PAGINATION_COUNT_CACHE_TTL_SECONDS", "30")
+        )
+        # Por debajo de estas filas (según el planner) se cuenta siempre exacto
+        self.PAGINATION_EXACT_COUNT_THRESHOLD = int(
+            os.getenv("PAGINATION_EXACT_COUNT_THRESHOLD", "10000")
+        )
+        # Segundos que GET /rooms sirve el catálogo cacheado sin consultar la BD
+        # (las ediciones de este worker lo invalidan al momento)
+        self.ROOM_CATALOG_TTL_SECONDS = int(
+            os.getenv("ROOM_CATALOG_TTL_SECONDS", "30")
+        )
+        # Segundos que se reutilizan los KPIs de /dashboard entre peticiones
+        # (0 = sin caché; las peticiones simultáneas siguen compartiendo un
+        # único cálculo)
+        self.DASHBOARD_CACHE_TTL_SECONDS = int(
+            os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "10")
+        )
+        # Snapshot en memoria de reservas para /dashboard/pace: cada cuánto se
+        # piden los cambios (updated_at) y cada cuánto se recarga entero
+        self.PACE_SNAPSHOT_REFRESH_SECONDS = int(
+            os.getenv("PACE_SNAPSHOT_REFRESH_SECONDS", "60")
+        )
+        self.PACE_SNAPSHOT_FULL_RELOAD_SECONDS = int(
+            os.getenv("PACE_SNAPSHOT_FULL_RELOAD_SECONDS", "3600")
+        )
+        # Duración de un hold (POST /holds) antes de liberar la unidad
+        self.HOLD_TTL_SECONDS = int(
+            os.getenv("HOLD_TTL_SECONDS", "600")
+        )
+        # Cada cuánto se recargan desde la BD los holds creados por otros workers
+        self.HOLD_SYNC_SECONDS = int(
+            os.getenv("HOLD_SYNC_SECONDS", "5")
+        )
+        # Holds vigentes por IP en total y por tipo de habitación (429 al pasarse)
+        self.HOLD_MAX_PER_CLIENT = int(
+            os.getenv("HOLD_MAX_PER_CLIENT", "5")
+        )
+        self.HOLD_MAX_PER_CLIENT_ROOM = int(
+            os.getenv("HOLD_MAX_PER_CLIENT_ROOM", "2")
+        )
 
         if not self.SECRET_KEY:
             raise ValueError("SECRET_KEY no está definida en el .env")
@@ -30,4 +112,8 @@ class Settings:
             f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}"
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
+
+    @property
+    def ASYNC_DATABASE_URL(self):
+        return self.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 settings = Settings()
\ No newline at end of file
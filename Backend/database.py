@@ -1,12 +1,31 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
+from utils.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, PoolMetrics
+
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+STATEMENT_TIMEOUT = str(settings.DB_STATEMENT_TIMEOUT_MS)
 
 # Safe Engine
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,  
+    poolclass=InstrumentedQueuePool,
+    pool_logging_name="db",
+    connect_args=(
+        {"options": f"-c statement_timeout={STATEMENT_TIMEOUT}"}
+        if settings.DB_STATEMENT_TIMEOUT_MS else {}
+    ),
+    **POOL_OPTIONS,
 )
+pool_metrics = PoolMetrics("db")
+pool_metrics.attach(engine)
 
 # Sessions
 SessionLocal = sessionmaker(
@@ -15,6 +34,27 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async engine (asyncpg) para las rutas async def: no ocupan un hilo del
+# threadpool mientras esperan a la BD
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_logging_name="db_async",
+    connect_args=(
+        {"server_settings": {"statement_timeout": STATEMENT_TIMEOUT}}
+        if settings.DB_STATEMENT_TIMEOUT_MS else {}
+    ),
+    **POOL_OPTIONS,
+)
+async_pool_metrics = PoolMetrics("db_async")
+async_pool_metrics.attach(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Base for models
 Base = declarative_base()
 
@@ -26,3 +66,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency for async routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,20 +1,27 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import date as date_type
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
-from uuid import UUID
-from pydantic import BaseModel, EmailStr
-from sqlalchemy import text
+from uuid import UUID, uuid4
+from pydantic import BaseModel, EmailStr, Field
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.exc import IntegrityError
 
-from database import SessionLocal
+from database import (
+    SessionLocal, get_async_db, engine, async_engine, pool_metrics, async_pool_metrics,
+)
 from models.user import User
 from models.guest import Guest
 from models.room import Room, RoomUnit
 from models.reservation import Reservation, ReservationStatus
-from routers import rooms
+from models.hold import InventoryHold
+from models.review_stats import RoomReviewStats, REVIEW_CATEGORIES
+from routers import rooms, exports
 
 from schemas import (
     UserCreate, UserResponse, Token, LoginRequest,
@@ -23,23 +30,49 @@ from schemas import (
     ReservationResponse, PaginatedReservationResponse
 )
 
-from auth import hash_password, verify_password, create_access_token, get_current_user, require_admin
-from utils.pagination import paginate
+from auth import create_access_token, get_current_user, require_admin
+from utils.pagination import paginate, encode_cursor, decode_cursor
+from utils.passwords import password_hasher
+from utils.token_cache import token_cache
+from utils.availability_index import availability_index
+from utils.holds import hold_registry
+from utils.quotes import QuoteBatch, quote_stay, check_stay, QUOTE_MAX_NIGHTS
+from utils.assignment import assignment_strategy
+from utils.room_catalog import room_catalog, etag_matches
+from utils.search import search_guests, search_users, guest_typeahead
+from utils.dashboard_cache import dashboard_cache
+from utils.kpis import CAPACITY_SQL, KPI_SUMS_SQL, kpi_metrics, kpi_series, default_range
+from utils.pace import reservation_snapshot, pace_report, HORIZON_DAYS as PACE_HORIZON_DAYS, MAX_DAYS_BACK
+from utils.request_metrics import (
+    MetricsMiddleware, request_metrics, PROMETHEUS_CONTENT_TYPE, render_prometheus,
+    pool_lines, token_cache_lines, password_hasher_lines,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Los procesos de bcrypt no mueren solos con el worker (reload, tests)
+    password_hasher.shutdown()
+
 
-app = FastAPI(title="LuxeHotel API", version="1.0.0")
+app = FastAPI(title="LuxeHotel API", version="1.0.0", lifespan=lifespan)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[
+        "http://localhost:5173",
+        "http://127.0.0.1:5173",
+    ],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Va por fuera de CORS: cuenta también los preflights
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
 
 app.include_router(rooms.router)
+app.include_router(exports.router)
 
 def get_db():
     db = SessionLocal()
@@ -48,6 +81,12 @@ def get_db():
     finally:
         db.close()
 
+# Las rutas de catálogo, disponibilidad, reservas, listados y dashboard son
+# async def con get_async_db (asyncpg), así que no ocupan un hilo del
+# threadpool mientras esperan a la BD. Lo que depende del índice en memoria,
+# los holds o paginate() sigue siendo síncrono y se ejecuta con
+# AsyncSession.run_sync, que hace esa E/S también por asyncpg.
+
 
 # ============ HELPERS ============
 
@@ -62,6 +101,7 @@ def sync_unit_status(db: Session, room_id, unit_number: Optional[str], new_statu
     if unit:
         unit.status = new_status
         unit.updated_at = datetime.now()
+        availability_index.set_unit_status(room_id, unit_number, new_status)
 
 
 def normalize_date(value) -> date_type:
@@ -81,20 +121,16 @@ def check_room_overlap(
     check_in_date: date_type,
     check_out_date: date_type,
     exclude_reservation_id: Optional[UUID] = None,
+    index=availability_index,
 ) -> bool:
     """
     Devuelve True si existe alguna reserva activa que se solape con las fechas dadas.
     Usado para habitaciones sin room_units configuradas (ej. Presidential Penthouse).
+    Se responde desde el índice en memoria (utils/availability_index.py).
     """
-    query = db.query(Reservation).filter(
-        Reservation.room_id == room_id,
-        Reservation.status.notin_([ReservationStatus.cancelled, ReservationStatus.checked_out]),
-        Reservation.check_in_date  < check_out_date,   # nueva entra antes que existente sale
-        Reservation.check_out_date > check_in_date,    # nueva sale después que existente entra
+    return index.has_overlap(
+        db, room_id, check_in_date, check_out_date, exclude_reservation_id
     )
-    if exclude_reservation_id:
-        query = query.filter(Reservation.id != exclude_reservation_id)
-    return query.first() is not None
 
 
 def find_available_room_number(
@@ -104,114 +140,152 @@ def find_available_room_number(
     check_out_date: date_type,
     requested_room_number: Optional[str] = None,
     exclude_reservation_id: Optional[UUID] = None,
+    index=availability_index,
+    hold_token: Optional[str] = None,
 ) -> Optional[str]:
+    """
+    Elige (o valida) la unidad para una estancia. Las unidades con un hold
+    vigente de otro huésped cuentan como ocupadas; 'hold_token' excluye el
+    hold propio.
+    """
     check_in_date  = normalize_date(check_in_date)
     check_out_date = normalize_date(check_out_date)
     requested      = (requested_room_number or "").strip() or None
 
-    units = (
-        db.query(RoomUnit)
-        .filter(RoomUnit.room_id == room_id)
-        .order_by(RoomUnit.unit_number.asc())
-        .all()
-    )
+    # Unidades y reservas activas salen del índice en memoria, no de la BD
+    # (o de un AvailabilitySnapshot en las altas masivas)
+    units = index.units(db, room_id)
 
     # ── Sin unidades configuradas (habitación única como Penthouse) ──────────
     # Antes: simplemente retornaba requested sin validar nada  ← BUG
     # Ahora: verifica solapamiento real antes de permitir la reserva
     if not units:
-        if check_room_overlap(db, room_id, check_in_date, check_out_date, exclude_reservation_id):
+        if (
+            check_room_overlap(db, room_id, check_in_date, check_out_date, exclude_reservation_id, index)
+            or hold_registry.is_held(db, room_id, check_in_date, check_out_date, hold_token)
+        ):
             raise HTTPException(
                 status_code=409,
                 detail="This room is already booked for the selected dates. "
                        "Please choose different dates."
             )
-        return requested  # OK, no hay conflicto
+        # OK, no hay conflicto. Sin número de unidad: la restricción
+        # reservations_no_double_booking trata toda la habitación como una unidad
+        return None
 
     # ── Con unidades configuradas (ej. Garden View con unidades 101, 102…) ──
-    valid_numbers = {u.unit_number for u in units}
+    valid_numbers = {number for number, _ in units}
     if requested and requested not in valid_numbers:
         raise HTTPException(
             status_code=400,
             detail=f"Room number '{requested}' does not belong to this room type"
         )
 
-    overlaps_query = db.query(Reservation).filter(
-        Reservation.room_id == room_id,
-        Reservation.status.notin_([ReservationStatus.cancelled, ReservationStatus.checked_out]),
-        Reservation.check_in_date  < check_out_date,
-        Reservation.check_out_date > check_in_date,
-    )
-    if exclude_reservation_id:
-        overlaps_query = overlaps_query.filter(Reservation.id != exclude_reservation_id)
+    booked_numbers = index.booked_units(
+        db, room_id, check_in_date, check_out_date, exclude_reservation_id
+    ) | hold_registry.held_units(db, room_id, check_in_date, check_out_date, hold_token)
+    free = [(number, status) for number, status in units if number not in booked_numbers and status != "maintenance"]
 
-    booked_numbers = set()
-    for booked in overlaps_query.all():
-        booked_number, _ = split_special_requests(booked.special_requests)
-        if booked_number:
-            booked_numbers.add(booked_number)
+    # Las reservas antiguas sin unidad no ocupan ninguna concreta, pero cada
+    # una necesita una libre: debe quedar al menos una más que ellas
+    waiting = index.unassigned_peak(db, room_id, check_in_date, check_out_date, exclude_reservation_id)
 
     if requested:
-        requested_unit = next((u for u in units if u.unit_number == requested), None)
+        requested_status = next((status for number, status in units if number == requested), None)
         if requested in booked_numbers:
             raise HTTPException(
                 status_code=409,
                 detail=f"Room {requested} is not available for the selected dates."
             )
-        if requested_unit and requested_unit.status == "maintenance":
+        if requested_status == "maintenance":
             raise HTTPException(
                 status_code=409,
                 detail=f"Room {requested} is currently under maintenance."
             )
+        if len(free) <= waiting:
+            raise HTTPException(
+                status_code=409,
+                detail="No rooms available for the selected dates. Please choose different dates."
+            )
         return requested
 
-    # Auto-asignar la mejor unidad disponible
-    preferred = [u.unit_number for u in units if u.unit_number not in booked_numbers and u.status == "available"]
-    fallback  = [u.unit_number for u in units if u.unit_number not in booked_numbers and u.status != "maintenance"]
-
-    selected = preferred[0] if preferred else (fallback[0] if fallback else None)
-    if not selected:
+    # Auto-asignar según la estrategia configurada (utils/assignment.py)
+    if len(free) <= waiting:
         raise HTTPException(
             status_code=409,
             detail="No rooms available for the selected dates. Please choose different dates."
         )
-    return selected
+    gaps = index.unit_gaps(
+        db, room_id, check_in_date, check_out_date, [number for number, _ in free], exclude_reservation_id
+    )
+    return assignment_strategy.choose(
+        [(number, status, *gaps[number]) for number, status in free],
+        check_in_date.toordinal(),
+        check_out_date.toordinal(),
+        date_type.today().toordinal(),
+    )
 
-def calculate_nights(check_in: date_type, check_out: date_type) -> int:
-    return (check_out - check_in).days
+DOUBLE_BOOKING_CONSTRAINT = "reservations_no_double_booking"
+BOOKING_MAX_ATTEMPTS      = 3
 
-def calculate_pricing(room_price: Decimal, nights: int) -> dict:
-    subtotal    = Decimal(str(room_price)) * nights
-    taxes       = subtotal * Decimal('0.10')
-    service_fee = subtotal * Decimal('0.014')
-    total       = subtotal + taxes + service_fee
-    return {
-        "subtotal":     round(subtotal, 2),
-        "taxes":        round(taxes, 2),
-        "service_fee":  round(service_fee, 2),
-        "total_amount": round(total, 2),
-    }
 
-ROOM_NUMBER_TAG = "room_number::"
+def is_double_booking_error(exc: IntegrityError) -> bool:
+    # 23P01 = exclusion_violation
+    return (
+        getattr(exc.orig, "pgcode", None) == "23P01"
+        or DOUBLE_BOOKING_CONSTRAINT in str(exc.orig)
+    )
+
+
+def book_room_unit(
+    db: Session,
+    room_id,
+    check_in_date: date_type,
+    check_out_date: date_type,
+    requested_room_number: Optional[str],
+    write,
+    exclude_reservation_id: Optional[UUID] = None,
+    hold_token: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Elige unidad con find_available_room_number y escribe la reserva (o el
+    hold) con write(room_number) dentro de un savepoint.
+
+    La BD es quien garantiza que no haya doble reserva (exclusion constraint)
+    ni solapes entre holds y reservas (triggers con el mismo 23P01): si otra
+    petición ocupó la unidad entre la comprobación y el INSERT, se
+    refresca el índice de esa habitación y se reintenta con la siguiente unidad.
+    Los holds se recargan de la BD en cada intento para ver los de otros workers.
+    """
+    for _ in range(BOOKING_MAX_ATTEMPTS):
+        hold_registry.refresh(db, room_id)
+        room_number = find_available_room_number(
+            db=db,
+            room_id=room_id,
+            check_in_date=check_in_date,
+            check_out_date=check_out_date,
+            requested_room_number=requested_room_number,
+            exclude_reservation_id=exclude_reservation_id,
+            hold_token=hold_token,
+        )
+        try:
+            with db.begin_nested():
+                write(room_number)
+                db.flush()
+            return room_number
+        except IntegrityError as exc:
+            if not is_double_booking_error(exc):
+                raise
+            availability_index.invalidate(room_id)
+
+    raise HTTPException(
+        status_code=409,
+        detail="No rooms available for the selected dates. Please choose different dates."
+    )
 
-def build_special_requests(special_requests: Optional[str], room_number: Optional[str]) -> str:
-    notes  = (special_requests or "").strip()
-    number = (room_number or "").strip()
-    if not number:
-        return notes
-    return f"{ROOM_NUMBER_TAG}{number}\n{notes}" if notes else f"{ROOM_NUMBER_TAG}{number}"
 
-def split_special_requests(raw: Optional[str]) -> tuple[Optional[str], str]:
-    raw = (raw or "").strip()
-    if not raw:
-        return None, ""
-    lines = raw.splitlines()
-    first = lines[0].strip()
-    if first.lower().startswith(ROOM_NUMBER_TAG):
-        room_number = first.split("::", 1)[1].strip() if "::" in first else ""
-        notes       = "\n".join(lines[1:]).strip()
-        return (room_number or None), notes
-    return None, raw
+def calculate_nights(check_in: date_type, check_out: date_type) -> int:
+    return (check_out - check_in).days
 
 
 # ============ SCHEMAS ============
@@ -228,6 +302,34 @@ class GuestReservationCreate(BaseModel):
     last_name: str
     email: EmailStr
     phone: str
+    hold_token: Optional[str] = None  # de POST /holds; la unidad retenida se usa y se libera
+
+class HoldCreate(BaseModel):
+    room_id: UUID
+    room_number: Optional[str] = None
+    check_in_date: date_type
+    check_out_date: date_type
+
+class HoldResponse(BaseModel):
+    hold_token: str
+    room_id: UUID
+    room_number: Optional[str] = None
+    check_in_date: date_type
+    check_out_date: date_type
+    expires_at: datetime
+
+class QuoteItem(BaseModel):
+    room_id: UUID
+    check_in_date: date_type
+    check_out_date: date_type
+
+class QuoteRequest(BaseModel):
+    stays: list[QuoteItem] = Field(..., min_length=1, max_length=5000)
+    include_nightly: bool = False  # añade la tarifa de cada noche
+
+class BulkReservationCreate(BaseModel):
+    reservations: list[GuestReservationCreate] = Field(..., min_length=1, max_length=500)
+    atomic: bool = False  # True: si falla una, no se crea ninguna
 
 class ReservationConfirmation(BaseModel):
     reservation_id: UUID
@@ -251,28 +353,44 @@ def read_root():
 
 # ============ AUTH (admin/staff users) ============
 
+# bcrypt va a un pool de procesos (utils/passwords.py); con el pool
+# saturado estas rutas responden 503 en lugar de encolar sin límite
+
+async def rehash_if_needed(db: AsyncSession, account, password: str):
+    """Tras un login correcto, guarda el hash con el coste actual (BCRYPT_ROUNDS) si es otro."""
+    if not password_hasher.needs_rehash(account.password_hash):
+        return
+    try:
+        account.password_hash = await password_hasher.hash(password)
+    except HTTPException:
+        return  # pool saturado: se hará en otro login
+    await db.commit()
+
+
 @app.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
-    if existing_user:
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == user.email))
+    if result.scalars().first():
         raise HTTPException(status_code=400, detail="Email ya registrado")
     new_user = User(
         name=user.name,
         email=user.email,
-        password_hash=hash_password(user.password),
+        password_hash=await password_hasher.hash(user.password),
         role=user.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @app.post("/login", response_model=Token)
-def login(credentials: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.password_hash):
+async def login(credentials: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == credentials.email))
+    user   = result.scalars().first()
+    if not user or not await password_hasher.verify(credentials.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Email o contraseña incorrectos")
+    await rehash_if_needed(db, user, credentials.password)
     token = create_access_token(
         data={"sub": str(user.id), "email": user.email, "role": user.role, "name": user.name}
     )
@@ -287,28 +405,43 @@ def get_profile(current_user: dict = Depends(get_current_user)):
 # ============ USERS ============
 
 @app.get("/users", response_model=PaginatedUserResponse)
-def get_users(
+async def get_users(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    include_total: Optional[bool] = Query(None),
     role: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    ranked: bool = Query(False),
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    return await db.run_sync(_list_users, page, limit, cursor, include_total, role, search, ranked)
+
+
+def _list_users(db: Session, page, limit, cursor, include_total, role, search, ranked) -> dict:
     query = db.query(User)
     if role:
         query = query.filter(User.role == role)
+    if search and ranked:
+        # Orden por relevancia: paginación por página, no por cursor
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor is not supported with ranked search")
+        return paginate(search_users(query, search), page, limit, include_total=include_total)
     if search:
         s = f"%{search}%"
         query = query.filter((User.name.ilike(s)) | (User.email.ilike(s)))
-    query = query.order_by(User.created_at.desc())
-    return paginate(query, page, limit)
+    return paginate(
+        query, page, limit,
+        keyset=(User.created_at, User.id), cursor=cursor, include_total=include_total,
+    )
 
 
 # ============ ROOMS ============
 
 @app.get("/rooms", response_model=PaginatedRoomResponse)
-def get_rooms(
+async def get_rooms(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     is_active: Optional[bool] = Query(None),
@@ -316,9 +449,29 @@ def get_rooms(
     max_price: Optional[float] = Query(None),
     max_guests: Optional[int] = Query(None),
     view_type: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Room)
+    """
+    Catálogo público. Se sirve desde utils/room_catalog.py (respuesta ya
+    serializada por combinación de filtros) con ETag fuerte: con
+    If-None-Match coincidente responde 304 sin cuerpo. Solo consulta la BD
+    si la entrada no existe, caducó o un admin editó habitaciones.
+    """
+    view_type = (view_type or "").strip().lower() or None
+    key = (page, limit, is_active, min_price, max_price, max_guests, view_type)
+    body, etag, version = room_catalog.get(key)
+    if body is None:
+        body = await db.run_sync(_render_rooms, page, limit, is_active, min_price, max_price, max_guests, view_type)
+        etag = room_catalog.put(key, body, version)
+
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _render_rooms(db: Session, page, limit, is_active, min_price, max_price, max_guests, view_type) -> bytes:
+    query = db.query(Room).options(selectinload(Room.amenities))
     if is_active is not None:
         query = query.filter(Room.is_active == is_active)
     if min_price is not None:
@@ -331,59 +484,74 @@ def get_rooms(
         query = query.filter(Room.view_type.ilike(f"%{view_type}%"))
     query = query.order_by(Room.rating.desc(), Room.price_per_night.asc())
     result = paginate(query, page, limit)
-    for room in result['data']:
-        room.__dict__['amenities'] = [a.code for a in room.amenities]
-        
-    return result
+    result["data"] = [
+        {
+            **{field: getattr(room, field) for field in RoomResponse.model_fields if field != "amenities"},
+            "amenities": [a.code for a in room.amenities],
+        }
+        for room in result["data"]
+    ]
+    return PaginatedRoomResponse.model_validate(result).model_dump_json().encode()
 
 
 
 @app.get("/rooms/{room_id}/availability")
-def get_room_availability(
+async def get_room_availability(
     room_id: UUID,
     check_in:  Optional[date_type] = Query(None),
     check_out: Optional[date_type] = Query(None),
-    db: Session = Depends(get_db)
+    include_blocked: bool = Query(True),
+    hold_token: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Devuelve las fechas bloqueadas de una habitación (reservas activas futuras).
-    El frontend usa 'blocked' para deshabilitar fechas en el calendario.
+    Devuelve la ocupación de una habitación para el calendario.
+
+    'calendar' trae bitmaps diarios (ver AvailabilityIndex.calendar) servidos
+    desde el índice en memoria. 'blocked' (reservas activas futuras) se
+    mantiene por compatibilidad; ?include_blocked=false evita esa consulta.
 
     Parámetros opcionales ?check_in=YYYY-MM-DD&check_out=YYYY-MM-DD:
       → Verifica si esas fechas específicas están disponibles y qué unidad asignaría.
+        Con ?hold_token=... no cuenta el hold propio del huésped.
     """
+    return await db.run_sync(_room_availability, room_id, check_in, check_out, include_blocked, hold_token)
+
+
+def _room_availability(db: Session, room_id, check_in, check_out, include_blocked, hold_token) -> dict:
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    today = date_type.today()
-
-    # Reservas activas desde hoy en adelante
-    active = db.query(Reservation).filter(
-        Reservation.room_id == room_id,
-        Reservation.status.notin_([ReservationStatus.cancelled, ReservationStatus.checked_out]),
-        Reservation.check_out_date > today,
-    ).all()
-
-    blocked = [
-        {
-            "check_in":    str(r.check_in_date),
-            "check_out":   str(r.check_out_date),
-            "room_number": split_special_requests(r.special_requests)[0],
-        }
-        for r in active
-    ]
-
-    units = db.query(RoomUnit).filter(RoomUnit.room_id == room_id).all()
+    units = availability_index.units(db, room_id)
 
     result = {
         "room_id":   str(room_id),
         "room_name": room.name,
         "has_units": len(units) > 0,
-        "units":     [{"unit_number": u.unit_number, "status": u.status} for u in units],
-        "blocked":   blocked,
+        "units":     [{"unit_number": number, "status": status} for number, status in units],
+        "calendar":  availability_index.calendar(db, room_id),
     }
 
+    if include_blocked:
+        today = date_type.today()
+
+        # Reservas activas desde hoy en adelante
+        active = db.query(Reservation).filter(
+            Reservation.room_id == room_id,
+            Reservation.status.notin_([ReservationStatus.cancelled, ReservationStatus.checked_out]),
+            Reservation.check_out_date > today,
+        ).all()
+
+        result["blocked"] = [
+            {
+                "check_in":    str(r.check_in_date),
+                "check_out":   str(r.check_out_date),
+                "room_number": r.room_number,
+            }
+            for r in active
+        ]
+
     # Si se pasan fechas concretas, evalúa disponibilidad en ese rango
     if check_in and check_out:
         if check_out <= check_in:
@@ -394,6 +562,7 @@ def get_room_availability(
                 room_id=room_id,
                 check_in_date=check_in,
                 check_out_date=check_out,
+                hold_token=hold_token,
             )
             result["available"]      = True
             result["suggested_unit"] = suggested
@@ -404,6 +573,166 @@ def get_room_availability(
     return result
 
 
+# ============ AVAILABILITY SEARCH ============
+
+@app.get("/availability/search")
+async def search_availability(
+    check_in:  date_type = Query(...),
+    check_out: date_type = Query(...),
+    adults:    int = Query(1, ge=1),
+    children:  int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Disponibilidad de todos los tipos de habitación para un rango de fechas.
+    Sustituye las N llamadas a /rooms/{room_id}/availability con una sola
+    consulta sobre reservations, inventory_holds y room_units (las unidades
+    con un hold vigente cuentan como ocupadas).
+    """
+    if check_out <= check_in:
+        raise HTTPException(status_code=400, detail="check_out must be after check_in")
+    check_stay(check_in, check_out)
+
+    result = await db.execute(text("""
+        WITH booked AS (
+            SELECT room_id, room_number
+            FROM reservations
+            WHERE status NOT IN ('cancelled', 'checked_out')
+              AND stay && daterange(:check_in, :check_out, '[)')
+            UNION ALL
+            SELECT room_id, room_number
+            FROM inventory_holds
+            WHERE expires_at > :now
+              AND stay && daterange(:check_in, :check_out, '[)')
+        ),
+        unit_totals AS (
+            SELECT room_id, COUNT(*) AS total_units
+            FROM room_units
+            GROUP BY room_id
+        ),
+        free_units AS (
+            SELECT u.room_id,
+                   COUNT(*) AS free_units,
+                   (ARRAY_AGG(u.unit_number ORDER BY (u.status <> 'available'), u.unit_number))[1] AS suggested_unit
+            FROM room_units u
+            WHERE u.status <> 'maintenance'
+              AND NOT EXISTS (
+                  SELECT 1 FROM booked b
+                  WHERE b.room_id = u.room_id AND b.room_number = u.unit_number
+              )
+            GROUP BY u.room_id
+        )
+        SELECT r.id, r.slug, r.name, r.image_url, r.price_per_night, r.max_guests,
+               COALESCE(t.total_units, 0) AS total_units,
+               CASE
+                   WHEN t.room_id IS NOT NULL THEN COALESCE(f.free_units, 0)
+                   WHEN EXISTS (SELECT 1 FROM booked b WHERE b.room_id = r.id) THEN 0
+                   ELSE 1
+               END AS free_units,
+               f.suggested_unit
+        FROM rooms r
+        LEFT JOIN unit_totals t ON t.room_id = r.id
+        LEFT JOIN free_units  f ON f.room_id = r.id
+        WHERE r.is_active = true AND r.max_guests >= :guests
+        ORDER BY r.rating DESC, r.price_per_night ASC
+    """), {
+        "check_in": check_in, "check_out": check_out, "guests": adults + children,
+        "now": datetime.now(),
+    })
+    rows = result.fetchall()
+
+    nights = calculate_nights(check_in, check_out)
+    quotes = await db.run_sync(
+        QuoteBatch, {row.id: row.price_per_night for row in rows}, [(row.id, check_in, check_out) for row in rows]
+    )
+    data = []
+    for i, row in enumerate(rows):
+        pricing = quotes.pricing(i)
+        data.append({
+            "room_id":         str(row.id),
+            "slug":            row.slug,
+            "name":            row.name,
+            "image_url":       row.image_url,
+            "price_per_night": float(row.price_per_night),
+            "max_guests":      row.max_guests,
+            "total_units":     row.total_units,
+            "free_units":      row.free_units,
+            "available":       row.free_units > 0,
+            "suggested_unit":  row.suggested_unit,
+            "pricing":         {key: float(value) for key, value in pricing.items()},
+        })
+
+    return {
+        "check_in":  str(check_in),
+        "check_out": str(check_out),
+        "nights":    nights,
+        "adults":    adults,
+        "children":  children,
+        "data":      data,
+        "total":     len(data),
+    }
+
+
+# ============ QUOTES ============
+
+@app.post("/quotes")
+async def create_quotes(payload: QuoteRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Precio de muchas combinaciones (habitación, fechas) en una llamada, para
+    metabuscadores. Usa el calendario de tarifas (room_rates) y las mismas
+    reglas de impuestos y servicio que las reservas; no comprueba disponibilidad
+    (ver /availability/search). Importes al céntimo; 'nightly_rates' si se pide.
+    """
+    stays     = payload.stays
+    room_ids  = {stay.room_id for stay in stays}
+    result    = await db.execute(select(Room).where(Room.id.in_(room_ids), Room.is_active == True))
+    rooms     = {room.id: room for room in result.scalars()}
+
+    results = [None] * len(stays)
+    valid   = []
+    for position, stay in enumerate(stays):
+        nights = calculate_nights(stay.check_in_date, stay.check_out_date)
+        if nights <= 0:
+            error = "check_out must be after check_in"
+        elif nights > QUOTE_MAX_NIGHTS:
+            error = f"Stays are limited to {QUOTE_MAX_NIGHTS} nights"
+        elif stay.room_id not in rooms:
+            error = "Room not found"
+        else:
+            valid.append(position)
+            continue
+        results[position] = {"index": position, "ok": False, "error": error}
+
+    quotes = await db.run_sync(
+        QuoteBatch,
+        {room_id: room.price_per_night for room_id, room in rooms.items()},
+        [(stays[p].room_id, stays[p].check_in_date, stays[p].check_out_date) for p in valid],
+    )
+    # Céntimos → float: c / 100 es el double más cercano, así que el JSON sale exacto
+    amounts = {key: values.tolist() for key, values in quotes.amounts.items()}
+    nights  = quotes.nights.tolist()
+    for i, position in enumerate(valid):
+        stay  = stays[position]
+        quote = {
+            "index":          position,
+            "ok":             True,
+            "room_id":        str(stay.room_id),
+            "check_in_date":  str(stay.check_in_date),
+            "check_out_date": str(stay.check_out_date),
+            "nights":         nights[i],
+            **{key: values[i] / 100 for key, values in amounts.items()},
+        }
+        if payload.include_nightly:
+            quote["nightly_rates"] = [cents / 100 for cents in quotes.nightly_rates(i)]
+        results[position] = quote
+
+    return {
+        "quoted": len(valid),
+        "failed": len(stays) - len(valid),
+        "data":   results,
+    }
+
+
 # ============ GUESTS ============
 
 @app.post("/guests", response_model=GuestResponse, status_code=201)
@@ -424,49 +753,80 @@ def create_guest(guest: GuestCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/guests", response_model=PaginatedGuestResponse)
-def get_guests(
+async def get_guests(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    include_total: Optional[bool] = Query(None),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    ranked: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    'search' busca por subcadena en nombre y email. Con 'ranked' además
+    tolera erratas (trigramas), busca por teléfono y número de documento, y
+    ordena por relevancia en vez de por fecha de alta.
+    """
+    return await db.run_sync(_list_guests, page, limit, cursor, include_total, search, ranked)
+
+
+def _list_guests(db: Session, page, limit, cursor, include_total, search, ranked) -> dict:
     query = db.query(Guest)
+    if search and ranked:
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor is not supported with ranked search")
+        return paginate(search_guests(query, search), page, limit, include_total=include_total)
     if search:
         s = f"%{search}%"
         query = query.filter(Guest.first_name.ilike(s) | Guest.last_name.ilike(s) | Guest.email.ilike(s))
-    query = query.order_by(Guest.created_at.desc())
-    return paginate(query, page, limit)
+    return paginate(
+        query, page, limit,
+        keyset=(Guest.created_at, Guest.id), cursor=cursor, include_total=include_total,
+    )
+
+
+@app.get("/guests/typeahead")
+async def typeahead_guests(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    current_user: dict = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Autocompletado de recepción: los 'limit' huéspedes más parecidos a 'q' (con email, teléfono y documento)."""
+    return await db.run_sync(guest_typeahead, q.strip(), limit)
 
 
 
 
 @app.post("/guests/register", response_model=GuestResponse, status_code=201)
-def register_guest(payload: GuestRegister, db: Session = Depends(get_db)):
+async def register_guest(payload: GuestRegister, db: AsyncSession = Depends(get_async_db)):
     if payload.password != payload.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match")
     if len(payload.password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
-    existing = db.query(Guest).filter(Guest.email == payload.email).first()
-    if existing:
+    result = await db.execute(select(Guest).where(Guest.email == payload.email))
+    if result.scalars().first():
         raise HTTPException(status_code=409, detail=f"Email '{payload.email}' is already registered")
     new_guest = Guest(
         first_name=payload.first_name, last_name=payload.last_name, email=payload.email,
         phone=payload.phone, document_type=payload.document_type, document_number=payload.document_number,
-        date_of_birth=payload.date_of_birth, password_hash=hash_password(payload.password),
+        date_of_birth=payload.date_of_birth, password_hash=await password_hasher.hash(payload.password),
     )
     db.add(new_guest)
-    db.commit()
-    db.refresh(new_guest)
+    await db.commit()
+    await db.refresh(new_guest)
     return new_guest
 
 
 @app.post("/guests/login", response_model=Token)
-def login_guest(credentials: GuestLogin, db: Session = Depends(get_db)):
-    guest = db.query(Guest).filter(Guest.email == credentials.email).first()
+async def login_guest(credentials: GuestLogin, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Guest).where(Guest.email == credentials.email))
+    guest  = result.scalars().first()
     if not guest or not guest.password_hash:
         raise HTTPException(status_code=401, detail="Invalid email or password")
-    if not verify_password(credentials.password, guest.password_hash):
+    if not await password_hasher.verify(credentials.password, guest.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    await rehash_if_needed(db, guest, credentials.password)
     token = create_access_token(data={
         "sub": str(guest.id), "email": guest.email, "role": "guest",
         "name": f"{guest.first_name} {guest.last_name}",
@@ -510,17 +870,23 @@ def delete_guest(guest_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=409, detail=f"No se puede eliminar: el guest tiene {reservas} reserva(s)")
     db.delete(guest)
     db.commit()
+    token_cache.invalidate_user(guest_id)
 
 
 # ============ RESERVATIONS ============
 
 @app.post("/reservations", status_code=201)
-def create_reservation_admin(
+async def create_reservation_admin(
     reservation: GuestReservationCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    return await db.run_sync(_create_reservation_admin, reservation)
+
+
+def _create_reservation_admin(db: Session, reservation: GuestReservationCreate) -> dict:
     if reservation.check_out_date <= reservation.check_in_date:
         raise HTTPException(status_code=400, detail="Check-out must be after check-in")
+    check_stay(reservation.check_in_date, reservation.check_out_date)
 
     room = db.query(Room).filter(Room.id == reservation.room_id).first()
     if not room:
@@ -538,14 +904,7 @@ def create_reservation_admin(
         db.flush()
 
     nights  = calculate_nights(reservation.check_in_date, reservation.check_out_date)
-    pricing = calculate_pricing(room.price_per_night, nights)
-    resolved_room_number = find_available_room_number(
-        db=db,
-        room_id=reservation.room_id,
-        check_in_date=reservation.check_in_date,
-        check_out_date=reservation.check_out_date,
-        requested_room_number=reservation.room_number,
-    )
+    pricing = quote_stay(db, room, reservation.check_in_date, reservation.check_out_date)
 
     new_res = Reservation(
         guest_id=guest.id,
@@ -555,16 +914,25 @@ def create_reservation_admin(
         adults=reservation.adults,
         children=reservation.children,
         status=ReservationStatus.confirmed,
-        special_requests=build_special_requests(reservation.special_requests, resolved_room_number),
+        special_requests=(reservation.special_requests or "").strip(),
         subtotal=pricing["subtotal"],
         taxes=pricing["taxes"],
         service_fee=pricing["service_fee"],
         total_amount=pricing["total_amount"],
     )
-    db.add(new_res)
+
+    def write(room_number):
+        new_res.room_number = room_number
+        db.add(new_res)
+
+    resolved_room_number = book_room_unit(
+        db, reservation.room_id, reservation.check_in_date, reservation.check_out_date,
+        reservation.room_number, write,
+    )
     sync_unit_status(db, reservation.room_id, resolved_room_number, "occupied")
     db.commit()
     db.refresh(new_res)
+    availability_index.apply_reservation(new_res)
 
     return {
         "id":             str(new_res.id),
@@ -577,16 +945,205 @@ def create_reservation_admin(
     }
 
 
+@app.post("/reservations/bulk", status_code=201)
+def create_reservations_bulk(
+    payload: BulkReservationCreate,
+    current_user: dict = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Alta masiva (grupos, importaciones de OTAs) en una sola transacción.
+
+    Huéspedes y habitaciones se resuelven con una consulta cada uno y las
+    unidades se asignan contra un único AvailabilitySnapshot, de modo que
+    cada estancia ve las asignadas antes en el mismo lote. Los huéspedes
+    nuevos se insertan en el mismo savepoint que sus reservas: un elemento
+    rechazado no deja su huésped en la BD.
+    Devuelve un resultado por elemento, en el mismo orden.
+    """
+    items   = payload.reservations
+    results = [None] * len(items)
+
+    room_ids = {item.room_id for item in items}
+    rooms    = {room.id: room for room in db.query(Room).filter(Room.id.in_(room_ids)).all()}
+
+    emails = {item.email for item in items}
+    guests = {guest.email: guest for guest in db.query(Guest).filter(Guest.email.in_(emails)).all()}
+
+    snapshot = availability_index.snapshot(db, rooms.keys())
+    planned  = []  # (posición, Reservation)
+
+    for position, item in enumerate(items):
+        try:
+            if item.check_out_date <= item.check_in_date:
+                raise HTTPException(status_code=400, detail="Check-out must be after check-in")
+            check_stay(item.check_in_date, item.check_out_date)
+            room = rooms.get(item.room_id)
+            if not room:
+                raise HTTPException(status_code=404, detail="Room not found")
+
+            room_number = find_available_room_number(
+                db=db,
+                room_id=item.room_id,
+                check_in_date=item.check_in_date,
+                check_out_date=item.check_out_date,
+                requested_room_number=item.room_number,
+                index=snapshot,
+            )
+        except HTTPException as exc:
+            results[position] = {"index": position, "ok": False, "status_code": exc.status_code, "error": exc.detail}
+            continue
+
+        # Huésped nuevo solo si el elemento es válido; con id propio para no hacer flush
+        if item.email not in guests:
+            guests[item.email] = Guest(
+                id=uuid4(),
+                first_name=item.first_name,
+                last_name=item.last_name,
+                email=item.email,
+                phone=item.phone,
+            )
+
+        new_res = Reservation(
+            guest_id=guests[item.email].id,
+            room_id=item.room_id,
+            check_in_date=item.check_in_date,
+            check_out_date=item.check_out_date,
+            adults=item.adults,
+            children=item.children,
+            status=ReservationStatus.confirmed,
+            room_number=room_number,
+            special_requests=(item.special_requests or "").strip(),
+            created_by_user_id=UUID(current_user["id"]),
+        )
+        # id propio para que el snapshot pueda registrar la asignación antes del INSERT
+        new_res.id = uuid4()
+        snapshot.add(item.room_id, new_res.id, room_number, item.check_in_date, item.check_out_date)
+        planned.append((position, new_res))
+
+    if payload.atomic and len(planned) < len(items):
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Bulk import aborted: some reservations could not be placed",
+                    "results": [res for res in results if res]},
+        )
+
+    # Precios de todas las estancias con una consulta al calendario de tarifas por ventana de fechas
+    quotes = QuoteBatch(
+        db,
+        {room_id: room.price_per_night for room_id, room in rooms.items()},
+        [(new_res.room_id, new_res.check_in_date, new_res.check_out_date) for _, new_res in planned],
+    )
+    for i, (_, new_res) in enumerate(planned):
+        pricing = quotes.pricing(i)
+        new_res.subtotal     = pricing["subtotal"]
+        new_res.taxes        = pricing["taxes"]
+        new_res.service_fee  = pricing["service_fee"]
+        new_res.total_amount = pricing["total_amount"]
+
+    try:
+        with db.begin_nested():
+            # add() de un huésped ya guardado no hace nada; los nuevos entran aquí
+            db.add_all(dict.fromkeys(guests[items[position].email] for position, _ in planned))
+            db.add_all([new_res for _, new_res in planned])
+            db.flush()
+    except IntegrityError as exc:
+        if not is_double_booking_error(exc):
+            raise
+        if payload.atomic:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Availability changed during the import, please retry")
+
+        # Otra petición ocupó alguna unidad entre la carga del snapshot y el
+        # INSERT: se reintenta elemento a elemento contra el índice refrescado
+        for room_id in rooms:
+            availability_index.invalidate(room_id)
+        still_planned = []
+        for position, new_res in planned:
+            item = items[position]
+
+            # Al deshacerse el savepoint anterior los huéspedes nuevos volvieron a
+            # transient: cada uno se inserta con la primera reserva suya que entra
+            def write(room_number, new_res=new_res, guest=guests[item.email]):
+                new_res.room_number = room_number
+                db.add(guest)
+                db.add(new_res)
+
+            try:
+                book_room_unit(
+                    db, item.room_id, item.check_in_date, item.check_out_date,
+                    item.room_number, write,
+                )
+            except HTTPException as exc:
+                results[position] = {"index": position, "ok": False, "status_code": exc.status_code, "error": exc.detail}
+                continue
+            still_planned.append((position, new_res))
+        planned = still_planned
+
+    occupied = {(new_res.room_id, new_res.room_number) for _, new_res in planned if new_res.room_number}
+    if occupied:
+        db.query(RoomUnit).filter(
+            tuple_(RoomUnit.room_id, RoomUnit.unit_number).in_(occupied)
+        ).update({"status": "occupied", "updated_at": datetime.now()}, synchronize_session=False)
+
+    # Se leen antes del commit: después los objetos quedan expirados y cada
+    # acceso sería un SELECT
+    stays = [
+        (new_res.room_id, new_res.id, new_res.room_number, new_res.check_in_date, new_res.check_out_date)
+        for _, new_res in planned
+    ]
+    for position, new_res in planned:
+        results[position] = {
+            "index":        position,
+            "ok":           True,
+            "id":           str(new_res.id),
+            "room_number":  new_res.room_number,
+            "total_amount": float(new_res.total_amount),
+        }
+
+    db.commit()
+
+    for room_id, unit_number in occupied:
+        availability_index.set_unit_status(room_id, unit_number, "occupied")
+    for room_id, reservation_id, room_number, check_in, check_out in stays:
+        availability_index.apply_stay(room_id, reservation_id, room_number, check_in, check_out, active=True)
+
+    return {
+        "created": len(planned),
+        "failed":  len(items) - len(planned),
+        "results": results,
+    }
+
+
 @app.get("/reservations")
-def get_reservations(
+async def get_reservations(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    include_total: Optional[bool] = Query(None),
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    return await db.run_sync(_list_reservations, page, limit, cursor, include_total, status)
+
+
+def _list_reservations(db: Session, page, limit, cursor, include_total, status) -> dict:
     from datetime import date
     today = date.today()
-    query = db.query(Reservation)
+    # Una sola consulta: reservas + huésped + habitación, solo las columnas de la respuesta
+    query = (
+        db.query(
+            Reservation.id, Reservation.guest_id, Reservation.room_id, Reservation.room_number,
+            Reservation.check_in_date, Reservation.check_out_date, Reservation.status,
+            Reservation.total_amount, Reservation.adults, Reservation.children,
+            Reservation.special_requests,
+            Guest.first_name, Guest.last_name, Guest.email, Guest.phone,
+            Room.name.label("room_name"), Room.slug.label("room_slug"),
+        )
+        .outerjoin(Guest, Guest.id == Reservation.guest_id)
+        .outerjoin(Room, Room.id == Reservation.room_id)
+    )
 
     if status == "confirmed":
         query = query.filter(Reservation.status == ReservationStatus.confirmed)
@@ -599,33 +1156,42 @@ def get_reservations(
     elif status == "cancelled":
         query = query.filter(Reservation.status == ReservationStatus.cancelled)
 
-    query  = query.order_by(Reservation.check_in_date.desc())
-    result = paginate(query, page, limit)
+    result = paginate(
+        query, page, limit,
+        keyset=(Reservation.check_in_date, Reservation.id), cursor=cursor, include_total=include_total,
+    )
 
     enriched = []
     for r in result["data"]:
-        guest = db.query(Guest).filter(Guest.id == r.guest_id).first()
-        room  = db.query(Room).filter(Room.id == r.room_id).first()
-        room_number, clean_notes = split_special_requests(r.special_requests)
+        has_guest = r.first_name is not None
         enriched.append({
             "id":               str(r.id),
             "guest_id":         str(r.guest_id),
             "room_id":          str(r.room_id),
-            "guest_name":       f"{guest.first_name} {guest.last_name}" if guest else "—",
-            "email":            guest.email if guest else "",
-            "phone":            guest.phone if guest else "",
-            "room_number":      room_number or (room.name if room else "—"),
-            "room_type":        room.slug if room else "—",
+            "guest_name":       f"{r.first_name} {r.last_name}" if has_guest else "—",
+            "email":            r.email if has_guest else "",
+            "phone":            r.phone if has_guest else "",
+            "room_number":      r.room_number or r.room_name or "—",
+            "room_type":        r.room_slug or "—",
             "check_in_date":    str(r.check_in_date),
             "check_out_date":   str(r.check_out_date),
             "status":           r.status.value,
             "total_price":      float(r.total_amount) if r.total_amount else 0,
             "adults":           r.adults,
             "children":         r.children,
-            "special_requests": clean_notes,
+            "special_requests": r.special_requests or "",
         })
 
-    return {"data": enriched, "total": result["total"], "page": result["page"], "limit": result["limit"]}
+    return {
+        "data":        enriched,
+        "total":       result["total"],
+        "page":        result["page"],
+        "limit":       result["limit"],
+        "next_cursor": result["next_cursor"],
+        "has_more":    result["has_more"],
+        "total_is_estimate": result["total_is_estimate"],
+        "total_source":      result["total_source"],
+    }
 
 
 @app.put("/reservations/{reservation_id}")
@@ -638,28 +1204,28 @@ def update_reservation(
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
 
-    current_room_number, current_notes = split_special_requests(reservation.special_requests)
-
     next_check_in = normalize_date(payload.get("check_in_date", reservation.check_in_date))
     next_check_out = normalize_date(payload.get("check_out_date", reservation.check_out_date))
     if next_check_out <= next_check_in:
         raise HTTPException(status_code=400, detail="Check-out must be after check-in")
 
-    next_room_number = find_available_room_number(
-        db=db,
-        room_id=reservation.room_id,
-        check_in_date=next_check_in,
-        check_out_date=next_check_out,
-        requested_room_number=payload.get("room_number", current_room_number),
-        exclude_reservation_id=reservation.id,
+    requested_room_number = payload.get("room_number", reservation.room_number)
+    next_notes            = (payload.get("special_requests", reservation.special_requests) or "").strip()
+
+    def write(room_number):
+        reservation.check_in_date = next_check_in
+        reservation.check_out_date = next_check_out
+        reservation.room_number = room_number
+        reservation.special_requests = next_notes
+
+    book_room_unit(
+        db, reservation.room_id, next_check_in, next_check_out,
+        requested_room_number, write, exclude_reservation_id=reservation.id,
     )
-    next_notes       = payload.get("special_requests", current_notes)
-    reservation.check_in_date = next_check_in
-    reservation.check_out_date = next_check_out
-    reservation.special_requests = build_special_requests(next_notes, next_room_number)
 
     db.commit()
     db.refresh(reservation)
+    availability_index.apply_reservation(reservation)
     return {"message": "Reservation updated", "id": str(reservation.id)}
 
 
@@ -672,8 +1238,7 @@ def checkin_reservation(reservation_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Cannot check-in: status is '{reservation.status.value}'")
 
     reservation.status = ReservationStatus.checked_in
-    room_number, _ = split_special_requests(reservation.special_requests)
-    sync_unit_status(db, reservation.room_id, room_number, "occupied")
+    sync_unit_status(db, reservation.room_id, reservation.room_number, "occupied")
 
     db.commit()
     return {"message": "Check-in successful", "status": reservation.status.value}
@@ -688,10 +1253,10 @@ def checkout_reservation(reservation_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Cannot check-out: status is '{reservation.status.value}'")
 
     reservation.status = ReservationStatus.checked_out
-    room_number, _ = split_special_requests(reservation.special_requests)
-    sync_unit_status(db, reservation.room_id, room_number, "cleaning")
+    sync_unit_status(db, reservation.room_id, reservation.room_number, "cleaning")
 
     db.commit()
+    availability_index.apply_reservation(reservation)
     return {"message": "Check-out successful", "status": reservation.status.value}
 
 
@@ -704,19 +1269,87 @@ def cancel_reservation(reservation_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Cannot cancel: status is '{reservation.status.value}'")
 
     reservation.status = ReservationStatus.cancelled
-    room_number, _ = split_special_requests(reservation.special_requests)
-    sync_unit_status(db, reservation.room_id, room_number, "available")
+    sync_unit_status(db, reservation.room_id, reservation.room_number, "available")
 
     db.commit()
+    availability_index.apply_reservation(reservation)
     return {"message": "Reservation cancelled", "status": reservation.status.value}
 
 
+# ============ HOLDS (public, no auth) ============
+
+@app.post("/holds", response_model=HoldResponse, status_code=201)
+async def create_hold(payload: HoldCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Retiene una unidad durante HOLD_TTL_SECONDS mientras el huésped completa
+    /guest-booking. El token devuelto se envía como 'hold_token' al reservar.
+    Cada IP puede tener HOLD_MAX_PER_CLIENT holds vigentes (HOLD_MAX_PER_CLIENT_ROOM
+    del mismo tipo); por encima se responde 429.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    return await db.run_sync(_create_hold, payload, client_ip)
+
+
+def _create_hold(db: Session, payload: HoldCreate, client_ip: str) -> HoldResponse:
+    if payload.check_out_date <= payload.check_in_date:
+        raise HTTPException(status_code=400, detail="Check-out date must be after check-in date")
+    check_stay(payload.check_in_date, payload.check_out_date)
+
+    room = db.query(Room).filter(Room.id == payload.room_id).first()
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if not room.is_active:
+        raise HTTPException(status_code=400, detail="This room is not available")
+
+    hold_registry.check_client_quota(db, client_ip, payload.room_id)
+    hold_registry.purge_expired(db, payload.room_id)
+    hold = hold_registry.new_hold(payload.room_id, payload.check_in_date, payload.check_out_date, client_ip)
+
+    def write(room_number):
+        hold.room_number = room_number
+        db.add(hold)
+
+    book_room_unit(
+        db, payload.room_id, payload.check_in_date, payload.check_out_date,
+        payload.room_number, write,
+    )
+    db.commit()
+    db.refresh(hold)
+    hold_registry.add(hold)
+
+    return HoldResponse(
+        hold_token=hold.token,
+        room_id=hold.room_id,
+        room_number=hold.room_number,
+        check_in_date=hold.check_in_date,
+        check_out_date=hold.check_out_date,
+        expires_at=hold.expires_at,
+    )
+
+
+@app.delete("/holds/{hold_token}", status_code=204)
+async def release_hold(hold_token: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(InventoryHold).where(InventoryHold.token == hold_token))
+    hold   = result.scalars().first()
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    room_id = hold.room_id
+    await db.delete(hold)
+    await db.commit()
+    hold_registry.release(room_id, hold_token)
+
+
 # ============ GUEST BOOKING (public, no auth) ============
 
 @app.post("/guest-booking", response_model=ReservationConfirmation)
-def create_guest_reservation(reservation: GuestReservationCreate, db: Session = Depends(get_db)):
+async def create_guest_reservation(reservation: GuestReservationCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(_create_guest_reservation, reservation)
+
+
+def _create_guest_reservation(db: Session, reservation: GuestReservationCreate) -> ReservationConfirmation:
     if reservation.check_out_date <= reservation.check_in_date:
         raise HTTPException(status_code=400, detail="Check-out date must be after check-in date")
+    check_stay(reservation.check_in_date, reservation.check_out_date)
 
     room = db.query(Room).filter(Room.id == reservation.room_id).first()
     if not room:
@@ -728,6 +1361,24 @@ def create_guest_reservation(reservation: GuestReservationCreate, db: Session =
     if total_guests > room.max_guests:
         raise HTTPException(status_code=400, detail=f"Maximum capacity is {room.max_guests} guests")
 
+    # Con hold: se reserva la unidad retenida y el hold se consume en la misma transacción
+    hold = None
+    requested_room_number = reservation.room_number
+    if reservation.hold_token:
+        hold = hold_registry.get(db, reservation.hold_token)
+        if not hold:
+            raise HTTPException(
+                status_code=409,
+                detail="Your hold has expired. Please select your dates again."
+            )
+        if (
+            hold.room_id != reservation.room_id
+            or hold.check_in_date != reservation.check_in_date
+            or hold.check_out_date != reservation.check_out_date
+        ):
+            raise HTTPException(status_code=400, detail="Hold does not match the selected room and dates")
+        requested_room_number = hold.room_number
+
     guest = db.query(Guest).filter(Guest.email == reservation.email).first()
     if not guest:
         guest = Guest(
@@ -740,14 +1391,7 @@ def create_guest_reservation(reservation: GuestReservationCreate, db: Session =
         db.flush()
 
     nights  = calculate_nights(reservation.check_in_date, reservation.check_out_date)
-    pricing = calculate_pricing(room.price_per_night, nights)
-    resolved_room_number = find_available_room_number(
-        db=db,
-        room_id=reservation.room_id,
-        check_in_date=reservation.check_in_date,
-        check_out_date=reservation.check_out_date,
-        requested_room_number=reservation.room_number,
-    )
+    pricing = quote_stay(db, room, reservation.check_in_date, reservation.check_out_date)
 
     new_reservation = Reservation(
         guest_id=guest.id,
@@ -757,16 +1401,32 @@ def create_guest_reservation(reservation: GuestReservationCreate, db: Session =
         adults=reservation.adults,
         children=reservation.children,
         status=ReservationStatus.pending,
-        special_requests=build_special_requests(reservation.special_requests, resolved_room_number),
+        special_requests=(reservation.special_requests or "").strip(),
         subtotal=pricing['subtotal'],
         taxes=pricing['taxes'],
         service_fee=pricing['service_fee'],
         total_amount=pricing['total_amount'],
     )
-    db.add(new_reservation)
+
+    def write(room_number):
+        # El hold se borra antes del INSERT: el trigger de inventory_holds
+        # rechaza una reserva que solape un hold vigente, también el propio
+        if hold:
+            db.delete(hold)
+            db.flush()
+        new_reservation.room_number = room_number
+        db.add(new_reservation)
+
+    resolved_room_number = book_room_unit(
+        db, reservation.room_id, reservation.check_in_date, reservation.check_out_date,
+        requested_room_number, write, hold_token=reservation.hold_token,
+    )
     sync_unit_status(db, reservation.room_id, resolved_room_number, "occupied")
     db.commit()
     db.refresh(new_reservation)
+    availability_index.apply_reservation(new_reservation)
+    if hold:
+        hold_registry.release(reservation.room_id, reservation.hold_token)
 
     reference_number = f"LX-{new_reservation.id.hex[:8].upper()}"
     return ReservationConfirmation(
@@ -785,18 +1445,75 @@ def create_guest_reservation(reservation: GuestReservationCreate, db: Session =
 
 # ============ ROOM REVIEWS ============
 
+REVIEWS_CURSOR_SCOPE = "reviews.created_at"
+
+
+def review_stats_payload(stats: Optional[RoomReviewStats]) -> dict:
+    """Medias, ratio de recomendación e histograma a partir de las sumas del agregado."""
+    def average(total, count):
+        return round(float(total) / count, 2) if count else None
+
+    if stats is None:   # todavía sin reviews verificadas
+        return {
+            "total_reviews":   0,
+            "rating":          None,
+            "categories":      {category: None for category in REVIEW_CATEGORIES},
+            "recommend_ratio": None,
+            "histogram":       {str(n): 0 for n in range(1, 6)},
+        }
+    return {
+        "total_reviews":   stats.review_count,
+        "rating":          average(stats.sum_overall, stats.review_count),
+        "categories":      {
+            category: average(getattr(stats, f"sum_{category}"), getattr(stats, f"count_{category}"))
+            for category in REVIEW_CATEGORIES
+        },
+        "recommend_ratio": round(stats.recommend_yes / stats.recommend_answered, 3) if stats.recommend_answered else None,
+        "histogram":       {str(n): getattr(stats, f"stars_{n}") for n in range(1, 6)},
+    }
+
+
 @app.get("/rooms/{room_id}/reviews")
-def get_room_reviews(
+async def get_room_reviews(
     room_id: UUID,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    include_total: Optional[bool] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
+    return await db.run_sync(_list_room_reviews, room_id, page, limit, cursor, include_total)
+
 
-    reviews = db.execute(text("""
+def _list_room_reviews(db: Session, room_id, page, limit, cursor, include_total) -> dict:
+    # Existencia de la habitación y agregado en una sola consulta por PK
+    found = (
+        db.query(Room.id, RoomReviewStats)
+        .outerjoin(RoomReviewStats, RoomReviewStats.room_id == Room.id)
+        .filter(Room.id == room_id)
+        .first()
+    )
+    if not found:
+        raise HTTPException(status_code=404, detail="Room not found")
+    stats = review_stats_payload(found.RoomReviewStats)
+    if found.RoomReviewStats is None:
+        # Sin fila de agregado (p. ej. reviews cargadas antes del trigger): COUNT
+        stats["total_reviews"] = db.execute(
+            text("SELECT count(*) FROM reviews WHERE room_id = :room_id AND verified = true"),
+            {"room_id": room_id},
+        ).scalar()
+
+    # Con ?cursor= se pagina por keyset (created_at, id) en lugar de OFFSET
+    params = {"room_id": room_id, "limit": limit + 1, "offset": (page - 1) * limit}
+    after  = ""
+    if cursor:
+        params["after_created_at"], params["after_id"] = decode_cursor(cursor, REVIEWS_CURSOR_SCOPE)
+        params["offset"] = 0
+        after = "AND (rev.created_at, rev.id) < (:after_created_at, :after_id)"
+    if include_total is None:
+        include_total = cursor is None
+
+    rows = db.execute(text(f"""
         SELECT rev.id, rev.rating_overall, rev.rating_cleanliness, rev.rating_comfort,
                rev.rating_location, rev.rating_staff, rev.rating_value, rev.comment_title,
                rev.comment_text, rev.traveler_type, rev.would_recommend, rev.stay_date,
@@ -804,67 +1521,194 @@ def get_room_reviews(
                g.first_name || ' ' || SUBSTRING(g.last_name, 1, 1) || '.' AS guest_name
         FROM reviews rev
         JOIN guests g ON rev.guest_id = g.id
-        WHERE rev.room_id = :room_id AND rev.verified = true
-        ORDER BY rev.created_at DESC
+        WHERE rev.room_id = :room_id AND rev.verified = true {after}
+        ORDER BY rev.created_at DESC, rev.id DESC
         LIMIT :limit OFFSET :offset
-    """), {"room_id": room_id, "limit": limit, "offset": (page - 1) * limit}).fetchall()
+    """), params).fetchall()
+    has_more = len(rows) > limit
+    reviews  = rows[:limit]
 
-    total = db.execute(
-        text("SELECT COUNT(*) FROM reviews WHERE room_id = :room_id AND verified = true"),
-        {"room_id": room_id}
-    ).scalar()
+    # El total sale del agregado (exacto) en lugar de un COUNT(*) por página
+    total        = stats["total_reviews"] if include_total else None
+    total_source = "exact" if include_total else None
 
-    return {"data": [dict(row._mapping) for row in reviews], "total": total, "page": page, "limit": limit}
+    return {
+        "stats":       stats,
+        "data":        [dict(row._mapping) for row in reviews],
+        "total":       total,
+        "page":        None if cursor else page,
+        "limit":       limit,
+        "next_cursor": encode_cursor(REVIEWS_CURSOR_SCOPE, reviews[-1].created_at, reviews[-1].id) if has_more else None,
+        "has_more":    has_more,
+        "total_is_estimate": False,
+        "total_source":      total_source,
+    }
 
 
 # ============ DASHBOARD ============
 
 @app.get("/dashboard/stats")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    from datetime import date
-    today = date.today()
-
-    revenue_today = db.execute(text("""
-        SELECT COALESCE(SUM(total_amount), 0) FROM reservations
-        WHERE check_in_date = :today AND status NOT IN ('cancelled')
-    """), {"today": today}).scalar() or 0
-
-    total_rooms = db.execute(text("SELECT COUNT(*) FROM rooms WHERE is_active = true")).scalar() or 1
-    occupied = db.execute(text("""
-        SELECT COUNT(DISTINCT room_id) FROM reservations
-        WHERE status IN ('confirmed', 'checked_in')
-          AND check_in_date <= :today AND check_out_date > :today
-    """), {"today": today}).scalar() or 0
-    occupancy = round((occupied / total_rooms) * 100, 1)
-
-    checkins_today = db.execute(text("""
-        SELECT COUNT(*) FROM reservations
-        WHERE check_in_date = :today AND status IN ('confirmed', 'pending', 'checked_in')
-    """), {"today": today}).scalar() or 0
-
-    active_guests = db.execute(text("""
-        SELECT COUNT(*) FROM reservations
-        WHERE status IN ('confirmed', 'checked_in')
-          AND check_in_date <= :today AND check_out_date > :today
-    """), {"today": today}).scalar() or 0
+async def get_dashboard_stats(
+    as_of: Optional[date_type] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    KPIs del día 'as_of' (hoy por defecto). Se calculan en una sola consulta
+    y se cachean DASHBOARD_CACHE_TTL_SECONDS: con muchas pestañas haciendo
+    polling solo una petición por intervalo llega a la BD. 'revenue' es el
+    de todas las habitaciones; ocupación, ADR y RevPAR cuentan solo las
+    activas, igual que la capacidad.
+    """
+    day = as_of or date_type.today()
+    return await dashboard_cache.get_or_compute(("stats", day), lambda: _dashboard_stats(db, day))
+
+
+async def _dashboard_stats(db: AsyncSession, day: date_type) -> dict:
+    # Ingreso y ocupación salen del rollup daily_kpis (ingreso de la noche,
+    # no de las llegadas); llegadas y huéspedes alojados, de las reservas
+    # que tocan 'day' (check_in_date = day ya implica check_out_date > day)
+    result = await db.execute(text(f"""
+        WITH day_reservations AS (
+            SELECT status, check_in_date
+            FROM reservations
+            WHERE check_in_date <= :day AND check_out_date > :day
+        ),
+        day_kpis AS (
+            SELECT {KPI_SUMS_SQL}
+            FROM daily_kpis k
+            JOIN rooms ro ON ro.id = k.room_id
+            WHERE k.date = :day
+        ),
+        capacity AS ({CAPACITY_SQL})
+        SELECT
+            (SELECT rooms_sold FROM day_kpis)     AS rooms_sold,
+            (SELECT revenue FROM day_kpis)        AS revenue,
+            (SELECT active_revenue FROM day_kpis) AS active_revenue,
+            (SELECT rooms FROM capacity)          AS capacity,
+            COUNT(*) FILTER (
+                WHERE check_in_date = :day AND status IN ('confirmed', 'pending', 'checked_in')
+            ) AS checkins_today,
+            COUNT(*) FILTER (
+                WHERE status IN ('confirmed', 'checked_in')
+            ) AS active_guests
+        FROM day_reservations
+    """), {"day": day})
+    row = result.one()
 
     return {
-        "revenue":        float(revenue_today),
-        "occupancy":      occupancy,
-        "checkins_today": checkins_today,
-        "active_guests":  active_guests,
+        "revenue":        float(row.revenue or 0),
+        **kpi_metrics(row.rooms_sold or 0, float(row.active_revenue or 0), row.capacity or 0),
+        "checkins_today": row.checkins_today or 0,
+        "active_guests":  row.active_guests or 0,
+        "as_of":          day.isoformat(),
     }
 
 
+DASHBOARD_MAX_RANGE_DAYS = 731
+
 @app.get("/dashboard/revenue")
-def get_dashboard_revenue(days: int = Query(30, ge=7, le=90), db: Session = Depends(get_db)):
-    rows = db.execute(text("""
-        SELECT check_in_date::date AS date, COALESCE(SUM(total_amount), 0) AS revenue
-        FROM reservations
-        WHERE status NOT IN ('cancelled')
-          AND check_in_date >= CURRENT_DATE - INTERVAL ':days days'
-        GROUP BY check_in_date::date
-        ORDER BY check_in_date::date ASC
-    """.replace(":days", str(days)))).fetchall()
-
-    return {"data": [{"date": row[0].strftime("%b %d"), "revenue": float(row[1])} for row in rows]}
+async def get_dashboard_revenue(
+    days: int = Query(30, ge=7, le=90),
+    start: Optional[date_type] = Query(None),
+    end: Optional[date_type] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Ingreso por noche (cada estancia repartida entre sus noches) con
+    ocupación, ADR y RevPAR. Por defecto los últimos 'days' días; con
+    start/end cualquier rango (ambos incluidos).
+    """
+    if start or end:
+        if not (start and end):
+            raise HTTPException(status_code=400, detail="start and end must be sent together")
+        if end < start:
+            raise HTTPException(status_code=400, detail="end must not be before start")
+        if (end - start).days >= DASHBOARD_MAX_RANGE_DAYS:
+            raise HTTPException(status_code=400, detail=f"Range cannot exceed {DASHBOARD_MAX_RANGE_DAYS} days")
+    else:
+        start, end = default_range(days)
+
+    series = await dashboard_cache.get_or_compute(
+        ("revenue", start, end), lambda: db.run_sync(kpi_series, start, end)
+    )
+    return {"data": [{**row, "date": row["date"].strftime("%b %d")} for row in series]}
+
+
+PACE_MAX_RANGE_DAYS = 366
+
+@app.get("/dashboard/pace")
+async def get_dashboard_pace(
+    start: Optional[date_type] = Query(None),
+    end: Optional[date_type] = Query(None),
+    days_back: int = Query(90, ge=0, le=MAX_DAYS_BACK),
+    room_id: Optional[UUID] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Noches en libros (OTB) de cada noche de [start, end] frente a las del
+    mismo día de la semana del año anterior con la misma antelación (STLY),
+    y la curva de los últimos 'days_back' días del periodo completo. Por
+    defecto, los próximos 90 días. Se calcula en memoria sobre el snapshot
+    de utils/pace.py; start y end deben quedar a PACE_HORIZON_DAYS de hoy.
+    """
+    today    = date_type.today()
+    earliest = today - timedelta(days=PACE_HORIZON_DAYS)
+    latest   = today + timedelta(days=PACE_HORIZON_DAYS)
+    start    = start or today
+    if not earliest <= start <= latest:
+        raise HTTPException(status_code=422, detail=f"start must be within {PACE_HORIZON_DAYS} days of today")
+    end = end or min(start + timedelta(days=89), latest)
+    if not earliest <= end <= latest:
+        raise HTTPException(status_code=422, detail=f"end must be within {PACE_HORIZON_DAYS} days of today")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (end - start).days >= PACE_MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {PACE_MAX_RANGE_DAYS} days")
+
+    columns   = await reservation_snapshot.columns(db)
+    room_code = None
+    if room_id is not None:
+        room_code = reservation_snapshot.room_code(room_id)
+        if room_code is None:
+            room_code = -1      # sin reservas: curvas a cero
+    report = pace_report(columns, today, start, end, days_back, room_code)
+    return {"start": start.isoformat(), "end": end.isoformat(), "room_id": room_id, **report}
+
+
+# ============ DIAGNÓSTICO (admin) ============
+
+@app.get("/admin/db-pool")
+async def get_db_pool_metrics(current_user: dict = Depends(require_admin)):
+    """
+    Pools de conexiones de este worker (el síncrono y el async): conexiones
+    en uso y overflow, timeouts, histograma de espera por conexión y
+    latencia de apertura (utils/pool_metrics.py). Los contadores son desde
+    que arrancó el worker. Es async para responder aunque el threadpool
+    esté lleno de peticiones esperando conexión.
+    """
+    return {
+        "sync":  pool_metrics.snapshot(engine.pool),
+        "async": async_pool_metrics.snapshot(async_engine.sync_engine.pool),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Métricas de este worker en formato de texto de Prometheus: peticiones,
+    status y latencia por ruta (utils/request_metrics.py), pools de
+    conexiones, caché de JWT y bcrypt. Sin autenticación, para el scraper:
+    en producción no debe quedar expuesta fuera de la red interna.
+    """
+    return Response(
+        content=render_prometheus(
+            request_metrics.lines(),
+            pool_lines([
+                (pool_metrics, engine.pool),
+                (async_pool_metrics, async_engine.sync_engine.pool),
+            ]),
+            token_cache_lines(token_cache.stats()),
+            password_hasher_lines(password_hasher),
+        ),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
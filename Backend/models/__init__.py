@@ -4,6 +4,10 @@ from .guest import Guest
 from .room import Room, RoomAmenity, RoomUnit
 from .reservation import Reservation, ReservationStatus
 from .payment import Payment, PaymentMethod, PaymentStatus
+from .hold import InventoryHold
+from .rate import RoomRate
+from .review_stats import RoomReviewStats
+from .kpi import DailyKpi
 
 __all__ = [
     "Base",
@@ -17,5 +21,9 @@ __all__ = [
     "ReservationStatus",
     "Payment",
     "PaymentMethod",
-    "PaymentStatus"
+    "PaymentStatus",
+    "InventoryHold",
+    "RoomRate",
+    "RoomReviewStats",
+    "DailyKpi"
 ]
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, date
-from sqlalchemy import String, Date, Text, DateTime
+from sqlalchemy import String, Date, Text, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from database import Base
@@ -29,4 +29,11 @@ class Guest(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=lambda: datetime.now()
+    )
+
+    __table_args__ = (
+        # Paginación por keyset de GET /guests
+        Index('ix_guests_created_at_id', 'created_at', 'id'),
+        # Los índices GIN de búsqueda (pg_trgm) son de expresión y viven solo
+        # en la migración e4b7d2a91c55; ver utils/search.py
     )
\ No newline at end of file
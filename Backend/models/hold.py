@@ -0,0 +1,56 @@
+import uuid
+from datetime import datetime, date
+from sqlalchemy import String, Date, DateTime, ForeignKey, CheckConstraint, Index, Computed, func, literal_column
+from sqlalchemy.dialects.postgresql import UUID, DATERANGE, ExcludeConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class InventoryHold(Base):
+    """
+    Bloqueo temporal de una unidad mientras el huésped completa la reserva.
+    Caduca en 'expires_at'; las filas vencidas se borran de forma perezosa.
+    """
+    __tablename__ = "inventory_holds"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4
+    )
+    token: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    room_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('rooms.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    room_number: Mapped[str | None] = mapped_column(String(20))
+    check_in_date: Mapped[date] = mapped_column(Date, nullable=False)
+    check_out_date: Mapped[date] = mapped_column(Date, nullable=False)
+    stay = mapped_column(
+        DATERANGE,
+        Computed("daterange(check_in_date, check_out_date, '[)')", persisted=True)
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Quién lo pidió: POST /holds es público y limita los holds vigentes por cliente
+    client_ip: Mapped[str | None] = mapped_column(String(45))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=lambda: datetime.now()
+    )
+
+    __table_args__ = (
+        CheckConstraint('check_out_date > check_in_date', name='check_hold_dates'),
+        Index('ix_inventory_holds_room_expires', 'room_id', 'expires_at'),
+        Index('ix_inventory_holds_client_expires', 'client_ip', 'expires_at'),
+        # Dos holds sobre la misma unidad no pueden solaparse (los vencidos se
+        # borran antes de insertar uno nuevo). Que no solapen reservas activas
+        # (ni al revés) lo comprueban triggers: ver la migración e8f2b4c6a913
+        ExcludeConstraint(
+            ('room_id', '='),
+            (func.coalesce(literal_column('room_number'), literal_column("''")), '='),
+            ('stay', '&&'),
+            name='inventory_holds_no_overlap',
+            using='gist',
+        ),
+    )
@@ -0,0 +1,33 @@
+import uuid
+from datetime import datetime, date
+from decimal import Decimal
+from sqlalchemy import Date, Integer, Numeric, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class DailyKpi(Base):
+    """
+    Noches vendidas, ingreso y llegadas por fecha y tipo de habitación.
+    El ingreso de una reserva se reparte entre sus noches (al céntimo).
+    Lo mantiene el trigger trg_reservations_daily_kpis (migración
+    b5d9f3e7a214); se reconstruye con scripts/rebuild_daily_kpis.py.
+    Ocupación, ADR y RevPAR se derivan al leer (utils/kpis.py).
+    """
+    __tablename__ = "daily_kpis"
+
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    room_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('rooms.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    rooms_sold: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    arrivals: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=lambda: datetime.now(),
+        onupdate=lambda: datetime.now()
+    )
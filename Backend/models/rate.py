@@ -0,0 +1,32 @@
+import uuid
+from datetime import datetime, date
+from decimal import Decimal
+from sqlalchemy import Date, Numeric, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class RoomRate(Base):
+    """
+    Tarifa de una noche concreta para un tipo de habitación.
+    Las noches sin fila usan Room.price_per_night.
+    """
+    __tablename__ = "room_rates"
+
+    room_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('rooms.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    rate: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=lambda: datetime.now(),
+        onupdate=lambda: datetime.now()
+    )
+
+    __table_args__ = (
+        CheckConstraint('rate >= 0', name='check_rate_positive'),
+    )
@@ -2,8 +2,8 @@ import uuid
 from datetime import datetime, date
 from decimal import Decimal
 from enum import Enum
-from sqlalchemy import String, Date, Text, Numeric, Integer, DateTime, Enum as SqlEnum, ForeignKey, CheckConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, Date, Text, Numeric, Integer, DateTime, Enum as SqlEnum, ForeignKey, CheckConstraint, Index, Computed, func, literal_column, text
+from sqlalchemy.dialects.postgresql import UUID, DATERANGE, ExcludeConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from database import Base
 
@@ -36,6 +36,11 @@ class Reservation(Base):
     )
     check_in_date: Mapped[date] = mapped_column(Date, nullable=False)
     check_out_date: Mapped[date] = mapped_column(Date, nullable=False)
+    room_number: Mapped[str | None] = mapped_column(String(20))
+    stay = mapped_column(
+        DATERANGE,
+        Computed("daterange(check_in_date, check_out_date, '[)')", persisted=True)
+    )
     adults: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     children: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     status: Mapped[ReservationStatus] = mapped_column(
@@ -64,6 +69,21 @@ class Reservation(Base):
 
     __table_args__ = (
         CheckConstraint('check_out_date > check_in_date', name='check_dates'),
+        Index('ix_reservations_room_unit_dates', 'room_id', 'room_number', 'check_in_date', 'check_out_date'),
+        # Paginación por keyset de GET /reservations
+        Index('ix_reservations_check_in_id', 'check_in_date', 'id'),
+        # Recarga incremental del snapshot de /dashboard/pace
+        Index('ix_reservations_updated_at', 'updated_at'),
+        # Sin doble reserva: una unidad (o una habitación sin unidades) no puede
+        # tener dos estancias activas que se solapen
+        ExcludeConstraint(
+            ('room_id', '='),
+            (func.coalesce(literal_column('room_number'), literal_column("''")), '='),
+            ('stay', '&&'),
+            name='reservations_no_double_booking',
+            using='gist',
+            where=text("status NOT IN ('cancelled', 'checked_out')"),
+        ),
     )
     
     
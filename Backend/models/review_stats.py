@@ -0,0 +1,57 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import Integer, Numeric, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class RoomReviewStats(Base):
+    """
+    Agregado de las reviews verificadas de un tipo de habitación.
+    Lo mantiene el trigger trg_reviews_stats (migración f1c8e5a3b742) al
+    insertar, verificar, editar o borrar reviews; también actualiza
+    Room.rating y Room.total_reviews. Se guardan sumas y no medias para
+    poder aplicar cada cambio como un delta.
+    """
+    __tablename__ = "room_review_stats"
+
+    room_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('rooms.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    review_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum_overall: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+
+    # Las categorías son opcionales en cada review: suma y cuántas la tienen
+    sum_cleanliness: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    count_cleanliness: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum_comfort: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    count_comfort: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum_location: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    count_location: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum_staff: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    count_staff: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum_value: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    count_value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    recommend_yes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    recommend_answered: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Histograma de rating_overall redondeado a 1..5 estrellas
+    stars_1: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    stars_2: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    stars_3: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    stars_4: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    stars_5: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=lambda: datetime.now(),
+        onupdate=lambda: datetime.now()
+    )
+
+
+REVIEW_CATEGORIES = ("cleanliness", "comfort", "location", "staff", "value")
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import String, DateTime, Enum as SqlEnum
+from sqlalchemy import String, DateTime, Enum as SqlEnum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -46,4 +46,10 @@ class User(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow
+    )
+
+    __table_args__ = (
+        # Paginación por keyset de GET /users
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+        # Índices GIN de búsqueda (pg_trgm): migración e4b7d2a91c55
     )    
\ No newline at end of file
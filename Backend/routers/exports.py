@@ -0,0 +1,143 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, cast, Integer, String
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, datetime, timedelta
+from database import get_db
+from models.reservation import Reservation
+from models.guest import Guest
+from models.room import Room
+from models.payment import Payment
+from auth import require_admin
+import csv
+import io
+import json
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+EXPORT_FORMATS    = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_BATCH_ROWS = 1000
+
+
+def _reservations_export():
+    columns = [
+        Reservation.id, Reservation.check_in_date, Reservation.check_out_date,
+        Reservation.status, Reservation.room_id, Room.name.label("room_name"),
+        Reservation.room_number, Reservation.guest_id,
+        (Guest.first_name + " " + Guest.last_name).label("guest_name"),
+        Guest.email.label("guest_email"), Reservation.adults, Reservation.children,
+        Reservation.subtotal, Reservation.taxes, Reservation.service_fee,
+        Reservation.total_amount, Reservation.created_at, Reservation.updated_at,
+    ]
+    query = (
+        select(*columns)
+        .outerjoin(Guest, Guest.id == Reservation.guest_id)
+        .outerjoin(Room, Room.id == Reservation.room_id)
+    )
+    return query, Reservation.check_in_date, Reservation.id
+
+
+def _guests_export():
+    # Sin password_hash ni notas internas
+    query = select(
+        Guest.id, Guest.first_name, Guest.last_name, Guest.email, Guest.phone,
+        Guest.document_type, Guest.document_number, Guest.date_of_birth,
+        Guest.address, Guest.city, Guest.country, Guest.created_at,
+    )
+    return query, Guest.created_at, Guest.id
+
+
+def _payments_export():
+    query = select(
+        Payment.id, Payment.reservation_id, Payment.method, Payment.status,
+        Payment.amount, Payment.currency, Payment.provider, Payment.provider_txn_id,
+        Payment.card_brand, Payment.card_last4, Payment.paid_at, Payment.created_at,
+    )
+    return query, Payment.created_at, Payment.id
+
+
+# entidad -> función que da (select, columna que filtran from/to, desempate del orden)
+EXPORTS = {
+    "reservations": _reservations_export,
+    "guests":       _guests_export,
+    "payments":     _payments_export,
+}
+
+
+def _as_text(query):
+    """
+    Todas las columnas salvo las enteras se piden ya como texto: PostgreSQL
+    las formatea y el driver no construye UUID, Decimal ni datetime que
+    habría que volver a convertir en texto fila a fila. Los importes quedan
+    exactos también en NDJSON.
+    """
+    return query.with_only_columns(*[
+        column if isinstance(column.type, Integer) else cast(column, String).label(column.name)
+        for column in query.selected_columns
+    ])
+
+
+def _csv_chunks(result, header: list):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(result, header: list):
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for rows in result.partitions():
+        yield "".join(encode(dict(zip(header, row))) + "\n" for row in rows)
+
+
+@router.get("/{entity}")
+def export_entity(
+    entity: str,
+    format: str = Query("csv"),
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Exporta la tabla completa (o el rango [from, to], ambos incluidos) en CSV
+    o NDJSON. Las reservas se filtran por check_in_date; huéspedes y pagos por
+    created_at. Las filas se leen con un cursor de servidor por lotes de
+    EXPORT_BATCH_ROWS y se envían según llegan, así que la memoria no crece
+    con el tamaño de la exportación.
+    """
+    if entity not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{entity}'. Options: {list(EXPORTS)}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+    if from_date and to_date and to_date < from_date:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+
+    query, date_column, id_column = EXPORTS[entity]()
+    # En columnas de fecha y hora, 'to' incluye todo ese día
+    is_timestamp = date_column.type.python_type is datetime
+    if from_date:
+        query = query.where(date_column >= from_date)
+    if to_date:
+        query = query.where(date_column < to_date + timedelta(days=1) if is_timestamp else date_column <= to_date)
+    query = query.order_by(date_column, id_column)
+
+    # Core y no ORM: filas planas sin pasar por la capa de entidades
+    query  = _as_text(query).execution_options(yield_per=EXPORT_BATCH_ROWS)
+    result = db.connection().execute(query)
+    header = list(result.keys())
+    chunks = (_csv_chunks if format == "csv" else _ndjson_chunks)(result, header)
+
+    period   = f"_{from_date or 'start'}_{to_date or date.today()}" if from_date or to_date else ""
+    filename = f"{entity}{period}.{format}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
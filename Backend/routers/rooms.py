@@ -1,12 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.dialects.postgresql import insert
+from pydantic import BaseModel, Field
 from typing import Optional
-from datetime import datetime
-from database import get_db
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from database import get_async_db, get_db
 from models.room import Room, RoomUnit
-from auth import get_current_user
+from models.rate import RoomRate
+from auth import get_current_user, require_admin
+from utils.availability_index import availability_index
+from utils.assignment import reoptimize_room
+from utils.room_catalog import room_catalog
 import uuid
+import json
 import re
 
 router = APIRouter(prefix="/rooms-admin", tags=["rooms-admin"])
@@ -21,6 +31,15 @@ class RoomUnitCreate(BaseModel):
     status: str = "available"
     notes: Optional[str] = None
 
+class RoomRateUpdate(BaseModel):
+    start_date: date
+    end_date: date          # exclusiva, como check_out_date
+    rate: Decimal = Field(..., ge=0, max_digits=10, decimal_places=2)
+
+RATE_MAX_RANGE_DAYS = 366
+TIMELINE_MAX_DAYS   = 92
+TIMELINE_BATCH_ROWS = 500
+
 
 def slug_to_title(slug: str) -> str:
     return ' '.join(word.capitalize() for word in slug.split('-'))
@@ -83,66 +102,61 @@ def build_room_numbers(rooms: list) -> dict:
 
 
 @router.get("")
-def get_rooms(
+async def get_rooms(
     floor: str = Query(None),
     status: str = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    try:
-        query = db.query(Room).filter(Room.is_active == True)
+    query = select(Room).options(selectinload(Room.amenities)).where(Room.is_active == True)
 
-        if floor and floor != "All":
-            query = query.filter(Room.floor == floor)
+    if floor and floor != "All":
+        query = query.where(Room.floor == floor)
 
-        rooms = query.order_by(Room.floor, Room.name).all()
-        room_numbers_by_type = build_room_numbers(rooms)
-        result = []
+    result = await db.execute(query.order_by(Room.floor, Room.name))
+    rooms  = result.scalars().all()
+    room_numbers_by_type = build_room_numbers(rooms)
+    result = []
 
-        for room in rooms:
-            room_data = {
-                "id": str(room.id),
-                "room_type_id": str(room.id),
-                "name": room.name,
-                "slug": room.slug,
-                "type": slug_to_title(room.slug),
-                "status": room.status,
-                "price_per_night": float(room.price_per_night),
-                "floor": room.floor,
-                "view_type": room.view_type,
-                "max_guests": room.max_guests,
-                "image_url": room.image_url,
-                "amenities": [a.label for a in room.amenities],
-                "size_m2": room.size_m2,
-                "rating": float(room.rating) if room.rating else 0.0,
-                "quantity": room.quantity or 1,
-                "room_numbers": room_numbers_by_type.get(str(room.id), []),
-            }
-            result.append(room_data)
+    for room in rooms:
+        room_data = {
+            "id": str(room.id),
+            "room_type_id": str(room.id),
+            "name": room.name,
+            "slug": room.slug,
+            "type": slug_to_title(room.slug),
+            "status": room.status,
+            "price_per_night": float(room.price_per_night),
+            "floor": room.floor,
+            "view_type": room.view_type,
+            "max_guests": room.max_guests,
+            "image_url": room.image_url,
+            "amenities": [a.label for a in room.amenities],
+            "size_m2": room.size_m2,
+            "rating": float(room.rating) if room.rating else 0.0,
+            "quantity": room.quantity or 1,
+            "room_numbers": room_numbers_by_type.get(str(room.id), []),
+        }
+        result.append(room_data)
 
-        if status and status != "All":
-            result = [r for r in result if r["status"] == status.lower()]
+    if status and status != "All":
+        result = [r for r in result if r["status"] == status.lower()]
 
-        return {"data": result, "total": len(result)}
-    except Exception:
-        import traceback
-        print("ERROR EN /rooms-admin:", traceback.format_exc())
-        raise
+    return {"data": result, "total": len(result)}
 
 
 @router.get("/stats")
-def get_room_stats(
-    db: Session = Depends(get_db),
+async def get_room_stats(
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    from sqlalchemy import func
-    rows = (
-        db.query(RoomUnit.status, func.count(RoomUnit.id))
+    result = await db.execute(
+        select(RoomUnit.status, func.count(RoomUnit.id))
         .join(Room, RoomUnit.room_id == Room.id)
-        .filter(Room.is_active == True)
+        .where(Room.is_active == True)
         .group_by(RoomUnit.status)
-        .all()
     )
+    rows = result.all()
     stats = {"available": 0, "occupied": 0, "maintenance": 0, "cleaning": 0, "total": 0}
     for status, count in rows:
         if status in stats:
@@ -152,18 +166,178 @@ def get_room_stats(
 
 
 @router.get("/floors")
-def get_floors(
-    db: Session = Depends(get_db),
+async def get_floors(
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    floors = db.query(Room.floor).filter(
-        Room.is_active == True,
-        Room.floor != None
-    ).distinct().order_by(Room.floor).all()
+    result = await db.execute(
+        select(Room.floor).where(
+            Room.is_active == True,
+            Room.floor != None
+        ).distinct().order_by(Room.floor)
+    )
+    floors = result.all()
 
     return {"floors": ["All"] + [f[0] for f in floors if f[0]]}
 
 
+# ============ TIMELINE ============
+
+def encode_runs(stays: list, start: date, days: int) -> list:
+    """
+    Fila de la parrilla codificada por tramos: [[noches, i], ...] cubriendo
+    los 'days' días desde 'start', con i el índice en 'stays' o None si la
+    unidad está libre. 'stays' va ordenado por check_in; si dos estancias
+    se pisan (una ya en checked_out), manda la primera.
+    """
+    runs, cursor = [], 0
+    for i, stay in enumerate(stays):
+        first = max((stay["check_in"] - start).days, cursor)
+        last  = min((stay["check_out"] - start).days, days)
+        if last <= first:
+            continue
+        if first > cursor:
+            runs.append([first - cursor, None])
+        runs.append([last - first, i])
+        cursor = last
+    if cursor < days:
+        runs.append([days - cursor, None])
+    return runs
+
+
+def _timeline_lane(head, stays: list, start: date, days: int) -> dict:
+    lane = {
+        "room_id":     str(head.room_id),
+        "room_name":   head.room_name,
+        "floor":       head.floor,
+        "unit_number": head.unit_number,
+        "status":      head.unit_status,
+    }
+    encoded = [
+        {
+            "id":        str(s["id"]),
+            "guest":     s["guest"],
+            "status":    s["status"],
+            "check_in":  s["check_in"].isoformat(),
+            "check_out": s["check_out"].isoformat(),
+        }
+        for s in stays
+    ]
+    if head.unit_number is None:
+        # Reservas sin unidad asignada: pueden solaparse, van como lista
+        lane["stays"] = encoded
+    else:
+        lane["runs"], lane["stays"] = encode_runs(stays, start, days), encoded
+    return lane
+
+
+@router.get("/timeline")
+def get_timeline(
+    from_date: Optional[date] = Query(None, alias="from"),
+    days: int = Query(14, ge=1, le=TIMELINE_MAX_DAYS),
+    room_id: Optional[uuid.UUID] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Parrilla unidad × día para recepción: cada unidad con sus estancias en
+    [from, from + days) codificadas por tramos (ver encode_runs), más una
+    fila por tipo con las reservas aún sin unidad. Una sola consulta por
+    rango, leída por lotes y enviada en streaming unidad a unidad.
+    """
+    start = from_date or date.today()
+    end   = start + timedelta(days=days)
+    room_filter = "AND ro.id = :room_id" if room_id else ""
+
+    result = db.execute(
+        text(f"""
+            SELECT ro.id AS room_id, ro.name AS room_name, ro.floor,
+                   u.unit_number, u.status AS unit_status,
+                   res.id AS reservation_id, res.check_in_date, res.check_out_date,
+                   res.status AS reservation_status,
+                   g.first_name || ' ' || g.last_name AS guest
+            FROM room_units u
+            JOIN rooms ro ON ro.id = u.room_id
+            LEFT JOIN reservations res
+                   ON res.room_id = u.room_id
+                  AND res.room_number = u.unit_number
+                  AND res.status <> 'cancelled'
+                  AND res.check_in_date < :end AND res.check_out_date > :start
+            LEFT JOIN guests g ON g.id = res.guest_id
+            WHERE ro.is_active = true {room_filter}
+            UNION ALL
+            SELECT ro.id, ro.name, ro.floor, NULL, NULL,
+                   res.id, res.check_in_date, res.check_out_date, res.status,
+                   g.first_name || ' ' || g.last_name
+            FROM reservations res
+            JOIN rooms ro ON ro.id = res.room_id
+            JOIN guests g ON g.id = res.guest_id
+            WHERE ro.is_active = true {room_filter}
+              AND res.status <> 'cancelled'
+              AND res.check_in_date < :end AND res.check_out_date > :start
+              AND NOT EXISTS (
+                  SELECT 1 FROM room_units u
+                  WHERE u.room_id = res.room_id AND u.unit_number = res.room_number
+              )
+            ORDER BY room_name, room_id, unit_number NULLS LAST, check_in_date
+        """).execution_options(yield_per=TIMELINE_BATCH_ROWS),
+        {"start": start, "end": end, "room_id": room_id},
+    )
+
+    def stream():
+        yield json.dumps({"from": start.isoformat(), "days": days})[:-1] + ', "lanes": ['
+        head, stays, separator = None, [], ""
+        for row in result:
+            if head is not None and (row.room_id, row.unit_number) != (head.room_id, head.unit_number):
+                yield separator + json.dumps(_timeline_lane(head, stays, start, days))
+                stays, separator = [], ","
+            head = row
+            if row.reservation_id is not None:
+                stays.append({
+                    "id":        row.reservation_id,
+                    "guest":     row.guest,
+                    "status":    getattr(row.reservation_status, "value", row.reservation_status),
+                    "check_in":  row.check_in_date,
+                    "check_out": row.check_out_date,
+                })
+        if head is not None:
+            yield separator + json.dumps(_timeline_lane(head, stays, start, days))
+        yield "]}"
+
+    return StreamingResponse(stream(), media_type="application/json")
+
+
+@router.get("/availability-index/check")
+def check_availability_index(
+    repair: bool = Query(True),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """Compara el índice de disponibilidad en memoria con la BD y opcionalmente lo repara."""
+    issues = availability_index.check_consistency(db, repair=repair)
+    return {"consistent": not issues, "issues": issues, **availability_index.stats()}
+
+
+@router.post("/{room_id}/assignments/reoptimize")
+def reoptimize_room_assignments(
+    room_id: uuid.UUID,
+    apply: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Reasigna unidades de las estancias futuras para reducir huecos sueltos.
+    Por defecto solo devuelve el plan (moves + fragmentación antes/después);
+    ?apply=true lo guarda.
+    """
+    if not db.query(Room.id).filter(Room.id == room_id).first():
+        raise HTTPException(status_code=404, detail="Room not found")
+    result = reoptimize_room(db, room_id, apply=apply)
+    if not result["feasible"]:
+        raise HTTPException(status_code=409, detail="Current stays do not fit in the available units")
+    return result
+
+
 @router.patch("/{room_type_id}/status")
 def update_room_status(
     room_type_id: str,
@@ -184,21 +358,22 @@ def update_room_status(
     room.status = new_status
     db.commit()
     db.refresh(room)
+    room_catalog.bump()
     return {"ok": True, "status": room.status}
 
 
 @router.get("/{room_id}/units")
-def get_room_units(
+async def get_room_units(
     room_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    units = (
-        db.query(RoomUnit)
-        .filter(RoomUnit.room_id == room_id)
+    result = await db.execute(
+        select(RoomUnit)
+        .where(RoomUnit.room_id == room_id)
         .order_by(RoomUnit.unit_number)
-        .all()
     )
+    units = result.scalars().all()
     return [
         {
             "id": str(u.id),
@@ -236,6 +411,8 @@ def create_room_unit(
     db.add(unit)
     db.commit()
     db.refresh(unit)
+    availability_index.invalidate(room_id)
+    room_catalog.bump()
     return {"id": str(unit.id), "unit_number": unit.unit_number, "status": unit.status}
 
 
@@ -263,6 +440,8 @@ def update_unit_status(
 
     db.commit()
     db.refresh(unit)
+    availability_index.set_unit_status(unit.room_id, unit.unit_number, unit.status)
+    room_catalog.bump()
     return {"id": str(unit.id), "unit_number": unit.unit_number, "status": unit.status}
 
 
@@ -275,5 +454,99 @@ def delete_room_unit(
     unit = db.query(RoomUnit).filter(RoomUnit.id == unit_id).first()
     if not unit:
         raise HTTPException(status_code=404, detail="Unit not found")
+    room_id = unit.room_id
     db.delete(unit)
     db.commit()
+    availability_index.invalidate(room_id)
+    room_catalog.bump()
+
+
+# ============ RATE CALENDAR ============
+
+def _rate_range(start: date, end: date):
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    if (end - start).days > RATE_MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {RATE_MAX_RANGE_DAYS} days")
+
+
+@router.get("/{room_id}/rates")
+async def get_room_rates(
+    room_id: uuid.UUID,
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Tarifa de cada noche en [start_date, end_date); por defecto los próximos 30 días."""
+    room = await db.get(Room, room_id)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    start = start_date or date.today()
+    end   = end_date or start + timedelta(days=30)
+    _rate_range(start, end)
+
+    result = await db.execute(
+        select(RoomRate.date, RoomRate.rate)
+        .where(RoomRate.room_id == room_id, RoomRate.date >= start, RoomRate.date < end)
+    )
+    custom = dict(result.all())
+    nights = [start + timedelta(days=i) for i in range((end - start).days)]
+    return {
+        "room_id":   str(room_id),
+        "base_rate": float(room.price_per_night),
+        "rates": [
+            {
+                "date":   str(night),
+                "rate":   float(custom.get(night, room.price_per_night)),
+                "custom": night in custom,
+            }
+            for night in nights
+        ],
+    }
+
+
+@router.put("/{room_id}/rates")
+def set_room_rates(
+    room_id: uuid.UUID,
+    body: RoomRateUpdate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """Fija la misma tarifa para todas las noches de [start_date, end_date)."""
+    _rate_range(body.start_date, body.end_date)
+    if not db.query(Room.id).filter(Room.id == room_id).first():
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    now  = datetime.now()
+    rows = [
+        {"room_id": room_id, "date": body.start_date + timedelta(days=i), "rate": body.rate, "updated_at": now}
+        for i in range((body.end_date - body.start_date).days)
+    ]
+    stmt = insert(RoomRate).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[RoomRate.room_id, RoomRate.date],
+        set_={"rate": stmt.excluded.rate, "updated_at": stmt.excluded.updated_at},
+    ))
+    db.commit()
+    return {"ok": True, "updated": len(rows)}
+
+
+@router.delete("/{room_id}/rates")
+def delete_room_rates(
+    room_id: uuid.UUID,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """Vuelve al precio base (price_per_night) en [start_date, end_date)."""
+    _rate_range(start_date, end_date)
+    deleted = db.query(RoomRate).filter(
+        RoomRate.room_id == room_id,
+        RoomRate.date >= start_date,
+        RoomRate.date < end_date,
+    ).delete(synchronize_session=False)
+    db.commit()
+    return {"ok": True, "deleted": deleted}
@@ -44,11 +44,15 @@ class PaginationParams(BaseModel):
 
 
 class PaginatedUserResponse(BaseModel):
-    total: int
-    page: int
+    total: Optional[int]
+    page: Optional[int]
     limit: int
-    total_pages: int
+    total_pages: Optional[int]
     data: List[UserResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    total_is_estimate: bool = False
+    total_source: Optional[str] = None
 
 
 # ============ GUEST SCHEMAS ============
@@ -86,11 +90,15 @@ class GuestResponse(BaseModel):
 
 
 class PaginatedGuestResponse(BaseModel):
-    total: int
-    page: int
+    total: Optional[int]
+    page: Optional[int]
     limit: int
-    total_pages: int
+    total_pages: Optional[int]
     data: List[GuestResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    total_is_estimate: bool = False
+    total_source: Optional[str] = None
 
 
 # ============ ROOM SCHEMAS ============
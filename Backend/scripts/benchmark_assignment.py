@@ -0,0 +1,124 @@
+"""
+Replays a year of synthetic bookings against the unit assignment strategies
+(utils/assignment.py) and reports rooms sold and solver time.
+
+    python scripts/benchmark_assignment.py --units 20 --demand 1.1
+
+Runs fully in memory (no database), but importing the backend still needs
+the usual .env variables.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from utils.assignment import (
+    ASSIGNMENT_STRATEGIES, fragmentation, plan_assignments, unit_candidates,
+)
+from utils.availability_index import _IntervalBucket
+
+# Duración de estancia (noches) y su peso relativo
+STAY_LENGTHS = np.array([1, 2, 3, 4, 5, 6, 7, 10, 14])
+STAY_WEIGHTS = np.array([22, 22, 16, 10, 8, 5, 9, 5, 3], dtype=float)
+STAY_WEIGHTS /= STAY_WEIGHTS.sum()
+MAX_LEAD_DAYS = 90
+
+
+def generate_requests(units: int, days: int, demand: float, seed: int) -> list[tuple[int, int, int]]:
+    """(reservado_el, check_in, noches) ordenados por el día en que se reservan."""
+    rng = np.random.default_rng(seed)
+    mean_nights = float((STAY_LENGTHS * STAY_WEIGHTS).sum())
+    arrivals = rng.poisson(units * demand / mean_nights, size=days)
+
+    check_ins = np.repeat(np.arange(days), arrivals)
+    nights    = rng.choice(STAY_LENGTHS, size=len(check_ins), p=STAY_WEIGHTS)
+    # Plazo de antelación con más peso en las reservas de última hora
+    leads     = np.minimum(rng.exponential(21, size=len(check_ins)).astype(int), MAX_LEAD_DAYS)
+    booked_at = check_ins - leads
+    order     = np.lexsort((rng.random(len(check_ins)), booked_at))
+    return [(int(booked_at[i]), int(check_ins[i]), int(nights[i])) for i in order]
+
+
+def replay(requests, units: int, days: int, strategy, reoptimize: bool = False) -> dict:
+    unit_list = [(f"{100 + i + 1}", "available") for i in range(units)]
+    buckets   = {number: _IntervalBucket() for number, _ in unit_list}
+    stays     = {}      # rid -> (unit_number, check_in, check_out)
+    timings   = []
+    rejected  = 0
+    reoptimized = 0
+
+    for rid, (booked_at, check_in, nights) in enumerate(requests):
+        check_out = check_in + nights
+        started   = time.perf_counter()
+        candidates = unit_candidates(buckets, unit_list, check_in, check_out)
+        number = strategy.choose(candidates, check_in, check_out, booked_at) if candidates else None
+
+        if number is None and reoptimize:
+            # Reparte de nuevo las estancias que aún no han empezado, con la nueva incluida
+            fixed   = [(r, u, ci, co) for r, (u, ci, co) in stays.items() if ci <= booked_at]
+            movable = [(r, u, ci, co) for r, (u, ci, co) in stays.items() if ci > booked_at]
+            plan = plan_assignments(unit_list, fixed, movable + [(rid, None, check_in, check_out)], strategy, booked_at)
+            if plan is not None:
+                reoptimized += 1
+                for r, unit in plan.items():
+                    if r != rid:
+                        stays[r] = (unit, stays[r][1], stays[r][2])
+                buckets = {n: _IntervalBucket() for n, _ in unit_list}
+                for r, (unit, ci, co) in stays.items():
+                    buckets[unit].add(ci, co, r)
+                number = plan[rid]
+
+        timings.append(time.perf_counter() - started)
+        if number is None:
+            rejected += 1
+            continue
+        buckets[number].add(check_in, check_out, rid)
+        stays[rid] = (number, check_in, check_out)
+
+    sold = sum(max(0, min(co, days) - max(ci, 0)) for _, ci, co in stays.values())
+    timings = np.array(timings) * 1e6
+    return {
+        "accepted":    len(stays),
+        "rejected":    rejected,
+        "sold":        sold,
+        "occupancy":   sold / (units * days),
+        "orphans":     fragmentation([(r, u, ci, co) for r, (u, ci, co) in stays.items()], 0)["orphan_nights"],
+        "reoptimized": reoptimized,
+        "mean_us":     float(timings.mean()),
+        "p99_us":      float(np.percentile(timings, 99)),
+        "total_s":     float(timings.sum() / 1e6),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--units", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--demand", type=float, default=1.1, help="room-nights requested / capacity")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    requests = generate_requests(args.units, args.days, args.demand, args.seed)
+    requested = sum(nights for _, _, nights in requests)
+    print(f"{len(requests)} requests, {requested} room-nights requested, "
+          f"capacity {args.units * args.days} room-nights\n")
+
+    header = f"{'strategy':<28}{'accepted':>9}{'rejected':>9}{'sold':>8}{'occ.':>7}{'orphan n.':>10}{'mean µs':>9}{'p99 µs':>9}{'total s':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, strategy_cls in ASSIGNMENT_STRATEGIES.items():
+        for reoptimize in (False, True):
+            label = name + (" + reoptimize" if reoptimize else "")
+            r = replay(requests, args.units, args.days, strategy_cls(), reoptimize)
+            print(f"{label:<28}{r['accepted']:>9}{r['rejected']:>9}{r['sold']:>8}{r['occupancy']:>7.1%}"
+                  f"{r['orphans']:>10}{r['mean_us']:>9.1f}{r['p99_us']:>9.1f}{r['total_s']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Compares the sync database stack (Session on FastAPI's threadpool) with the
+async one (AsyncSession + asyncpg) under many concurrent requests.
+
+    python scripts/benchmark_async.py --concurrency 200 --requests 4000 --latency-ms 5
+
+Every request runs the booked-units query behind /availability/search against
+the database from .env. The sync path goes through anyio.to_thread.run_sync,
+which is what FastAPI does for `def` routes (40 threads by default); the async
+path awaits the query on the event loop, like the `async def` routes.
+--latency-ms adds a pg_sleep per request to stand in for network/disk latency
+on a local Postgres. Both engines get the same pool, so the pool is not what
+makes the difference.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import anyio
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import settings
+
+BOOKED_UNITS_SQL = text("""
+    SELECT r.id, COUNT(res.id) AS booked
+    FROM rooms r
+    LEFT JOIN reservations res
+           ON res.room_id = r.id
+          AND res.status NOT IN ('cancelled', 'checked_out')
+          AND res.stay && daterange(:check_in, :check_out, '[)')
+    WHERE r.is_active = true
+    GROUP BY r.id
+""")
+SLEEP_SQL = text("SELECT pg_sleep(:seconds)")
+
+
+def stay_for(i: int) -> dict:
+    check_in = date.today() + timedelta(days=i % 180)
+    return {"check_in": check_in, "check_out": check_in + timedelta(days=1 + i % 5)}
+
+
+def sync_request(engine, i: int, latency: float):
+    with Session(engine) as db:
+        if latency:
+            db.execute(SLEEP_SQL, {"seconds": latency})
+        return db.execute(BOOKED_UNITS_SQL, stay_for(i)).fetchall()
+
+
+async def async_request(engine, i: int, latency: float):
+    async with AsyncSession(engine) as db:
+        if latency:
+            await db.execute(SLEEP_SQL, {"seconds": latency})
+        return (await db.execute(BOOKED_UNITS_SQL, stay_for(i))).fetchall()
+
+
+async def drive(call, requests: int, concurrency: int) -> dict:
+    """Lanza 'requests' llamadas con como mucho 'concurrency' a la vez."""
+    limit   = asyncio.Semaphore(concurrency)
+    latency = []
+
+    async def one(i: int):
+        async with limit:
+            started = time.perf_counter()
+            await call(i)
+            latency.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    latency = np.array(latency) * 1000
+    return {
+        "rps":     requests / elapsed,
+        "p50_ms":  float(np.percentile(latency, 50)),
+        "p95_ms":  float(np.percentile(latency, 95)),
+        "p99_ms":  float(np.percentile(latency, 99)),
+        "total_s": elapsed,
+    }
+
+
+async def run(args) -> None:
+    pool    = {"pool_size": args.pool_size, "max_overflow": args.max_overflow, "pool_timeout": 60}
+    latency = args.latency_ms / 1000
+    threads = anyio.to_thread.current_default_thread_limiter().total_tokens
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"pool {args.pool_size}+{args.max_overflow}, {threads} threadpool threads, "
+          f"+{args.latency_ms} ms per request\n")
+    header = f"{'stack':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'total s':>10}"
+    print(header)
+    print("-" * len(header))
+
+    # Un engine cada vez: con los dos abiertos se suman sus conexiones
+    sync_engine = create_engine(settings.DATABASE_URL, **pool)
+    try:
+        r = await measure(
+            lambda i: anyio.to_thread.run_sync(sync_request, sync_engine, i, latency), args
+        )
+    finally:
+        sync_engine.dispose()
+    report("sync", r)
+
+    async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **pool)
+    try:
+        r = await measure(lambda i: async_request(async_engine, i, latency), args)
+    finally:
+        await async_engine.dispose()
+    report("async", r)
+
+
+async def measure(call, args) -> dict:
+    await drive(call, min(args.requests, args.concurrency), args.concurrency)  # abre el pool
+    return await drive(call, args.requests, args.concurrency)
+
+
+def report(label: str, r: dict) -> None:
+    print(f"{label:<8}{r['rps']:>10.0f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+          f"{r['p99_ms']:>10.1f}{r['total_s']:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=50)
+    parser.add_argument("--max-overflow", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="pg_sleep added to every request")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Measures login throughput with bcrypt run inline on the threadpool (how the
+old `def` login routes did it) against the PasswordHasher process pool
+(utils/passwords.py), and how much a login burst slows down other requests.
+
+    python scripts/benchmark_login.py --logins 200 --concurrency 50 --workers 2
+
+While the burst runs, a probe issues a cheap request every 10 ms, both as a
+`def` route would (through the threadpool) and as an `async def` route would
+(event loop only), and reports its latency. Logins refused with 503 by the
+pool's admission limit are counted, not retried. No database needed, but
+importing the backend still needs the usual .env variables.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import anyio
+import numpy as np
+from fastapi import HTTPException
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from utils.passwords import PasswordHasher, bcrypt_hash, bcrypt_verify
+
+PROBE_INTERVAL = 0.01
+
+
+async def probe(stop: asyncio.Event, through_threadpool: bool) -> list[float]:
+    latency = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        if through_threadpool:
+            await anyio.to_thread.run_sync(lambda: None)
+        else:
+            await asyncio.sleep(0)
+        latency.append(time.perf_counter() - started)
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latency
+
+
+async def burst(login, logins: int, concurrency: int, through_threadpool: bool) -> dict:
+    limit    = asyncio.Semaphore(concurrency)
+    stop     = asyncio.Event()
+    latency  = []
+    rejected = 0
+
+    async def one():
+        nonlocal rejected
+        async with limit:
+            started = time.perf_counter()
+            try:
+                await login()
+            except HTTPException:
+                rejected += 1
+                return
+            latency.append(time.perf_counter() - started)
+
+    prober  = asyncio.create_task(probe(stop, through_threadpool))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    probes  = np.array(await prober) * 1000
+    latency = np.array(latency or [0.0]) * 1000
+    return {
+        "logins_s":  (logins - rejected) / elapsed,
+        "rejected":  rejected,
+        "p95_ms":    float(np.percentile(latency, 95)),
+        "probe_p95": float(np.percentile(probes, 95)) if len(probes) else 0.0,
+        "probe_max": float(probes.max()) if len(probes) else 0.0,
+    }
+
+
+def report(label: str, r: dict) -> None:
+    print(f"{label:<18}{r['logins_s']:>10.1f}{r['rejected']:>10}{r['p95_ms']:>10.0f}"
+          f"{r['probe_p95']:>14.1f}{r['probe_max']:>12.1f}")
+
+
+async def run(args) -> None:
+    hashed = bcrypt_hash("benchmark-password", args.rounds)
+    hasher = PasswordHasher(workers=args.workers, max_pending=args.max_pending, rounds=args.rounds)
+
+    async def inline_login():
+        await anyio.to_thread.run_sync(bcrypt_verify, "benchmark-password", hashed)
+
+    async def pooled_login():
+        await hasher.verify("benchmark-password", hashed)
+
+    await pooled_login()    # arranca los procesos fuera de la medición
+    print(f"{args.logins} logins, concurrency {args.concurrency}, bcrypt cost {args.rounds}, "
+          f"{args.workers} hash processes, max pending {args.max_pending}\n")
+    header = f"{'path':<18}{'logins/s':>10}{'503s':>10}{'p95 ms':>10}{'probe p95 ms':>14}{'probe max':>12}"
+    print(header)
+    print("-" * len(header))
+    try:
+        for through_threadpool in (True, False):
+            kind = "def" if through_threadpool else "async"
+            report(f"inline, {kind} probe", await burst(inline_login, args.logins, args.concurrency, through_threadpool))
+            report(f"pool, {kind} probe", await burst(pooled_login, args.logins, args.concurrency, through_threadpool))
+    finally:
+        hasher.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
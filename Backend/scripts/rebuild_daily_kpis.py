@@ -0,0 +1,46 @@
+"""
+Rebuilds the daily_kpis rollup from reservations.
+
+    python scripts/rebuild_daily_kpis.py                      # everything
+    python scripts/rebuild_daily_kpis.py --start 2026-01-01 --end 2026-02-01
+
+--end is exclusive. Writes to reservations wait while it runs.
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from database import SessionLocal
+from utils.kpis import rebuild_daily_kpis
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    if args.start and args.end and args.end <= args.start:
+        parser.error("--end must be after --start")
+
+    db = SessionLocal()
+    try:
+        # La reconstrucción completa puede superar DB_STATEMENT_TIMEOUT_MS
+        db.execute(text("SET statement_timeout = 0"))
+        started = time.perf_counter()
+        written = rebuild_daily_kpis(db, args.start, args.end)
+        print(f"[rebuild_daily_kpis] {written} rows written in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
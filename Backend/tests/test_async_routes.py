@@ -0,0 +1,54 @@
+"""Los listados async (AsyncSession + asyncpg) responden igual que cuando eran síncronos."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from models.guest import Guest
+from models.rate import RoomRate
+from models.room import Room, RoomUnit
+from models.user import User
+
+
+@pytest.fixture
+def catalog(db):
+    room = Room(slug="async-room", name="Async Room", price_per_night=Decimal("120.00"), floor="2", quantity=2)
+    db.add(room)
+    db.flush()
+    db.add_all([
+        RoomUnit(room_id=room.id, unit_number="201"),
+        RoomUnit(room_id=room.id, unit_number="202", status="cleaning"),
+        RoomRate(room_id=room.id, date=date.today(), rate=Decimal("150.00")),
+        Guest(first_name="Async", last_name="Guest", email="async@example.com", phone="600000000"),
+        User(name="Async Admin", email="async-admin@example.com", password_hash="x", role="admin"),
+    ])
+    db.commit()
+    yield room
+    db.execute(text("TRUNCATE room_rates, room_units, rooms, guests, users CASCADE"))
+    db.commit()
+
+
+def test_listings_run_on_the_async_session(client, catalog, admin_headers):
+    users = client.get("/users", headers=admin_headers).json()
+    assert [user["email"] for user in users["data"]] == ["async-admin@example.com"]
+
+    guests = client.get("/guests", params={"search": "async"}).json()
+    assert guests["total"] == 1 and guests["data"][0]["email"] == "async@example.com"
+
+    rooms = client.get("/rooms-admin", headers=admin_headers).json()
+    assert rooms["total"] == 1 and rooms["data"][0]["room_numbers"] == ["201", "202"]
+
+    stats = client.get("/rooms-admin/stats", headers=admin_headers).json()
+    assert (stats["available"], stats["cleaning"], stats["total"]) == (1, 1, 2)
+
+    assert client.get("/rooms-admin/floors", headers=admin_headers).json() == {"floors": ["All", "2"]}
+
+    units = client.get(f"/rooms-admin/{catalog.id}/units", headers=admin_headers).json()
+    assert [unit["unit_number"] for unit in units] == ["201", "202"]
+
+    rates = client.get(
+        f"/rooms-admin/{catalog.id}/rates", headers=admin_headers,
+        params={"start_date": str(date.today()), "end_date": str(date.today() + timedelta(days=2))},
+    ).json()
+    assert [(night["rate"], night["custom"]) for night in rates["rates"]] == [(150.0, True), (120.0, False)]
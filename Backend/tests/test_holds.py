@@ -0,0 +1,78 @@
+"""Los holds públicos tienen un cupo por cliente y la reoptimización no mueve reservas encima de ellos."""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from models.guest import Guest
+from models.hold import InventoryHold
+from models.reservation import Reservation, ReservationStatus
+from models.room import Room, RoomUnit
+from utils.assignment import reoptimize_room
+from utils.holds import hold_registry
+
+UNITS = ("101", "102", "103", "104")
+
+
+@pytest.fixture
+def room(db):
+    room = Room(slug="hold-room", name="Hold Room", price_per_night=Decimal("100.00"), quantity=len(UNITS))
+    db.add(room)
+    db.flush()
+    db.add_all(RoomUnit(room_id=room.id, unit_number=number) for number in UNITS)
+    db.commit()
+    yield room
+    db.rollback()
+    db.execute(text("TRUNCATE inventory_holds, reservations, guests, room_units, rooms CASCADE"))
+    db.commit()
+
+
+def _hold(db, room, client_ip, nights_from=10):
+    import main
+
+    check_in = date.today() + timedelta(days=nights_from)
+    payload  = main.HoldCreate(room_id=room.id, check_in_date=check_in, check_out_date=check_in + timedelta(days=2))
+    return main._create_hold(db, payload, client_ip)
+
+
+def test_holds_are_capped_per_client(db, room, monkeypatch):
+    monkeypatch.setattr(hold_registry, "max_per_client_room", 2)
+
+    _hold(db, room, "203.0.113.7")
+    _hold(db, room, "203.0.113.7")
+    with pytest.raises(HTTPException) as exc:
+        _hold(db, room, "203.0.113.7")
+    assert exc.value.status_code == 429
+    db.rollback()
+
+    # Otra IP tiene su propio cupo
+    assert _hold(db, room, "198.51.100.4").room_number
+
+
+def test_reoptimize_does_not_move_stays_onto_held_units(db, room):
+    guest = Guest(first_name="Hold", last_name="Test", email="hold@example.com", phone="600000000")
+    db.add(guest)
+    db.flush()
+    check_in = date.today() + timedelta(days=10)
+    db.add(Reservation(
+        guest_id=guest.id, room_id=room.id, room_number="104",
+        check_in_date=check_in, check_out_date=check_in + timedelta(days=2),
+        status=ReservationStatus.confirmed, total_amount=Decimal("200.00"),
+    ))
+    db.commit()
+
+    # Sin holds, la estancia sola en 104 se movería a 101
+    assert reoptimize_room(db, room.id)["moves"]
+
+    db.add_all(
+        InventoryHold(
+            token=f"test-hold-{number}", room_id=room.id, room_number=number,
+            check_in_date=check_in, check_out_date=check_in + timedelta(days=2),
+            expires_at=datetime.now() + timedelta(minutes=10),
+        )
+        for number in UNITS[:3]
+    )
+    db.commit()
+    assert reoptimize_room(db, room.id)["moves"] == []
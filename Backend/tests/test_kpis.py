@@ -0,0 +1,37 @@
+"""Ocupación, ADR y RevPAR cuentan solo las habitaciones activas, igual que la capacidad."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from models.kpi import DailyKpi
+from models.room import Room
+from utils.kpis import kpi_series
+
+NIGHT = date(2031, 5, 4)
+
+
+@pytest.fixture
+def rollup(db):
+    active   = Room(slug="kpi-active", name="Active", price_per_night=Decimal("100.00"), quantity=1)
+    inactive = Room(slug="kpi-inactive", name="Inactive", price_per_night=Decimal("200.00"), quantity=1, is_active=False)
+    db.add_all([active, inactive])
+    db.flush()
+    db.add_all([
+        DailyKpi(date=NIGHT, room_id=active.id, rooms_sold=1, revenue=Decimal("100.00"), arrivals=1),
+        DailyKpi(date=NIGHT, room_id=inactive.id, rooms_sold=1, revenue=Decimal("200.00"), arrivals=1),
+    ])
+    db.commit()
+    yield
+    db.execute(text("TRUNCATE daily_kpis, rooms CASCADE"))
+    db.commit()
+
+
+def test_deactivated_rooms_do_not_push_occupancy_over_capacity(db, client, rollup):
+    [night] = kpi_series(db, NIGHT, NIGHT)
+    assert (night["revenue"], night["rooms_sold"], night["occupancy"]) == (300.0, 1, 100.0)
+    assert (night["adr"], night["revpar"]) == (100.0, 100.0)
+
+    stats = client.get("/dashboard/stats", params={"as_of": str(NIGHT)}).json()
+    assert (stats["revenue"], stats["rooms_sold"], stats["occupancy"], stats["adr"]) == (300.0, 1, 100.0, 100.0)
@@ -0,0 +1,39 @@
+"""/metrics etiqueta las peticiones con la plantilla de ruta, nunca con el path real."""
+from uuid import uuid4
+
+import pytest
+
+from utils.request_metrics import request_metrics
+
+
+@pytest.fixture
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(request_metrics, "_routes", {})
+    return request_metrics
+
+
+def _samples(body: str, name: str) -> dict:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in body.splitlines()
+        if line.startswith(name + "{")
+    }
+
+
+def test_requests_are_labelled_by_route_template(client, fresh_metrics, admin_headers):
+    guest_ids = [uuid4() for _ in range(3)]
+    for guest_id in guest_ids:
+        assert client.get(f"/guests/{guest_id}", headers=admin_headers).status_code == 404
+    assert client.get(f"/no-such-page/{uuid4()}").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    totals = _samples(response.text, "http_requests_total")
+    assert totals['http_requests_total{method="GET",route="/guests/{guest_id}",status="4xx"}'] == 3
+    assert totals['http_requests_total{method="GET",route="unmatched",status="4xx"}'] == 1
+    assert not any(str(guest_id) in response.text for guest_id in guest_ids)
+
+    counts = _samples(response.text, "http_request_duration_seconds_count")
+    assert counts['http_request_duration_seconds_count{method="GET",route="/guests/{guest_id}"}'] == 3
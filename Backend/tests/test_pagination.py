@@ -0,0 +1,51 @@
+"""count='estimate' sale del planner tanto por psycopg2 como por asyncpg (run_sync)."""
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from models.guest import Guest
+from models.reservation import Reservation, ReservationStatus
+from utils.pagination import count_total
+
+
+@pytest.fixture
+def guests(db):
+    db.add_all(
+        Guest(first_name=f"Estimate{i}", last_name="Test", email=f"estimate{i}@example.com", phone="600000000")
+        for i in range(5)
+    )
+    db.commit()
+    yield
+    db.execute(text("TRUNCATE guests CASCADE"))
+    db.commit()
+
+
+def _filtered_queries(session):
+    # Texto, UUID y enum: parámetros de tipos distintos en el EXPLAIN
+    return [
+        session.query(Guest).filter(Guest.first_name.ilike("Estimate%")),
+        session.query(Reservation).filter(
+            Reservation.status.in_([ReservationStatus.confirmed, ReservationStatus.pending]),
+            Reservation.guest_id == Guest.id,
+        ),
+    ]
+
+
+def test_estimate_uses_the_planner_on_psycopg2(db, guests):
+    for query in _filtered_queries(db):
+        total, source = count_total(query, "estimate")
+        assert source == "estimate" and total >= 0
+
+
+def test_estimate_uses_the_planner_on_asyncpg(async_engine, guests):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async def estimate():
+        async with AsyncSession(async_engine) as session:
+            return await session.run_sync(
+                lambda sync: [count_total(query, "estimate") for query in _filtered_queries(sync)]
+            )
+
+    for total, source in asyncio.run(estimate()):
+        assert source == "estimate" and total >= 0
@@ -0,0 +1,63 @@
+"""El pool de bcrypt rechaza con 503 al llenarse y el login guarda el hash con el coste actual."""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from models.user import User
+from utils.passwords import PasswordHasher, bcrypt_hash, bcrypt_rounds, bcrypt_verify, password_hasher
+
+PASSWORD = "correct horse"
+
+
+def test_saturated_hasher_answers_503():
+    hasher = PasswordHasher(workers=0, max_pending=1)
+
+    async def saturate():
+        slow = asyncio.ensure_future(hasher._run(time.sleep, 0.2))
+        await asyncio.sleep(0.05)   # la primera ya ocupa el único hueco
+        with pytest.raises(HTTPException) as exc:
+            await hasher.verify(PASSWORD, bcrypt_hash(PASSWORD, 4))
+        await slow
+        return exc.value
+
+    error = asyncio.run(saturate())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert (hasher.pending, hasher.rejected) == (0, 1)
+
+
+@pytest.fixture
+def fast_hasher(monkeypatch):
+    # Sin procesos y con costes bajos: el test no mide bcrypt
+    monkeypatch.setattr(password_hasher, "workers", 0)
+    monkeypatch.setattr(password_hasher, "rounds", 5)
+    return password_hasher
+
+
+@pytest.fixture
+def user(db):
+    user = User(name="Rehash", email="rehash@example.com", password_hash=bcrypt_hash(PASSWORD, 4), role="admin")
+    db.add(user)
+    db.commit()
+    yield user
+    db.execute(text("TRUNCATE users CASCADE"))
+    db.commit()
+
+
+def test_login_rehashes_with_the_current_cost(client, db, user, fast_hasher):
+    response = client.post("/login", json={"email": user.email, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+
+    db.refresh(user)
+    assert bcrypt_rounds(user.password_hash) == 5
+    assert bcrypt_verify(PASSWORD, user.password_hash)
+
+
+def test_login_answers_503_when_the_hasher_is_full(client, user, fast_hasher, monkeypatch):
+    monkeypatch.setattr(fast_hasher, "max_pending", 0)
+    response = client.post("/login", json={"email": user.email, "password": PASSWORD})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,36 @@
+"""QuoteBatch parte los lotes más anchos que QUOTE_MAX_WINDOW_DAYS en vez de rechazarlos."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from models.rate import RoomRate
+from models.room import Room
+from utils.quotes import QUOTE_MAX_WINDOW_DAYS, QuoteBatch
+
+
+@pytest.fixture
+def room(db):
+    room = Room(slug="quote-room", name="Quote Room", price_per_night=Decimal("100.00"))
+    db.add(room)
+    db.commit()
+    yield room
+    db.execute(text("TRUNCATE room_rates, rooms CASCADE"))
+    db.commit()
+
+
+def test_far_apart_stays_are_priced_in_separate_windows(db, room):
+    near = date.today() + timedelta(days=1)
+    far  = near + timedelta(days=QUOTE_MAX_WINDOW_DAYS + 30)
+    db.add(RoomRate(room_id=room.id, date=far, rate=Decimal("250.00")))
+    db.commit()
+
+    stays  = [(room.id, far, far + timedelta(days=2)), (room.id, near, near + timedelta(days=2))]
+    quotes = QuoteBatch(db, {room.id: room.price_per_night}, stays)
+
+    assert len(quotes.calendars) == 2
+    assert quotes.pricing(0)["subtotal"] == Decimal("350.00")
+    assert quotes.pricing(1)["subtotal"] == Decimal("200.00")
+    assert quotes.nightly_rates(0) == [25000, 10000]
+    assert quotes.nightly_rates(1) == [10000, 10000]
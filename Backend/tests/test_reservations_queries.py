@@ -0,0 +1,84 @@
+"""GET /reservations lanza siempre el mismo número de consultas, sin N+1 por fila."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, text
+
+from models.guest import Guest
+from models.reservation import Reservation, ReservationStatus
+from models.room import Room
+
+RESERVATIONS = 60
+PAGE_SIZES   = (1, 10, 50)
+
+
+@pytest.fixture
+def reservations(db):
+    rooms = [
+        Room(slug=f"test-room-{i}", name=f"Test Room {i}", price_per_night=Decimal("100.00"))
+        for i in range(3)
+    ]
+    db.add_all(rooms)
+    db.flush()
+    for i in range(RESERVATIONS):
+        guest = Guest(first_name=f"Guest{i}", last_name="Test", email=f"guest{i}@example.com", phone="600000000")
+        db.add(guest)
+        db.flush()
+        check_in = date.today() + timedelta(days=i)
+        db.add(Reservation(
+            guest_id=guest.id,
+            room_id=rooms[i % len(rooms)].id,
+            check_in_date=check_in,
+            check_out_date=check_in + timedelta(days=2),
+            status=ReservationStatus.confirmed,
+            total_amount=Decimal("200.00"),
+        ))
+    db.commit()
+    yield
+    db.execute(text("TRUNCATE reservations, guests, rooms CASCADE"))
+    db.commit()
+
+
+@pytest.fixture
+def count_statements(engine, async_engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # GET /reservations va por la sesión async; se escuchan los dos engines
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    for target in (engine, async_engine.sync_engine):
+        event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+def _statements_for(client, statements, **params) -> tuple[int, dict]:
+    statements.clear()
+    response = client.get("/reservations", params=params)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+
+@pytest.mark.parametrize("include_total", [False, True])
+def test_offset_pages_run_a_fixed_number_of_queries(client, reservations, count_statements, include_total):
+    counts = {}
+    for limit in PAGE_SIZES:
+        # Una vuelta de calentamiento: la estrategia de conteo puede cachear el total
+        _statements_for(client, count_statements, limit=limit, include_total=include_total)
+        counts[limit], body = _statements_for(client, count_statements, limit=limit, include_total=include_total)
+        assert len(body["data"]) == limit
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_cursor_pages_run_a_fixed_number_of_queries(client, reservations, count_statements):
+    counts = {}
+    for limit in PAGE_SIZES:
+        _, first = _statements_for(client, count_statements, limit=limit, include_total=False)
+        counts[limit], body = _statements_for(
+            client, count_statements, limit=limit, cursor=first["next_cursor"], include_total=False,
+        )
+        assert body["data"]
+    assert len(set(counts.values())) == 1, counts
@@ -0,0 +1,123 @@
+"""El trigger de reviews mantiene room_review_stats y rooms.rating aplicando cada cambio como delta."""
+import importlib.util
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from models.guest import Guest
+from models.room import Room
+
+VERSIONS_DIR = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+CREATE_REVIEWS, REVIEW_STATS = "0d5e1a7b3c92_create_reviews_table.py", "f1c8e5a3b742_add_room_review_stats.py"
+
+
+def _migration(filename):
+    spec   = importlib.util.spec_from_file_location(filename[:-3], VERSIONS_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(conn, step):
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    with Operations.context(MigrationContext.configure(conn)):
+        step()
+
+
+@pytest.fixture
+def review_schema(engine):
+    # reviews no es un modelo: se crea con las migraciones y se deshace al terminar
+    from database import Base
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE room_review_stats"))
+        _run(conn, _migration(CREATE_REVIEWS).upgrade)
+        _run(conn, _migration(REVIEW_STATS).upgrade)
+    yield
+    with engine.begin() as conn:
+        _run(conn, _migration(REVIEW_STATS).downgrade)
+        conn.execute(text("DROP TABLE reviews"))
+        Base.metadata.tables["room_review_stats"].create(conn)
+
+
+@pytest.fixture
+def room(db, review_schema):
+    room = Room(slug="review-room", name="Review Room", price_per_night=Decimal("100.00"))
+    guest = Guest(first_name="Ana", last_name="Reviewer", email="reviewer@example.com", phone="600000000")
+    db.add_all([room, guest])
+    db.commit()
+    yield room, guest
+    db.rollback()
+    db.execute(text("TRUNCATE reviews, guests, rooms CASCADE"))
+    db.commit()
+
+
+def _add_review(db, room, guest, overall, verified=True, cleanliness=None, recommend=None):
+    review_id = db.execute(text("""
+        INSERT INTO reviews (room_id, guest_id, rating_overall, rating_cleanliness, would_recommend, verified)
+        VALUES (:room_id, :guest_id, :overall, :cleanliness, :recommend, :verified)
+        RETURNING id
+    """), {
+        "room_id": room.id, "guest_id": guest.id, "overall": overall, "cleanliness": cleanliness,
+        "recommend": recommend, "verified": verified,
+    }).scalar()
+    db.commit()
+    return review_id
+
+
+def _stats(db, room):
+    return db.execute(text("""
+        SELECT st.review_count, st.sum_overall, st.sum_cleanliness, st.count_cleanliness,
+               st.recommend_yes, st.recommend_answered, st.stars_4, st.stars_5,
+               r.rating, r.total_reviews
+        FROM room_review_stats st JOIN rooms r ON r.id = st.room_id
+        WHERE st.room_id = :room_id
+    """), {"room_id": room.id}).one()
+
+
+def test_insert_update_and_delete_apply_deltas(db, room):
+    room, guest = room
+    first = _add_review(db, room, guest, 5, cleanliness=4, recommend=True)
+    _add_review(db, room, guest, 4, recommend=False)
+    _add_review(db, room, guest, 1, verified=False)   # sin verificar no cuenta
+
+    stats = _stats(db, room)
+    assert stats.review_count == 2
+    assert stats.sum_overall == Decimal("9.0")
+    assert (stats.sum_cleanliness, stats.count_cleanliness) == (4, 1)
+    assert (stats.recommend_yes, stats.recommend_answered) == (1, 2)
+    assert (stats.stars_4, stats.stars_5) == (1, 1)
+    assert (stats.rating, stats.total_reviews) == (Decimal("4.5"), 2)
+
+    # Una edición resta la versión vieja y suma la nueva
+    db.execute(text("UPDATE reviews SET rating_overall = 3, rating_cleanliness = NULL WHERE id = :id"), {"id": first})
+    stats = _stats(db, room)
+    assert stats.review_count == 2
+    assert stats.sum_overall == Decimal("7.0")
+    assert (stats.sum_cleanliness, stats.count_cleanliness) == (0, 0)
+    assert (stats.stars_4, stats.stars_5) == (1, 0)
+    assert stats.rating == Decimal("3.5")
+
+    # Dejar de estar verificada y borrarse sacan la review del agregado
+    db.execute(text("UPDATE reviews SET verified = false WHERE id = :id"), {"id": first})
+    assert _stats(db, room).review_count == 1
+    db.execute(text("DELETE FROM reviews WHERE room_id = :room_id"), {"room_id": room.id})
+    stats = _stats(db, room)
+    assert (stats.review_count, stats.sum_overall, stats.recommend_answered) == (0, 0, 0)
+    assert (stats.rating, stats.total_reviews) == (0, 0)
+
+
+def test_endpoint_counts_reviews_without_a_stats_row(client, db, room):
+    room, guest = room
+    _add_review(db, room, guest, 5)
+    db.execute(text("DELETE FROM room_review_stats"))   # como si fueran anteriores al trigger
+    db.commit()
+
+    body = client.get(f"/rooms/{room.id}/reviews").json()
+    assert body["total"] == 1
+    assert body["stats"]["total_reviews"] == 1
+    assert len(body["data"]) == 1
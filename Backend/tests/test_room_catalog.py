@@ -0,0 +1,49 @@
+"""GET /rooms responde 304 con un If-None-Match vigente y cambia de ETag cuando un admin edita habitaciones."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from models.room import Room
+from utils.room_catalog import room_catalog
+
+
+@pytest.fixture
+def room(db):
+    room = Room(slug="catalog-room", name="Catalog Room", price_per_night=Decimal("90.00"))
+    db.add(room)
+    db.commit()
+    room_catalog.bump()   # nada cacheado de otros tests
+    yield room
+    db.execute(text("TRUNCATE rooms CASCADE"))
+    db.commit()
+    room_catalog.bump()
+
+
+def test_etag_round_trip(client, db, room, admin_headers):
+    first = client.get("/rooms")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert [item["slug"] for item in first.json()["data"]] == ["catalog-room"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        cached = client.get("/rooms", headers={"If-None-Match": if_none_match})
+        assert cached.status_code == 304, if_none_match
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+
+    # Otros filtros son otra entrada, con su propio ETag
+    assert client.get("/rooms", params={"max_guests": 9}, headers={"If-None-Match": etag}).status_code == 200
+
+    # Un cambio directo en la BD no se ve hasta que caduca la entrada...
+    room.price_per_night = Decimal("95.00")
+    db.commit()
+    assert client.get("/rooms", headers={"If-None-Match": etag}).status_code == 304
+
+    # ...pero cualquier edición desde /rooms-admin vacía la caché
+    response = client.patch(f"/rooms-admin/{room.id}/status", json={"status": "maintenance"}, headers=admin_headers)
+    assert response.status_code == 200
+    changed = client.get("/rooms", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["data"][0]["price_per_night"] == 95.0
@@ -0,0 +1,267 @@
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import case, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.hold import InventoryHold
+from models.reservation import Reservation
+from models.room import RoomUnit
+from utils.availability_index import INACTIVE_STATUSES, _IntervalBucket, availability_index
+
+# Huecos de menos noches que esto entre dos estancias casi nunca se venden
+ORPHAN_GAP_NIGHTS = 3
+
+
+# ============ ESTRATEGIAS ============
+#
+# Una estrategia recibe las unidades libres para la estancia como tuplas
+# (unit_number, status, gap_before, gap_after), en orden de unit_number, y
+# devuelve la elegida. gap_before / gap_after son las noches libres que
+# quedarían pegadas a la estancia en esa unidad (None = ninguna reserva por
+# ese lado). check_in, check_out y today son ordinales (date.toordinal()).
+
+class FirstAvailableStrategy:
+    """La primera unidad con estado 'available' por número; si no hay, la primera libre."""
+    name = "first_available"
+
+    def choose(self, candidates: list[tuple], check_in: int, check_out: int, today: int) -> str:
+        for number, status, _, _ in candidates:
+            if status == "available":
+                return number
+        return candidates[0][0]
+
+
+class BestFitStrategy:
+    """
+    Best-fit sobre los huecos: mete la estancia en la unidad donde encaja
+    más justa. En orden:
+      1. para entradas de hoy, unidades con estado 'available' primero (como
+         FirstAvailableStrategy): el huésped no espera a que se limpie
+      2. el menor hueco pegado a una estancia existente (0 = contigua), así
+         las reservas se agrupan en vez de dejar noches sueltas repartidas
+      3. el hueco libre más pequeño que la contiene (los lados abiertos cuentan
+         como infinitos), así los huecos grandes quedan para estancias largas
+
+    Evitar a toda costa huecos cortos (1-2 noches) vende menos: aparta las
+    estancias a unidades vacías y fragmenta esas. Ver scripts/benchmark_assignment.py.
+    """
+    name = "best_fit"
+
+    def score(self, candidate: tuple, check_in: int, check_out: int, today: int) -> tuple:
+        _, status, before, after = candidate
+        before    = float("inf") if before is None else before
+        after     = float("inf") if after is None else after
+        not_ready = check_in <= today and status != "available"
+        return (not_ready, min(before, after), before + after)
+
+    def choose(self, candidates: list[tuple], check_in: int, check_out: int, today: int) -> str:
+        return min(candidates, key=lambda c: self.score(c, check_in, check_out, today))[0]
+
+
+ASSIGNMENT_STRATEGIES = {
+    FirstAvailableStrategy.name: FirstAvailableStrategy,
+    BestFitStrategy.name:        BestFitStrategy,
+}
+
+
+def get_strategy(name: str):
+    if name not in ASSIGNMENT_STRATEGIES:
+        raise ValueError(
+            f"ASSIGNMENT_STRATEGY desconocida: '{name}'. Opciones: {sorted(ASSIGNMENT_STRATEGIES)}"
+        )
+    return ASSIGNMENT_STRATEGIES[name]()
+
+
+assignment_strategy = get_strategy(settings.ASSIGNMENT_STRATEGY)
+
+
+def unit_candidates(buckets: dict, units: list[tuple[str, str]], check_in: int, check_out: int, exclude_id=None) -> list[tuple]:
+    """Candidatos (unit_number, status, gap_before, gap_after) libres para [check_in, check_out)."""
+    candidates = []
+    for number, status in units:
+        bucket = buckets.get(number)
+        if bucket is None:
+            candidates.append((number, status, None, None))
+            continue
+        if bucket.overlaps(check_in, check_out, exclude_id):
+            continue
+        prev_end, next_start = bucket.neighbors(check_in, check_out, exclude_id)
+        candidates.append((
+            number,
+            status,
+            check_in - prev_end if prev_end is not None else None,
+            next_start - check_out if next_start is not None else None,
+        ))
+    return candidates
+
+
+# ============ REOPTIMIZACIÓN ============
+
+def plan_assignments(
+    units: list[tuple[str, str]],
+    fixed: list[tuple],
+    movable: list[tuple],
+    strategy=None,
+    today: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    Reparte de nuevo las estancias 'movable' entre las unidades.
+
+    fixed / movable: tuplas (reservation_id, unit_number, check_in, check_out)
+    con fechas en ordinal; las fijas conservan su unidad. Se asignan por orden
+    de entrada (coloreado voraz de intervalos: nunca necesita más unidades que
+    el máximo de estancias simultáneas) y la estrategia elige entre las libres.
+    Las unidades en mantenimiento no reciben estancias nuevas.
+
+    Devuelve {reservation_id: unit_number}, o None si alguna no cabe.
+    """
+    strategy = strategy or assignment_strategy
+    today    = today if today is not None else date.today().toordinal()
+    usable   = [(number, status) for number, status in units if status != "maintenance"]
+    buckets  = {number: _IntervalBucket() for number, _ in units}
+    for rid, number, check_in, check_out in fixed:
+        if number in buckets:
+            buckets[number].add(check_in, check_out, rid)
+
+    plan = {}
+    for rid, _, check_in, check_out in sorted(movable, key=lambda s: (s[2], -s[3])):
+        candidates = unit_candidates(buckets, usable, check_in, check_out)
+        if not candidates:
+            return None
+        number = strategy.choose(candidates, check_in, check_out, today)
+        buckets[number].add(check_in, check_out, rid)
+        plan[rid] = number
+    return plan
+
+
+def fragmentation(stays: list[tuple], today: int, orphan_gap_nights: int = ORPHAN_GAP_NIGHTS) -> dict:
+    """
+    Huecos cortos (< orphan_gap_nights) entre estancias consecutivas de una
+    misma unidad, y cuántas unidades tienen alguna estancia futura.
+    """
+    by_unit = {}
+    for _, number, check_in, check_out in stays:
+        if number:
+            by_unit.setdefault(number, []).append((check_in, check_out))
+
+    orphan_gaps, orphan_nights = 0, 0
+    for intervals in by_unit.values():
+        intervals.sort()
+        prev_end = None
+        for check_in, check_out in intervals:
+            if prev_end is not None and check_in >= today:
+                gap = check_in - prev_end
+                if 0 < gap < orphan_gap_nights:
+                    orphan_gaps   += 1
+                    orphan_nights += gap
+            prev_end = check_out if prev_end is None else max(prev_end, check_out)
+    return {"orphan_gaps": orphan_gaps, "orphan_nights": orphan_nights, "units_used": len(by_unit)}
+
+
+def reoptimize_room(db: Session, room_id, apply: bool = False, strategy=None) -> dict:
+    """
+    Recalcula las unidades de las estancias futuras (entrada después de hoy,
+    asignadas o sin unidad) de un tipo de habitación para reducir huecos.
+    Las estancias ya empezadas no se mueven, y los holds vigentes cuentan
+    como estancias fijas de su unidad: ninguna reserva se mueve encima de
+    un hold. Con apply=False solo informa. No cambia el estado de las unidades.
+
+    Con apply=True las reservas se leen con SELECT ... FOR UPDATE, así que
+    nadie las modifica mientras se reparten. Una reserva o un hold nuevo que
+    ocupe una unidad de destino entre tanto lo rechazan la exclusion
+    constraint o el trigger de holds: se deshace todo (también los números
+    provisionales) y se responde 409.
+    """
+    today = date.today()
+    units = [
+        (number, status)
+        for number, status in db.query(RoomUnit.unit_number, RoomUnit.status)
+        .filter(RoomUnit.room_id == room_id)
+        .order_by(RoomUnit.unit_number.asc())
+        .all()
+    ]
+    query = (
+        db.query(
+            Reservation.id, Reservation.room_number, Reservation.check_in_date, Reservation.check_out_date,
+        )
+        .filter(
+            Reservation.room_id == room_id,
+            Reservation.status.notin_(INACTIVE_STATUSES),
+            Reservation.check_out_date > today,
+        )
+    )
+    if apply:
+        query = query.with_for_update(of=Reservation)
+    stays = [
+        (rid, number, check_in.toordinal(), check_out.toordinal())
+        for rid, number, check_in, check_out in query.all()
+    ]
+    holds = [
+        (token, number, check_in.toordinal(), check_out.toordinal())
+        for token, number, check_in, check_out in db.query(
+            InventoryHold.token, InventoryHold.room_number,
+            InventoryHold.check_in_date, InventoryHold.check_out_date,
+        )
+        .filter(
+            InventoryHold.room_id == room_id,
+            InventoryHold.room_number.isnot(None),
+            InventoryHold.expires_at > datetime.now(),
+            InventoryHold.check_out_date > today,
+        )
+        .all()
+    ]
+    result = {"room_id": str(room_id), "applied": False, "moves": []}
+    if not units:
+        return {**result, "feasible": True}
+
+    fixed   = [stay for stay in stays if stay[2] <= today.toordinal()]
+    movable = [stay for stay in stays if stay[2] > today.toordinal()]
+    plan    = plan_assignments(units, fixed + holds, movable, strategy, today.toordinal())
+    if plan is None:
+        return {**result, "feasible": False}
+
+    current = {rid: number for rid, number, _, _ in movable}
+    moves   = [
+        {"reservation_id": str(rid), "from": current[rid], "to": number}
+        for rid, number in plan.items() if current[rid] != number
+    ]
+    result.update(
+        feasible=True,
+        moves=moves,
+        before=fragmentation(stays, today.toordinal()),
+        after=fragmentation(
+            fixed + [(rid, plan[rid], check_in, check_out) for rid, _, check_in, check_out in movable],
+            today.toordinal(),
+        ),
+    )
+
+    if apply and moves:
+        moved = [rid for rid in plan if current[rid] != plan[rid]]
+        # Dos pasos: primero números provisionales únicos, para que los
+        # intercambios entre unidades no choquen con reservations_no_double_booking
+        try:
+            for values in (
+                {rid: f"~{i}" for i, rid in enumerate(moved)},
+                {rid: plan[rid] for rid in moved},
+            ):
+                db.execute(
+                    update(Reservation)
+                    .where(Reservation.id.in_(moved))
+                    .values(room_number=case(values, value=Reservation.id))
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            availability_index.invalidate(room_id)
+            raise HTTPException(
+                status_code=409,
+                detail="Availability changed while reassigning units, please retry"
+            )
+        availability_index.invalidate(room_id)
+        result["applied"] = True
+    return result
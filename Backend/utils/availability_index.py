@@ -0,0 +1,532 @@
+import abc
+import base64
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.reservation import Reservation, ReservationStatus
+from models.room import RoomUnit
+
+INACTIVE_STATUSES = (ReservationStatus.cancelled, ReservationStatus.checked_out)
+
+
+def _room_key(room_id) -> uuid.UUID:
+    return room_id if isinstance(room_id, uuid.UUID) else uuid.UUID(str(room_id))
+
+
+def _interval_mask(start: int, end: int, origin: int, days: int) -> int:
+    """Bits de las noches [start, end) dentro de la ventana [origin, origin + days)."""
+    lo, hi = max(start, origin), min(end, origin + days)
+    if hi <= lo:
+        return 0
+    return ((1 << (hi - lo)) - 1) << (lo - origin)
+
+
+def _encode_bitmap(bits: int, days: int) -> str:
+    """Bitmap en base64; bit i (LSB primero dentro de cada byte) = día origin + i."""
+    return base64.b64encode(bits.to_bytes((days + 7) // 8, "little")).decode("ascii")
+
+
+class _IntervalBucket:
+    """
+    Intervalos [check_in, check_out) ordenados por fecha de entrada.
+
+    'max_ends' guarda el máximo acumulado de las salidas, así una consulta de
+    solapamiento es un bisect más un recorrido que se corta en cuanto ningún
+    intervalo anterior puede llegar hasta la fecha consultada.
+    """
+    __slots__ = ("starts", "ends", "ids", "max_ends")
+
+    def __init__(self):
+        self.starts   = []
+        self.ends     = []
+        self.ids      = []
+        self.max_ends = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rebuild_from(self, index: int):
+        running = self.max_ends[index - 1] if index > 0 else 0
+        for i in range(index, len(self.ends)):
+            running = max(running, self.ends[i])
+            self.max_ends[i] = running
+
+    def add(self, start: int, end: int, reservation_id):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, reservation_id)
+        self.max_ends.insert(i, 0)
+        self._rebuild_from(i)
+
+    def mask(self, origin: int, days: int) -> int:
+        bits = 0
+        for i in range(bisect_left(self.starts, origin + days)):
+            if self.ends[i] > origin:
+                bits |= _interval_mask(self.starts[i], self.ends[i], origin, days)
+        return bits
+
+    def remove(self, start: int, reservation_id) -> bool:
+        i = bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.ids[i] == reservation_id:
+                for column in (self.starts, self.ends, self.ids, self.max_ends):
+                    del column[i]
+                if i < len(self.ids):
+                    self._rebuild_from(i)
+                return True
+            i += 1
+        return False
+
+    def overlaps(self, start: int, end: int, exclude_id=None) -> bool:
+        i = bisect_left(self.starts, end) - 1   # candidatos: entran antes de que salga la nueva
+        while i >= 0 and self.max_ends[i] > start:
+            if self.ends[i] > start and self.ids[i] != exclude_id:
+                return True
+            i -= 1
+        return False
+
+    def neighbors(self, start: int, end: int, exclude_id=None) -> tuple[Optional[int], Optional[int]]:
+        """
+        (salida más tardía antes de start, primera entrada desde end) para un
+        hueco [start, end) libre; None si no hay estancia por ese lado.
+        """
+        prev_end = None
+        i = bisect_left(self.starts, start) - 1
+        while i >= 0 and (prev_end is None or self.max_ends[i] > prev_end):
+            if self.ids[i] != exclude_id and (prev_end is None or self.ends[i] > prev_end):
+                prev_end = self.ends[i]
+            i -= 1
+
+        j = bisect_left(self.starts, end)
+        while j < len(self.ids) and self.ids[j] == exclude_id:
+            j += 1
+        next_start = self.starts[j] if j < len(self.ids) else None
+        return prev_end, next_start
+
+    def peak(self, start: int, end: int, exclude_id=None) -> int:
+        """Máximo de intervalos simultáneos en alguna noche de [start, end)."""
+        events = []
+        i = bisect_left(self.starts, end) - 1
+        while i >= 0 and self.max_ends[i] > start:
+            if self.ends[i] > start and self.ids[i] != exclude_id:
+                events.append((max(self.starts[i], start), 1))
+                events.append((min(self.ends[i], end), -1))
+            i -= 1
+        peak = current = 0
+        for _, delta in sorted(events):     # a igual noche, las salidas (-1) primero
+            current += delta
+            peak     = max(peak, current)
+        return peak
+
+    def counts(self, origin: int, days: int) -> list[int]:
+        """Intervalos que ocupan cada noche de [origin, origin + days)."""
+        diff = [0] * (days + 1)
+        for i in range(bisect_left(self.starts, origin + days)):
+            lo, hi = max(self.starts[i], origin), min(self.ends[i], origin + days)
+            if hi > lo:
+                diff[lo - origin] += 1
+                diff[hi - origin] -= 1
+        counts, running = [], 0
+        for delta in diff[:-1]:
+            running += delta
+            counts.append(running)
+        return counts
+
+
+class _RoomEntry:
+    """
+    Reservas activas e inventario de unidades de un tipo de habitación.
+
+    Además de los intervalos mantiene un bitmap de ocupación por noche
+    (un int de Python) para cada unidad y para el tipo completo, sobre la
+    ventana [origin, origin + horizon_days) que empieza el día de la carga.
+
+    Las reservas sin unidad (room_number NULL, anteriores a la asignación
+    automática) no ocupan ninguna unidad concreta pero sí consumen
+    capacidad del tipo: van aparte en 'unassigned'.
+    """
+
+    def __init__(self, units: list[tuple[str, str]], origin: int, horizon_days: int):
+        self.units        = units                 # [(unit_number, status)] ordenadas
+        self.room_bucket  = _IntervalBucket()     # todas las reservas activas del tipo
+        self.unit_buckets = {}                    # unit_number -> _IntervalBucket
+        self.unassigned   = _IntervalBucket()     # reservas activas sin unidad
+        self.locations    = {}                    # reservation_id -> (unit_number, start, end)
+        self.origin       = origin
+        self.horizon_days = horizon_days
+        self.room_bitmap  = 0
+        self.unit_bitmaps = {}                    # unit_number -> int
+        self.calendar     = None                  # respuesta codificada, se rehace al cambiar
+        self.loaded_at    = time.monotonic()
+
+    def add(self, reservation_id, room_number: Optional[str], start: int, end: int):
+        self.room_bucket.add(start, end, reservation_id)
+        bits = _interval_mask(start, end, self.origin, self.horizon_days)
+        self.room_bitmap |= bits
+        if room_number:
+            self.unit_buckets.setdefault(room_number, _IntervalBucket()).add(start, end, reservation_id)
+            self.unit_bitmaps[room_number] = self.unit_bitmaps.get(room_number, 0) | bits
+        else:
+            self.unassigned.add(start, end, reservation_id)
+        self.locations[reservation_id] = (room_number, start, end)
+        self.calendar = None
+
+    def discard(self, reservation_id):
+        location = self.locations.pop(reservation_id, None)
+        if location is None:
+            return
+        room_number, start, _ = location
+        self.room_bucket.remove(start, reservation_id)
+        # Los bits no se pueden "restar" si hay solapes, se recalculan desde los intervalos
+        self.room_bitmap = self.room_bucket.mask(self.origin, self.horizon_days)
+        if room_number and room_number in self.unit_buckets:
+            bucket = self.unit_buckets[room_number]
+            bucket.remove(start, reservation_id)
+            self.unit_bitmaps[room_number] = bucket.mask(self.origin, self.horizon_days)
+        elif not room_number:
+            self.unassigned.remove(start, reservation_id)
+        self.calendar = None
+
+    def build_calendar(self) -> dict:
+        if self.calendar is not None:
+            return self.calendar
+        days = self.horizon_days
+        full = (1 << days) - 1
+        if self.units:
+            usable   = [number for number, status in self.units if status != "maintenance"]
+            all_busy = full
+            for number in usable:
+                all_busy &= self.unit_bitmaps.get(number, 0)
+            any_free = (~all_busy & full) if usable else 0
+            if len(self.unassigned) and any_free:
+                # Noche libre solo si quedan más unidades libres que reservas sin unidad
+                unassigned = self.unassigned.counts(self.origin, days)
+                bitmaps    = [self.unit_bitmaps.get(number, 0) for number in usable]
+                for night, waiting in enumerate(unassigned):
+                    if waiting and any_free >> night & 1:
+                        free_units = sum(1 for bits in bitmaps if not bits >> night & 1)
+                        if free_units <= waiting:
+                            any_free &= ~(1 << night)
+        else:
+            any_free = ~self.room_bitmap & full
+        self.calendar = {
+            "start":         date.fromordinal(self.origin).isoformat(),
+            "days":          days,
+            "encoding":      "base64-lsb",
+            "units":         {
+                number: _encode_bitmap(self.unit_bitmaps.get(number, 0), days)
+                for number, _ in self.units
+            },
+            "occupied":      _encode_bitmap(self.room_bitmap, days),
+            "any_unit_free": _encode_bitmap(any_free, days),
+        }
+        return self.calendar
+
+    def diff(self, other: "_RoomEntry") -> dict:
+        issues = {}
+        if self.units != other.units:
+            issues["units"] = {"cached": self.units, "database": other.units}
+        missing    = other.locations.keys() - self.locations.keys()
+        unexpected = self.locations.keys() - other.locations.keys()
+        changed    = [
+            rid for rid in self.locations.keys() & other.locations.keys()
+            if self.locations[rid] != other.locations[rid]
+        ]
+        if missing:
+            issues["missing_reservations"] = sorted(str(rid) for rid in missing)
+        if unexpected:
+            issues["unexpected_reservations"] = sorted(str(rid) for rid in unexpected)
+        if changed:
+            issues["changed_reservations"] = sorted(str(rid) for rid in changed)
+        return issues
+
+
+def _load_rooms(db: Session, keys: set, horizon_days: int) -> dict:
+    """Carga unidades y reservas activas de varias habitaciones con dos consultas."""
+    origin  = date.today().toordinal()
+    units   = {key: [] for key in keys}
+    for room_id, number, status in (
+        db.query(RoomUnit.room_id, RoomUnit.unit_number, RoomUnit.status)
+        .filter(RoomUnit.room_id.in_(keys))
+        .order_by(RoomUnit.room_id, RoomUnit.unit_number.asc())
+        .all()
+    ):
+        units[room_id].append((number, status))
+    entries = {
+        key: _RoomEntry(units[key], origin=origin, horizon_days=horizon_days)
+        for key in keys
+    }
+
+    active = (
+        db.query(
+            Reservation.room_id, Reservation.id, Reservation.check_in_date,
+            Reservation.check_out_date, Reservation.room_number,
+        )
+        .filter(
+            Reservation.room_id.in_(keys),
+            Reservation.status.notin_(INACTIVE_STATUSES),
+        )
+        .all()
+    )
+    for room_id, rid, check_in, check_out, room_number in active:
+        entries[room_id].add(rid, room_number, check_in.toordinal(), check_out.toordinal())
+    return entries
+
+
+class _AvailabilityView(abc.ABC):
+    """Consultas comunes sobre _RoomEntry; las subclases definen _entry() y _lock."""
+
+    @abc.abstractmethod
+    def _entry(self, db: Session, room_id) -> _RoomEntry:
+        """_RoomEntry de la habitación, cargándola si hace falta."""
+
+    def units(self, db: Session, room_id) -> list[tuple[str, str]]:
+        entry = self._entry(db, room_id)
+        with self._lock:
+            return list(entry.units)
+
+    def has_overlap(
+        self,
+        db: Session,
+        room_id,
+        check_in_date: date,
+        check_out_date: date,
+        exclude_reservation_id=None,
+    ) -> bool:
+        entry = self._entry(db, room_id)
+        with self._lock:
+            return entry.room_bucket.overlaps(
+                check_in_date.toordinal(), check_out_date.toordinal(), exclude_reservation_id
+            )
+
+    def booked_units(
+        self,
+        db: Session,
+        room_id,
+        check_in_date: date,
+        check_out_date: date,
+        exclude_reservation_id=None,
+    ) -> set[str]:
+        entry = self._entry(db, room_id)
+        start, end = check_in_date.toordinal(), check_out_date.toordinal()
+        with self._lock:
+            return {
+                number for number, bucket in entry.unit_buckets.items()
+                if bucket.overlaps(start, end, exclude_reservation_id)
+            }
+
+    def unassigned_peak(
+        self,
+        db: Session,
+        room_id,
+        check_in_date: date,
+        check_out_date: date,
+        exclude_reservation_id=None,
+    ) -> int:
+        """Máximo de reservas activas sin unidad que coinciden alguna noche de la estancia."""
+        entry = self._entry(db, room_id)
+        with self._lock:
+            return entry.unassigned.peak(
+                check_in_date.toordinal(), check_out_date.toordinal(), exclude_reservation_id
+            )
+
+    def unit_gaps(
+        self,
+        db: Session,
+        room_id,
+        check_in_date: date,
+        check_out_date: date,
+        unit_numbers,
+        exclude_reservation_id=None,
+    ) -> dict[str, tuple[Optional[int], Optional[int]]]:
+        """
+        Noches libres que quedarían antes y después de la estancia en cada
+        unidad (libre) de unit_numbers; None si no hay reserva por ese lado.
+        """
+        entry = self._entry(db, room_id)
+        start, end = check_in_date.toordinal(), check_out_date.toordinal()
+        gaps = {}
+        with self._lock:
+            for number in unit_numbers:
+                bucket = entry.unit_buckets.get(number)
+                prev_end, next_start = (
+                    bucket.neighbors(start, end, exclude_reservation_id) if bucket else (None, None)
+                )
+                gaps[number] = (
+                    start - prev_end if prev_end is not None else None,
+                    next_start - end if next_start is not None else None,
+                )
+        return gaps
+
+    def calendar(self, db: Session, room_id) -> dict:
+        """
+        Ocupación diaria codificada desde hoy: un bitmap por unidad ('units',
+        1 = ocupada), el del tipo completo ('occupied') y 'any_unit_free'
+        (1 = queda al menos una unidad no en mantenimiento libre esa noche,
+        descontando las reservas sin unidad).
+        """
+        entry = self._entry(db, room_id)
+        with self._lock:
+            return entry.build_calendar()
+
+
+class AvailabilitySnapshot(_AvailabilityView):
+    """
+    Copia privada de varias habitaciones, cargada de una vez y no compartida.
+    Sirve para asignar muchas reservas seguidas (importaciones masivas):
+    add() marca cada asignación en la copia para que la siguiente la vea.
+    """
+
+    def __init__(self, db: Session, room_ids, horizon_days: int = 365):
+        self._lock  = threading.RLock()
+        self._rooms = _load_rooms(db, {_room_key(r) for r in room_ids}, horizon_days)
+
+    def _entry(self, db: Session, room_id) -> _RoomEntry:
+        return self._rooms[_room_key(room_id)]
+
+    def add(self, room_id, reservation_id, room_number: Optional[str], check_in_date: date, check_out_date: date):
+        with self._lock:
+            self._rooms[_room_key(room_id)].add(
+                reservation_id, room_number, check_in_date.toordinal(), check_out_date.toordinal()
+            )
+
+
+class AvailabilityIndex(_AvailabilityView):
+    """
+    Índice en memoria de ocupación por tipo de habitación y por unidad.
+
+    Cada habitación se carga desde la BD la primera vez que se consulta y
+    luego se mantiene con apply_reservation() tras cada commit. Pasado
+    'ttl_seconds' se recarga para recoger escrituras de otros workers.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, horizon_days: int = 365):
+        self.ttl_seconds  = ttl_seconds
+        self.horizon_days = horizon_days
+        self._rooms      = {}
+        self._versions   = {}
+        self._lock       = threading.RLock()
+
+    # ── Carga ────────────────────────────────────────────────────────────────
+
+    def _load(self, db: Session, key: uuid.UUID) -> _RoomEntry:
+        return _load_rooms(db, {key}, self.horizon_days)[key]
+
+    def _entry(self, db: Session, room_id) -> _RoomEntry:
+        key = _room_key(room_id)
+        with self._lock:
+            entry = self._rooms.get(key)
+            if (
+                entry
+                and time.monotonic() - entry.loaded_at < self.ttl_seconds
+                and entry.origin == date.today().toordinal()
+            ):
+                return entry
+            version = self._versions.get(key, 0)
+
+        entry = self._load(db, key)
+
+        with self._lock:
+            # Si hubo una escritura mientras se cargaba, no se cachea esta copia
+            if self._versions.get(key, 0) == version:
+                self._rooms[key] = entry
+        return entry
+
+    def snapshot(self, db: Session, room_ids) -> AvailabilitySnapshot:
+        return AvailabilitySnapshot(db, room_ids, self.horizon_days)
+
+    # ── Mantenimiento ────────────────────────────────────────────────────────
+
+    def apply_reservation(self, reservation: Reservation):
+        """Refleja en el índice el estado ya confirmado (commit) de una reserva."""
+        self.apply_stay(
+            reservation.room_id, reservation.id, reservation.room_number,
+            reservation.check_in_date, reservation.check_out_date,
+            active=reservation.status not in INACTIVE_STATUSES,
+        )
+
+    def apply_stay(
+        self,
+        room_id,
+        reservation_id,
+        room_number: Optional[str],
+        check_in_date: date,
+        check_out_date: date,
+        active: bool,
+    ):
+        key = _room_key(room_id)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            entry = self._rooms.get(key)
+            if entry is None:
+                return
+            entry.discard(reservation_id)
+            if active:
+                entry.add(reservation_id, room_number, check_in_date.toordinal(), check_out_date.toordinal())
+
+    def set_unit_status(self, room_id, unit_number: str, status: str):
+        with self._lock:
+            entry = self._rooms.get(_room_key(room_id))
+            if entry is None:
+                return
+            entry.units = [
+                (number, status if number == unit_number else current)
+                for number, current in entry.units
+            ]
+            entry.calendar = None
+
+    def invalidate(self, room_id=None):
+        with self._lock:
+            if room_id is None:
+                for key in self._rooms:
+                    self._versions[key] = self._versions.get(key, 0) + 1
+                self._rooms.clear()
+                return
+            key = _room_key(room_id)
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._rooms.pop(key, None)
+
+    def check_consistency(self, db: Session, repair: bool = True) -> list[dict]:
+        """
+        Compara cada habitación cacheada con la BD.
+        Devuelve las diferencias encontradas y, si repair=True, recarga esas habitaciones.
+        """
+        with self._lock:
+            cached = list(self._rooms.items())
+
+        report = []
+        for key, entry in cached:
+            with self._lock:
+                version = self._versions.get(key, 0)
+            fresh = self._load(db, key)
+            with self._lock:
+                if self._versions.get(key, 0) != version:
+                    continue  # cambió durante la comprobación; se revisará en la próxima
+                issues = entry.diff(fresh)
+                if issues:
+                    report.append({"room_id": str(key), **issues})
+                    if repair:
+                        self._rooms[key] = fresh
+        return report
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rooms":        len(self._rooms),
+                "reservations": sum(len(e.locations) for e in self._rooms.values()),
+                "ttl_seconds":  self.ttl_seconds,
+            }
+
+
+availability_index = AvailabilityIndex(
+    ttl_seconds=settings.AVAILABILITY_INDEX_TTL_SECONDS,
+    horizon_days=settings.AVAILABILITY_HORIZON_DAYS,
+)
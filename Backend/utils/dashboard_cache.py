@@ -0,0 +1,84 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from config import settings
+
+DASHBOARD_CACHE_MAX_ENTRIES = 512
+
+
+class CoalescingCache:
+    """
+    Caché con TTL para los endpoints del dashboard, compartida por todas
+    las peticiones del worker.
+
+    Las peticiones concurrentes de la misma clave se agrupan: solo la
+    primera ejecuta compute() y las demás esperan su resultado (un
+    asyncio.Future compartido) en vez de lanzar la misma consulta, también
+    con ttl_seconds=0. Si compute() falla, todas reciben la misma excepción
+    y no se cachea nada; si se cancela la petición que calculaba, las que
+    esperaban vuelven a intentarlo.
+
+    Se usa desde rutas async def: todo ocurre en el event loop, así que no
+    hay locks (un threading.Lock retenido durante el await bloquearía el
+    loop entero).
+    """
+
+    def __init__(self, ttl_seconds: int = 10, max_entries: int = DASHBOARD_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries    = OrderedDict()    # key -> (expira, valor)
+        self._inflight   = {}               # key -> Future del cálculo en curso
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry
+        return None
+
+    async def get_or_compute(self, key, compute):
+        """compute() devuelve un awaitable con el valor."""
+        while True:
+            entry = self._fresh(key)
+            if entry:
+                return entry[1]
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            try:
+                # shield: si se cancela esta petición, el Future sigue para las demás
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # Se canceló la que calculaba: otra vuelta
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()      # ya recuperada: sin aviso si nadie esperaba
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        if self.ttl_seconds > 0:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+dashboard_cache = CoalescingCache(ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS)
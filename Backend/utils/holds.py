@@ -0,0 +1,231 @@
+import heapq
+import secrets
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.hold import InventoryHold
+from utils.availability_index import _IntervalBucket, _room_key
+
+
+class _RoomHolds:
+    """Holds vigentes de un tipo de habitación, con un heap por fecha de caducidad."""
+
+    def __init__(self):
+        self.room_bucket  = _IntervalBucket()     # todos los holds del tipo
+        self.unit_buckets = {}                    # unit_number -> _IntervalBucket
+        self.holds        = {}                    # token -> (unit_number, start, end)
+        self.expiry       = []                    # heap [(expires_at, token)]
+        self.loaded_at    = time.monotonic()
+
+    def add(self, token: str, room_number: Optional[str], start: int, end: int, expires_at: datetime):
+        self.discard(token)
+        self.room_bucket.add(start, end, token)
+        if room_number:
+            self.unit_buckets.setdefault(room_number, _IntervalBucket()).add(start, end, token)
+        self.holds[token] = (room_number, start, end)
+        heapq.heappush(self.expiry, (expires_at, token))
+
+    def discard(self, token: str):
+        location = self.holds.pop(token, None)
+        if location is None:
+            return
+        room_number, start, _ = location
+        self.room_bucket.remove(start, token)
+        if room_number and room_number in self.unit_buckets:
+            self.unit_buckets[room_number].remove(start, token)
+
+    def evict(self, now: datetime):
+        while self.expiry and self.expiry[0][0] <= now:
+            _, token = heapq.heappop(self.expiry)
+            self.discard(token)
+
+
+class HoldRegistry:
+    """
+    Holds de inventario (bloqueos temporales de una unidad) en memoria.
+
+    La tabla inventory_holds es la fuente de verdad compartida por todos los
+    workers (y sus triggers impiden que un hold y una reserva se solapen);
+    aquí se guarda una copia por habitación que se recarga cada
+    'sync_seconds' y de la que se expulsan los holds al caducar. Las rutas
+    que escriben (book_room_unit) fuerzan la recarga con refresh().
+
+    Crear holds no requiere login: cada cliente (IP) puede tener a la vez
+    'max_per_client' holds vigentes, y 'max_per_client_room' de un mismo
+    tipo de habitación, para que nadie bloquee todo el inventario.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 600,
+        sync_seconds: int = 5,
+        max_per_client: int = 5,
+        max_per_client_room: int = 2,
+    ):
+        self.ttl_seconds         = ttl_seconds
+        self.sync_seconds        = sync_seconds
+        self.max_per_client      = max_per_client
+        self.max_per_client_room = max_per_client_room
+        self._rooms              = {}
+        self._versions           = {}
+        self._lock               = threading.RLock()
+
+    # ── Carga ────────────────────────────────────────────────────────────────
+
+    def _load(self, db: Session, key: uuid.UUID) -> _RoomHolds:
+        entry = _RoomHolds()
+        rows = (
+            db.query(
+                InventoryHold.token, InventoryHold.room_number, InventoryHold.check_in_date,
+                InventoryHold.check_out_date, InventoryHold.expires_at,
+            )
+            .filter(InventoryHold.room_id == key, InventoryHold.expires_at > datetime.now())
+            .all()
+        )
+        for token, room_number, check_in, check_out, expires_at in rows:
+            entry.add(token, room_number, check_in.toordinal(), check_out.toordinal(), expires_at)
+        return entry
+
+    def _entry(self, db: Session, room_id, fresh: bool = False) -> _RoomHolds:
+        key = _room_key(room_id)
+        with self._lock:
+            entry = self._rooms.get(key)
+            if entry and not fresh and time.monotonic() - entry.loaded_at < self.sync_seconds:
+                entry.evict(datetime.now())
+                return entry
+            version = self._versions.get(key, 0)
+
+        entry = self._load(db, key)
+
+        with self._lock:
+            if self._versions.get(key, 0) == version:
+                self._rooms[key] = entry
+        return entry
+
+    def refresh(self, db: Session, room_id):
+        self._entry(db, room_id, fresh=True)
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+
+    def is_held(
+        self,
+        db: Session,
+        room_id,
+        check_in_date: date,
+        check_out_date: date,
+        exclude_token: Optional[str] = None,
+    ) -> bool:
+        entry = self._entry(db, room_id)
+        with self._lock:
+            return entry.room_bucket.overlaps(
+                check_in_date.toordinal(), check_out_date.toordinal(), exclude_token
+            )
+
+    def held_units(
+        self,
+        db: Session,
+        room_id,
+        check_in_date: date,
+        check_out_date: date,
+        exclude_token: Optional[str] = None,
+    ) -> set[str]:
+        entry = self._entry(db, room_id)
+        start, end = check_in_date.toordinal(), check_out_date.toordinal()
+        with self._lock:
+            return {
+                number for number, bucket in entry.unit_buckets.items()
+                if bucket.overlaps(start, end, exclude_token)
+            }
+
+    def get(self, db: Session, token: str) -> Optional[InventoryHold]:
+        """Hold vigente con ese token (desde la BD), o None si no existe o caducó."""
+        return (
+            db.query(InventoryHold)
+            .filter(InventoryHold.token == token, InventoryHold.expires_at > datetime.now())
+            .first()
+        )
+
+    # ── Escritura ────────────────────────────────────────────────────────────
+
+    def check_client_quota(self, db: Session, client_ip: str, room_id):
+        """
+        429 si el cliente ya tiene el máximo de holds vigentes (en total o de
+        este tipo de habitación). El advisory lock por cliente dura hasta el
+        commit: dos peticiones simultáneas de la misma IP no pasan las dos.
+        """
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtextextended('hold-client:' || :client_ip, 0))"),
+            {"client_ip": client_ip},
+        )
+        total, same_room = db.query(
+            func.count(InventoryHold.id),
+            func.count(InventoryHold.id).filter(InventoryHold.room_id == room_id),
+        ).filter(
+            InventoryHold.client_ip == client_ip,
+            InventoryHold.expires_at > datetime.now(),
+        ).one()
+        if total >= self.max_per_client or same_room >= self.max_per_client_room:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many active holds, complete or release one first",
+                headers={"Retry-After": str(self.ttl_seconds)},
+            )
+
+    def new_hold(
+        self,
+        room_id,
+        check_in_date: date,
+        check_out_date: date,
+        client_ip: Optional[str] = None,
+    ) -> InventoryHold:
+        return InventoryHold(
+            token=secrets.token_urlsafe(24),
+            room_id=room_id,
+            check_in_date=check_in_date,
+            check_out_date=check_out_date,
+            expires_at=datetime.now() + timedelta(seconds=self.ttl_seconds),
+            client_ip=client_ip,
+        )
+
+    def purge_expired(self, db: Session, room_id):
+        """Borra los holds caducados de la habitación (liberan la exclusion constraint)."""
+        db.query(InventoryHold).filter(
+            InventoryHold.room_id == room_id,
+            InventoryHold.expires_at <= datetime.now(),
+        ).delete(synchronize_session=False)
+
+    def add(self, hold: InventoryHold):
+        """Refleja un hold ya confirmado (commit) en la copia en memoria."""
+        key = _room_key(hold.room_id)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            entry = self._rooms.get(key)
+            if entry is not None:
+                entry.add(
+                    hold.token, hold.room_number, hold.check_in_date.toordinal(),
+                    hold.check_out_date.toordinal(), hold.expires_at,
+                )
+
+    def release(self, room_id, token: str):
+        key = _room_key(room_id)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            entry = self._rooms.get(key)
+            if entry is not None:
+                entry.discard(token)
+
+
+hold_registry = HoldRegistry(
+    ttl_seconds=settings.HOLD_TTL_SECONDS,
+    sync_seconds=settings.HOLD_SYNC_SECONDS,
+    max_per_client=settings.HOLD_MAX_PER_CLIENT,
+    max_per_client_room=settings.HOLD_MAX_PER_CLIENT_ROOM,
+)
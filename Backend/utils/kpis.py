@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Habitaciones vendibles por noche: unidades físicas de los tipos activos
+# (o 'quantity' en los tipos que no tienen unidades dadas de alta)
+CAPACITY_SQL = """
+    SELECT CAST(COALESCE(SUM(COALESCE(u.units, r.quantity, 1)), 0) AS integer) AS rooms
+    FROM rooms r
+    LEFT JOIN (SELECT room_id, COUNT(*) AS units FROM room_units GROUP BY room_id) u
+           ON u.room_id = r.id
+    WHERE r.is_active = true
+"""
+
+# Sumas de daily_kpis k (unido a rooms ro). 'revenue' es el ingreso de todas
+# las habitaciones; ocupación, ADR y RevPAR usan solo las activas, igual que
+# CAPACITY_SQL: desactivar un tipo con reservas no las deja por encima del 100%
+KPI_SUMS_SQL = """
+    COALESCE(SUM(k.revenue), 0)                                AS revenue,
+    COALESCE(SUM(k.rooms_sold) FILTER (WHERE ro.is_active), 0) AS rooms_sold,
+    COALESCE(SUM(k.revenue) FILTER (WHERE ro.is_active), 0)    AS active_revenue
+"""
+
+
+def kpi_metrics(rooms_sold: int, revenue: float, capacity: int) -> dict:
+    """Ocupación (%), ADR y RevPAR a partir de las sumas del rollup (de las habitaciones activas)."""
+    return {
+        "rooms_sold": rooms_sold,
+        "occupancy":  round(rooms_sold / capacity * 100, 1) if capacity else 0.0,
+        "adr":        round(revenue / rooms_sold, 2) if rooms_sold else 0.0,
+        "revpar":     round(revenue / capacity, 2) if capacity else 0.0,
+    }
+
+
+def kpi_series(db: Session, start: date, end: date) -> list[dict]:
+    """
+    Una fila por noche de [start, end], también las noches sin ventas.
+    Lee daily_kpis, así que el coste depende de los días y no de cuántas
+    reservas haya.
+    """
+    rows = db.execute(text(f"""
+        WITH capacity AS ({CAPACITY_SQL})
+        SELECT d::date AS date,
+               {KPI_SUMS_SQL},
+               COALESCE(SUM(k.arrivals), 0) AS arrivals,
+               capacity.rooms               AS capacity
+        FROM generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day') AS d
+        CROSS JOIN capacity
+        LEFT JOIN daily_kpis k ON k.date = d::date
+        LEFT JOIN rooms ro ON ro.id = k.room_id
+        GROUP BY d, capacity.rooms
+        ORDER BY d
+    """), {"start": start, "end": end}).fetchall()
+
+    return [
+        {
+            "date":     row.date,
+            "revenue":  float(row.revenue),
+            "arrivals": row.arrivals,
+            **kpi_metrics(row.rooms_sold, float(row.active_revenue), row.capacity),
+        }
+        for row in rows
+    ]
+
+
+def rebuild_daily_kpis(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """
+    Recalcula daily_kpis para las noches de [start, end) (todas si no se
+    indican) desde reservations. Devuelve las filas escritas.
+    """
+    written = db.execute(
+        text("SELECT daily_kpis_rebuild(CAST(:start AS date), CAST(:end AS date))"),
+        {"start": start, "end": end},
+    ).scalar()
+    db.commit()
+    return written
+
+
+def default_range(days: int, today: Optional[date] = None) -> tuple[date, date]:
+    """Los últimos 'days' días, hoy incluido."""
+    today = today or date.today()
+    return today - timedelta(days=days - 1), today
@@ -0,0 +1,246 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+
+LAST_YEAR_OFFSET = 364          # mismo día de la semana del año anterior
+PICKUP_DAYS      = 7
+HORIZON_DAYS     = 730          # start y end, como mucho a esta distancia de hoy
+MAX_DAYS_BACK    = 365
+MAX_LEAD         = HORIZON_DAYS + MAX_DAYS_BACK     # ancho máximo de la rejilla de antelaciones
+NOT_CANCELLED    = np.iinfo(np.int32).max
+
+
+class SnapshotColumns(NamedTuple):
+    """Una posición por reserva; fechas como ordinal de date (días)."""
+    room:      np.ndarray    # int32, código del tipo de habitación
+    created:   np.ndarray    # int32
+    check_in:  np.ndarray    # int32
+    check_out: np.ndarray    # int32
+    cancelled: np.ndarray    # int32, NOT_CANCELLED si sigue en pie
+    nightly:   np.ndarray    # float64, total_amount / noches
+
+
+def _ordinal(value) -> int:
+    return (value.date() if isinstance(value, datetime) else value).toordinal()
+
+
+class ReservationSnapshot:
+    """
+    Copia en columnas (NumPy) de las reservas para /dashboard/pace.
+
+    La primera petición la carga entera; después, cada 'refresh_seconds'
+    solo se piden las filas con updated_at posterior a la última vista
+    (índice ix_reservations_updated_at) y se sustituyen en su posición.
+    Las reservas borradas no dejan rastro en updated_at, así que cada
+    'full_reload_seconds' se recarga todo.
+
+    No hay fecha de cancelación: para las canceladas se toma updated_at.
+    Se consulta con la sesión async: la carga espera a la BD con un
+    asyncio.Lock para no bloquear el event loop.
+    """
+
+    def __init__(self, refresh_seconds: int = 60, full_reload_seconds: int = 3600):
+        self.refresh_seconds     = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self._columns     = None
+        self._positions   = {}      # reservation id -> posición
+        self._rooms       = {}      # room_id -> código
+        self._watermark   = None    # mayor updated_at cargado
+        self._refreshed   = 0.0
+        self._loaded      = 0.0
+        self._lock        = asyncio.Lock()
+
+    def room_code(self, room_id) -> Optional[int]:
+        return self._rooms.get(room_id)
+
+    async def columns(self, db: AsyncSession) -> SnapshotColumns:
+        now = time.monotonic()
+        if self._columns is not None and now - self._refreshed < self.refresh_seconds:
+            return self._columns
+        async with self._lock:
+            now = time.monotonic()
+            if self._columns is None or now - self._loaded >= self.full_reload_seconds:
+                await self._full_load(db)
+                self._loaded = now
+            elif now - self._refreshed >= self.refresh_seconds:
+                await self._apply_changes(db)
+            self._refreshed = now
+            return self._columns
+
+    def invalidate(self):
+        self._columns = None
+
+    async def _fetch(self, db: AsyncSession, since=None) -> list:
+        where  = "WHERE updated_at >= :since" if since is not None else ""
+        result = await db.execute(text(f"""
+            SELECT id, room_id, created_at, check_in_date, check_out_date,
+                   status, total_amount, updated_at
+            FROM reservations
+            {where}
+        """), {"since": since})
+        return result.fetchall()
+
+    def _encode(self, rows: list) -> SnapshotColumns:
+        n       = len(rows)
+        columns = SnapshotColumns(
+            room=np.empty(n, np.int32), created=np.empty(n, np.int32),
+            check_in=np.empty(n, np.int32), check_out=np.empty(n, np.int32),
+            cancelled=np.empty(n, np.int32), nightly=np.empty(n, np.float64),
+        )
+        for i, row in enumerate(rows):
+            check_in, check_out     = row.check_in_date.toordinal(), row.check_out_date.toordinal()
+            columns.room[i]         = self._rooms.setdefault(row.room_id, len(self._rooms))
+            columns.created[i]      = _ordinal(row.created_at or row.updated_at or row.check_in_date)
+            columns.check_in[i]     = check_in
+            columns.check_out[i]    = check_out
+            cancelled               = getattr(row.status, "value", row.status) == "cancelled"
+            columns.cancelled[i]    = _ordinal(row.updated_at or row.created_at) if cancelled else NOT_CANCELLED
+            columns.nightly[i]      = float(row.total_amount or 0) / max(check_out - check_in, 1)
+            if row.updated_at and (self._watermark is None or row.updated_at > self._watermark):
+                self._watermark = row.updated_at
+        return columns
+
+    async def _full_load(self, db: AsyncSession):
+        self._watermark = None
+        rows            = await self._fetch(db)
+        self._columns   = self._encode(rows)
+        self._positions = {row.id: i for i, row in enumerate(rows)}
+
+    async def _apply_changes(self, db: AsyncSession):
+        rows = await self._fetch(db, since=self._watermark)
+        if not rows:
+            return
+        changed   = self._encode(rows)
+        known     = np.array([self._positions.get(row.id, -1) for row in rows], dtype=np.int64)
+        is_new    = known < 0
+        # Copia y sustitución: quien esté calculando con las columnas
+        # anteriores no ve un estado a medias
+        merged    = []
+        for old, new in zip(self._columns, changed):
+            column = old.copy()
+            column[known[~is_new]] = new[~is_new]
+            merged.append(np.concatenate([column, new[is_new]]))
+        start = len(self._columns.room)
+        for offset, row in enumerate(r for r, fresh in zip(rows, is_new) if fresh):
+            self._positions[row.id] = start + offset
+        self._columns = SnapshotColumns(*merged)
+
+
+def _expand_nights(columns: SnapshotColumns, mask: np.ndarray, first: int, last: int):
+    """(noche, posición de la reserva) de cada noche vendida dentro de [first, last]."""
+    starts = np.maximum(columns.check_in[mask], first)
+    ends   = np.minimum(columns.check_out[mask], last + 1)
+    counts = np.maximum(ends - starts, 0)
+    owners = np.repeat(np.flatnonzero(mask), counts)
+    # Noche k de cada reserva: inicio + (índice global - inicio de su grupo)
+    group_start = np.repeat(np.cumsum(counts) - counts, counts)
+    nights      = np.repeat(starts, counts) + (np.arange(counts.sum()) - group_start)
+    return nights, owners
+
+
+def _books_grid(columns: SnapshotColumns, mask: np.ndarray, first: int, last: int, max_lead: int):
+    """
+    Matrices (noche × antelación) de noches y de ingreso en libros: la celda
+    [d, l] es lo que había reservado para la noche first+d l días antes de
+    esa noche. Una sola pasada: cada noche vendida suma en el tramo de
+    antelaciones en que estuvo viva (desde que se creó hasta que se canceló)
+    con un array de diferencias y un cumsum.
+    """
+    nights, owners = _expand_nights(columns, mask, first, last)
+    booked_lead    = nights - columns.created[owners]                      # creada l días antes
+    cancel_lead    = nights.astype(np.int64) - columns.cancelled[owners]   # cancelada l días antes
+    lo             = np.maximum(cancel_lead + 1, 0)
+    hi             = np.minimum(booked_lead, max_lead)
+    alive          = lo <= hi
+
+    rows  = last - first + 1
+    width = max_lead + 2
+    base  = (nights[alive].astype(np.int64) - first) * width
+    opens, closes = base + lo[alive], base + hi[alive] + 1
+    weights = columns.nightly[owners[alive]]
+
+    def grid(values):
+        diff = np.bincount(opens, weights=values, minlength=rows * width)
+        diff -= np.bincount(closes, weights=values, minlength=rows * width)
+        return np.cumsum(diff.reshape(rows, width), axis=1)[:, :-1]
+
+    return grid(np.ones(alive.sum())), grid(weights)
+
+
+def pace_report(
+    columns: SnapshotColumns, today: date, start: date, end: date,
+    days_back: int, room_code: Optional[int] = None,
+) -> dict:
+    """
+    Ritmo de reservas para las noches [start, end] frente al mismo día de la
+    semana del año anterior visto con la misma antelación (STLY). La ruta
+    valida que start y end queden a HORIZON_DAYS de hoy; aun así la rejilla
+    no pasa de MAX_LEAD antelaciones.
+    """
+    today_n, first_ty, last_ty = today.toordinal(), start.toordinal(), end.toordinal()
+    first = first_ty - LAST_YEAR_OFFSET
+
+    mask = (columns.check_in <= last_ty) & (columns.check_out > first)
+    if room_code is not None:
+        mask &= columns.room == room_code
+
+    # Antelación de hoy respecto a cada noche; las noches ya pasadas se
+    # leen con antelación 0 (lo que terminó vendiéndose)
+    stay_dates = np.arange(first_ty, last_ty + 1)
+    days_out   = stay_dates - today_n
+    lead_now   = np.clip(days_out, 0, HORIZON_DAYS)
+    max_lead   = min(int(lead_now.max()) + max(days_back, PICKUP_DAYS), MAX_LEAD)
+    rooms, revenue = _books_grid(columns, mask, first, last_ty, max_lead)
+
+    ty_rows = stay_dates - first
+    ly_rows = ty_rows - LAST_YEAR_OFFSET
+    pickup  = np.clip(days_out + PICKUP_DAYS, 0, max_lead)
+
+    # Curva del periodo: total en libros hace k días, este año y el anterior
+    leads       = np.clip(days_out[:, None] + np.arange(days_back + 1)[None, :], 0, max_lead)
+    curve_rooms = rooms[ty_rows[:, None], leads].sum(axis=0)
+    curve_stly  = rooms[ly_rows[:, None], leads].sum(axis=0)
+    curve_rev   = revenue[ty_rows[:, None], leads].sum(axis=0)
+    curve_stly_rev = revenue[ly_rows[:, None], leads].sum(axis=0)
+
+    dates = [
+        {
+            "date":              date.fromordinal(int(d)).isoformat(),
+            "otb_rooms":         int(round(rooms[t, l])),
+            "otb_revenue":       round(float(revenue[t, l]), 2),
+            "stly_rooms":        int(round(rooms[y, l])),
+            "stly_revenue":      round(float(revenue[y, l]), 2),
+            "ly_final_rooms":    int(round(rooms[y, 0])),
+            "ly_final_revenue":  round(float(revenue[y, 0]), 2),
+            "pickup_7d":         int(round(rooms[t, l] - rooms[t, p])),
+        }
+        for d, t, y, l, p in zip(stay_dates, ty_rows, ly_rows, lead_now, pickup)
+    ]
+    return {
+        "as_of":      today.isoformat(),
+        "stly_as_of": (today - timedelta(days=LAST_YEAR_OFFSET)).isoformat(),
+        "dates":      dates,
+        "curve": [
+            {
+                "days_ago":     k,
+                "otb_rooms":    int(round(curve_rooms[k])),
+                "stly_rooms":   int(round(curve_stly[k])),
+                "otb_revenue":  round(float(curve_rev[k]), 2),
+                "stly_revenue": round(float(curve_stly_rev[k]), 2),
+            }
+            for k in range(days_back, -1, -1)
+        ],
+    }
+
+
+reservation_snapshot = ReservationSnapshot(
+    refresh_seconds=settings.PACE_SNAPSHOT_REFRESH_SECONDS,
+    full_reload_seconds=settings.PACE_SNAPSHOT_FULL_RELOAD_SECONDS,
+)
@@ -1,20 +1,204 @@
-from typing import TypeVar, Generic, List
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import TypeVar, Generic, List, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
 from pydantic import BaseModel
+from sqlalchemy import bindparam, text, tuple_
+from sqlalchemy.dialects import postgresql
 from math import ceil
 
+from config import settings
+
 T = TypeVar('T')
 
+logger = logging.getLogger(__name__)
+
+# EXPLAIN se compila con parámetros ':nombre' y se ejecuta con text(), así
+# cada driver (psycopg2 o asyncpg por run_sync) pone su propio formato
+_EXPLAIN_DIALECT = postgresql.dialect(paramstyle="named")
+
+CURSOR_SIGNATURE_BYTES = 12
+
+COUNT_STRATEGIES         = ("auto", "exact", "cached", "estimate")
+COUNT_CACHE_MAX_ENTRIES  = 1024
+
+if settings.PAGINATION_COUNT_STRATEGY not in COUNT_STRATEGIES:
+    raise ValueError(
+        f"PAGINATION_COUNT_STRATEGY desconocida: '{settings.PAGINATION_COUNT_STRATEGY}'. "
+        f"Opciones: {list(COUNT_STRATEGIES)}"
+    )
+
 
 class PaginatedResponse(BaseModel, Generic[T]):
     """Respuesta paginada genérica"""
-    total: int
-    page: int
+    total: Optional[int]
+    page: Optional[int]
     limit: int
-    total_pages: int
+    total_pages: Optional[int]
     data: List[T]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    total_is_estimate: bool = False
+    total_source: Optional[str] = None
+
+
+# ============ CURSORES ============
+
+def _sign(payload: bytes) -> bytes:
+    digest = hmac.new(settings.SECRET_KEY.encode(), payload, hashlib.sha256).digest()
+    return digest[:CURSOR_SIGNATURE_BYTES]
+
+
+def encode_cursor(scope: str, sort_value, row_id) -> str:
+    """
+    Cursor opaco y firmado con la clave de orden y el id de la última fila.
+    'scope' identifica el listado para que no se pueda reutilizar en otro.
+    """
+    if isinstance(sort_value, datetime):
+        kind, value = "dt", sort_value.isoformat()
+    elif isinstance(sort_value, date):
+        kind, value = "d", sort_value.isoformat()
+    else:
+        kind, value = "v", sort_value
+    payload = json.dumps([scope, kind, value, str(row_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(_sign(payload) + payload).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, scope: str) -> tuple:
+    """(sort_value, row_id) de un cursor de encode_cursor; 400 si está alterado o es de otro listado."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        signature, payload = raw[:CURSOR_SIGNATURE_BYTES], raw[CURSOR_SIGNATURE_BYTES:]
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError("bad signature")
+        cursor_scope, kind, value, row_id = json.loads(payload)
+        if cursor_scope != scope:
+            raise ValueError("cursor from another listing")
+        if kind == "dt":
+            value = datetime.fromisoformat(value)
+        elif kind == "d":
+            value = date.fromisoformat(value)
+        return value, UUID(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# ============ TOTALES ============
+#
+#   exact    → COUNT(*) en cada petición
+#   cached   → COUNT(*) cacheado 'PAGINATION_COUNT_CACHE_TTL_SECONDS' por
+#              consulta normalizada (SQL compilada + parámetros del filtro)
+#   estimate → filas estimadas por el planner de PostgreSQL: pg_class.reltuples
+#              si la consulta no filtra, EXPLAIN si filtra
+#   auto     → sin filtros: estimate si la tabla supera
+#              PAGINATION_EXACT_COUNT_THRESHOLD filas, si no exact;
+#              con filtros: cached
+
+_count_cache      = OrderedDict()    # key -> (expira, total)
+_count_cache_lock = threading.Lock()
+
+
+def cached_count(key, compute) -> int:
+    now = time.monotonic()
+    with _count_cache_lock:
+        hit = _count_cache.get(key)
+        if hit and hit[0] > now:
+            _count_cache.move_to_end(key)
+            return hit[1]
+
+    total = compute()
+
+    with _count_cache_lock:
+        _count_cache[key] = (now + settings.PAGINATION_COUNT_CACHE_TTL_SECONDS, total)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.popitem(last=False)
+    return total
 
 
-def paginate(query, page: int = 1, limit: int = 20):
+def _query_key(query) -> tuple:
+    compiled = query.order_by(None).statement.compile()
+    return (str(compiled), tuple(sorted((name, repr(value)) for name, value in compiled.params.items())))
+
+
+def _planner_estimate(query) -> Optional[int]:
+    """Filas estimadas por PostgreSQL, o None si no hay estimación (otra BD, tabla sin ANALYZE...)."""
+    session = query.session
+    dialect = session.get_bind().dialect
+    if dialect.name != "postgresql":
+        return None
+    try:
+        # Savepoint: si EXPLAIN falla no deja abortada la transacción de la petición
+        with session.begin_nested():
+            if query.whereclause is None:
+                table = query.column_descriptions[0]["entity"].__table__.name
+                estimate = session.execute(
+                    text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+                    {"table": table},
+                ).scalar()
+            else:
+                compiled = query.order_by(None).statement.compile(
+                    dialect=_EXPLAIN_DIALECT, compile_kwargs={"render_postcompile": True},
+                )
+                binds = compiled.binds
+                plan  = session.execute(
+                    text("EXPLAIN (FORMAT JSON) " + str(compiled)).bindparams(*(
+                        bindparam(name, value, type_=binds[name].type if name in binds else None)
+                        for name, value in compiled.params.items()
+                    ))
+                ).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                estimate = plan[0]["Plan"]["Plan Rows"]
+    except Exception:
+        logger.warning("No se pudo estimar el total con el planner; se cuenta con COUNT(*)", exc_info=True)
+        return None
+    if estimate is None or estimate < 0:   # reltuples = -1: nunca analizada
+        return None
+    return int(estimate)
+
+
+def count_total(query, strategy: Optional[str] = None) -> tuple[int, str]:
+    """(total, fuente) según la estrategia; fuente es 'exact', 'cached' o 'estimate'."""
+    strategy = strategy or settings.PAGINATION_COUNT_STRATEGY
+
+    if strategy == "exact":
+        return query.count(), "exact"
+    if strategy == "cached":
+        return cached_count(_query_key(query), query.count), "cached"
+    if strategy == "estimate":
+        estimate = _planner_estimate(query)
+        return (estimate, "estimate") if estimate is not None else (query.count(), "exact")
+
+    if query.whereclause is None:
+        estimate = _planner_estimate(query)
+        if estimate is not None and estimate >= settings.PAGINATION_EXACT_COUNT_THRESHOLD:
+            return estimate, "estimate"
+        return query.count(), "exact"
+    return cached_count(_query_key(query), query.count), "cached"
+
+
+# ============ PAGINATE ============
+
+def paginate(
+    query,
+    page: int = 1,
+    limit: int = 20,
+    keyset: Optional[tuple] = None,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    count_strategy: Optional[str] = None,
+):
     """
     Función helper para paginar queries de SQLAlchemy
     
@@ -22,6 +206,15 @@ def paginate(query, page: int = 1, limit: int = 20):
         query: SQLAlchemy query object
         page: Número de página (empieza en 1)
         limit: Cantidad de items por página
+        keyset: (columna_orden, columna_id). Ordena por ambas descendente y
+            devuelve 'next_cursor' para pedir la página siguiente por keyset
+        cursor: next_cursor de la página anterior. Sustituye a 'page': la
+            consulta es WHERE (orden, id) < cursor, sin OFFSET, así que
+            cualquier página cuesta lo mismo que la primera
+        include_total: contar el total. Por defecto sí con 'page' y no con
+            'cursor'
+        count_strategy: cómo contarlo (ver TOTALES); por defecto
+            PAGINATION_COUNT_STRATEGY
     
     Returns:
         dict con metadata de paginación y datos
@@ -33,23 +226,60 @@ def paginate(query, page: int = 1, limit: int = 20):
         limit = 20
     if limit > 100:  # Límite máximo para evitar sobrecarga
         limit = 100
-    
+    if include_total is None:
+        include_total = cursor is None
+
     # Contar total de items
-    total = query.count()
-    
-    # Calcular offset
-    offset = (page - 1) * limit
-    
-    # Obtener datos paginados
-    data = query.offset(offset).limit(limit).all()
-    
+    total, total_source = count_total(query, count_strategy) if include_total else (None, None)
+
     # Calcular total de páginas
-    total_pages = ceil(total / limit) if total > 0 else 1
-    
+    total_pages = (ceil(total / limit) if total > 0 else 1) if total is not None else None
+
+    if keyset is None:
+        # Calcular offset
+        offset = (page - 1) * limit
+
+        # Obtener datos paginados
+        data = query.offset(offset).limit(limit).all()
+
+        return {
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "total_pages": total_pages,
+            "data": data,
+            "total_is_estimate": total_source == "estimate",
+            "total_source": total_source,
+        }
+
+    sort_column, id_column = keyset
+    scope = str(sort_column)
+    query = query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, scope)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+        page  = None
+    else:
+        query = query.offset((page - 1) * limit)
+
+    # Una fila de más para saber si hay página siguiente sin contar
+    data     = query.limit(limit + 1).all()
+    has_more = len(data) > limit
+    data     = data[:limit]
+    next_cursor = (
+        encode_cursor(scope, getattr(data[-1], sort_column.key), getattr(data[-1], id_column.key))
+        if has_more else None
+    )
+
     return {
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": total_pages,
-        "data": data
-    }
\ No newline at end of file
+        "data": data,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "total_is_estimate": total_source == "estimate",
+        "total_source": total_source,
+    }
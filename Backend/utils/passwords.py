@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+from fastapi import HTTPException
+
+from config import settings
+
+
+def bcrypt_hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def bcrypt_verify(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def bcrypt_rounds(hashed: str) -> Optional[int]:
+    """Coste guardado en el hash ('$2b$12$...' → 12)."""
+    parts = hashed.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+
+class PasswordHasher:
+    """
+    bcrypt en un pool de procesos propio, para que una ráfaga de logins no
+    se quede con el threadpool ni con la CPU del proceso que sirve el resto
+    de rutas.
+
+    Como mucho 'max_pending' operaciones en curso o en cola por worker: la
+    siguiente recibe un 503 con Retry-After en vez de esperar sin límite.
+    Los procesos se arrancan (spawn) con la primera operación y, si uno
+    muere, el pool se recrea en la siguiente; shutdown() los cierra (lo
+    llama el lifespan de main.py al parar el worker). Con workers=0 se usa
+    el executor por defecto del loop, en el mismo proceso.
+
+    Se llama desde rutas async def: el contador de pendientes solo se toca
+    en el event loop.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, rounds: int = 12):
+        self.workers     = workers
+        self.max_pending = max_pending
+        self.rounds      = rounds
+        self.pending     = 0
+        self.rejected    = 0
+        self._executor   = None
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-ins in progress, please retry in a moment",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        except BrokenProcessPool:
+            self._executor = None
+            raise HTTPException(
+                status_code=503,
+                detail="Sign-in is temporarily unavailable, please retry",
+                headers={"Retry-After": "1"},
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(bcrypt_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(bcrypt_verify, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return bcrypt_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.BCRYPT_ROUNDS,
+)
@@ -0,0 +1,169 @@
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Límites superiores (ms) de los buckets de los histogramas
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_registry = {}      # logging_name del pool -> PoolMetrics
+
+
+class LatencyHistogram:
+    """Histograma de latencias en ms con buckets fijos; lo protege el lock de PoolMetrics."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts  = [0] * (len(buckets) + 1)     # el último es +Inf
+        self.count   = 0
+        self.sum_ms  = 0.0
+        self.max_ms  = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count  += 1
+        self.sum_ms += ms
+        self.max_ms  = max(self.max_ms, ms)
+
+    def quantile(self, q: float):
+        """
+        Percentil estimado desde los buckets, interpolando dentro del bucket
+        como histogram_quantile() de Prometheus. Si cae en +Inf devuelve el
+        último límite finito; sin observaciones, None.
+        """
+        if not self.count:
+            return None
+        rank, cumulative = q * self.count, 0
+        for i, count in enumerate(self.counts[:-1]):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return float(self.buckets[-1])
+
+    def snapshot(self) -> dict:
+        """Cuentas acumuladas por límite ('le'), como los histogramas de Prometheus."""
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count":   self.count,
+            "sum_ms":  round(self.sum_ms, 3),
+            "max_ms":  round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class PoolMetrics:
+    """
+    Instrumentación de un pool de conexiones.
+
+    Conexiones abiertas (y cuánto tarda abrirlas), checkouts, conexiones en
+    uso e invalidaciones salen de PoolEvents. PoolEvents no avisa antes del
+    checkout, así que la espera por una conexión (cola del pool + apertura +
+    pre-ping) y los timeouts los anota InstrumentedQueuePool.connect().
+    """
+
+    def __init__(self, name: str):
+        self.name        = name
+        self.opened      = 0
+        self.checkouts   = 0
+        self.invalidated = 0
+        self.timeouts    = 0
+        self.in_use      = 0
+        self.peak_in_use = 0
+        self.wait_ms     = LatencyHistogram()
+        self.connect_ms  = LatencyHistogram()
+        self._lock       = threading.Lock()
+        _registry[name]  = self
+
+    def attach(self, engine):
+        """engine: Engine síncrono (de un AsyncEngine, su sync_engine)."""
+        event.listen(engine, "do_connect", self._on_do_connect)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    # ── Eventos ──────────────────────────────────────────────────────────────
+
+    def _on_do_connect(self, dialect, connection_record, cargs, cparams):
+        connection_record.info["connect_started"] = time.perf_counter()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop("connect_started", None)
+        with self._lock:
+            self.opened += 1
+            if started is not None:
+                self.connect_ms.observe((time.perf_counter() - started) * 1000)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts  += 1
+            self.in_use     += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidated += 1
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_ms.observe(seconds * 1000)
+            if timed_out:
+                self.timeouts += 1
+
+    # ── Lectura ──────────────────────────────────────────────────────────────
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            return {
+                "pool": {
+                    "size":        pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in":  pool.checkedin(),
+                    "overflow":    max(pool.overflow(), 0),
+                    "timeout_s":   pool.timeout(),
+                },
+                "connections": {
+                    "opened":      self.opened,
+                    "checkouts":   self.checkouts,
+                    "invalidated": self.invalidated,
+                    "timeouts":    self.timeouts,
+                    "peak_in_use": self.peak_in_use,
+                },
+                "wait_ms":    self.wait_ms.snapshot(),
+                "connect_ms": self.connect_ms.snapshot(),
+            }
+
+
+class _TimedConnect:
+    """Mide cuánto tarda connect() en entregar una conexión, incluidos los timeouts."""
+
+    def connect(self):
+        metrics = _registry.get(self.logging_name)
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if metrics:
+                metrics.observe_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if metrics:
+            metrics.observe_wait(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedConnect, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedConnect, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,180 @@
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from models.rate import RoomRate
+
+# Reglas vigentes sobre el subtotal, en milésimas: 10% impuestos + 1.4% servicio
+TAX_PER_MILLE         = 100
+SERVICE_FEE_PER_MILLE = 14
+
+CENT = Decimal("0.01")
+
+# El calendario es denso (habitaciones × noches): estos límites acotan su memoria
+QUOTE_MAX_NIGHTS      = 90
+QUOTE_MAX_WINDOW_DAYS = 731  # ancho máximo de un calendario (QuoteBatch parte los lotes más anchos)
+
+
+def to_cents(amount) -> int:
+    return int(Decimal(str(amount)).quantize(CENT) * 100)
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+
+def _round_half_even(numerator: np.ndarray, denominator: int) -> np.ndarray:
+    """numerator / denominator al entero más cercano, empates al par (igual que round(Decimal, 2))."""
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = 2 * remainder
+    return quotient + ((twice > denominator) | ((twice == denominator) & (quotient % 2 == 1)))
+
+
+def price_breakdown(subtotal_cents: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Impuestos, servicio y total en céntimos a partir de subtotales en céntimos.
+    Cada importe se redondea por separado desde el valor exacto, como hacía
+    calculate_pricing con Decimal, así que el resultado es idéntico al céntimo.
+    """
+    subtotal = np.asarray(subtotal_cents, dtype=np.int64)
+    return {
+        "subtotal":     subtotal,
+        "taxes":        _round_half_even(subtotal * TAX_PER_MILLE, 1000),
+        "service_fee":  _round_half_even(subtotal * SERVICE_FEE_PER_MILLE, 1000),
+        "total_amount": _round_half_even(subtotal * (1000 + TAX_PER_MILLE + SERVICE_FEE_PER_MILLE), 1000),
+    }
+
+
+def check_stay(check_in: date, check_out: date):
+    """422 si la estancia pasa de QUOTE_MAX_NIGHTS; el check_out > check_in lo valida cada ruta."""
+    if (check_out - check_in).days > QUOTE_MAX_NIGHTS:
+        raise HTTPException(status_code=422, detail=f"Stays are limited to {QUOTE_MAX_NIGHTS} nights")
+
+
+class RateCalendar:
+    """
+    Tarifas en céntimos por habitación y noche sobre [start, end), con la suma
+    acumulada de cada fila: el subtotal de una estancia es la resta de dos
+    posiciones, sin recorrer sus noches.
+    """
+
+    def __init__(self, room_ids: list, start: date, rates: np.ndarray):
+        self.room_ids = room_ids
+        self.rows     = {room_id: i for i, room_id in enumerate(room_ids)}
+        self.start    = start
+        self.rates    = rates
+        self.prefix   = np.zeros((len(room_ids), rates.shape[1] + 1), dtype=np.int64)
+        np.cumsum(rates, axis=1, out=self.prefix[:, 1:])
+
+    @classmethod
+    def load(cls, db: Session, base_prices: dict, start: date, end: date) -> "RateCalendar":
+        """
+        Una consulta a room_rates; las noches sin fila usan el precio base de
+        la habitación. 422 si [start, end) pasa de QUOTE_MAX_WINDOW_DAYS.
+        """
+        if (end - start).days > QUOTE_MAX_WINDOW_DAYS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"All stays must fit in a {QUOTE_MAX_WINDOW_DAYS}-day window",
+            )
+        room_ids = list(base_prices)
+        rates    = np.repeat(
+            np.array([to_cents(base_prices[room_id]) for room_id in room_ids], dtype=np.int64)[:, None],
+            (end - start).days,
+            axis=1,
+        )
+        overrides = (
+            db.query(RoomRate.room_id, RoomRate.date, RoomRate.rate)
+            .filter(
+                RoomRate.room_id.in_(room_ids),
+                RoomRate.date >= start,
+                RoomRate.date < end,
+            )
+            .all()
+        )
+        if overrides:
+            calendar_rows = {room_id: i for i, room_id in enumerate(room_ids)}
+            origin = start.toordinal()
+            rows   = np.array([calendar_rows[room_id] for room_id, _, _ in overrides], dtype=np.int64)
+            days   = np.array([night.toordinal() - origin for _, night, _ in overrides], dtype=np.int64)
+            rates[rows, days] = [to_cents(rate) for _, _, rate in overrides]
+        return cls(room_ids, start, rates)
+
+    def subtotals(self, room_ids, check_ins, check_outs) -> np.ndarray:
+        origin = self.start.toordinal()
+        rows   = np.array([self.rows[room_id] for room_id in room_ids], dtype=np.int64)
+        lo     = np.array([d.toordinal() for d in check_ins], dtype=np.int64) - origin
+        hi     = np.array([d.toordinal() for d in check_outs], dtype=np.int64) - origin
+        return self.prefix[rows, hi] - self.prefix[rows, lo]
+
+    def nightly(self, room_id, check_in: date, check_out: date) -> np.ndarray:
+        lo = (check_in - self.start).days
+        return self.rates[self.rows[room_id], lo:lo + (check_out - check_in).days]
+
+
+class QuoteBatch:
+    """
+    Precio de muchas estancias (room_id, check_in, check_out) de una vez.
+
+    base_prices: {room_id: price_per_night} de todas las habitaciones usadas.
+    Todas las estancias deben tener check_out > check_in; una de más de
+    QUOTE_MAX_NIGHTS noches es un 422. Las estancias se agrupan por fecha
+    de entrada en ventanas de hasta QUOTE_MAX_WINDOW_DAYS, con un
+    calendario (y una consulta) por ventana: fechas muy separadas en un
+    mismo lote no fallan ni hacen crecer un único calendario.
+    """
+
+    def __init__(self, db: Session, base_prices: dict, stays: list[tuple]):
+        self.stays     = stays
+        self.calendars = []
+        self.window_of = np.zeros(len(stays), dtype=np.int64)   # estancia -> índice en calendars
+        self.nights    = np.array([(co - ci).days for _, ci, co in stays], dtype=np.int64)
+        subtotals      = np.zeros(len(stays), dtype=np.int64)
+        for _, check_in, check_out in stays:
+            check_stay(check_in, check_out)
+
+        for window in self._windows(stays):
+            room_ids, check_ins, check_outs = zip(*(stays[i] for i in window))
+            calendar = RateCalendar.load(
+                db,
+                {room_id: base_prices[room_id] for room_id in dict.fromkeys(room_ids)},
+                min(check_ins),
+                max(check_outs),
+            )
+            subtotals[window]      = calendar.subtotals(room_ids, check_ins, check_outs)
+            self.window_of[window] = len(self.calendars)
+            self.calendars.append(calendar)
+        self.amounts = price_breakdown(subtotals)
+
+    @staticmethod
+    def _windows(stays: list[tuple]) -> list[list[int]]:
+        """Índices de las estancias agrupados en ventanas [primer check-in, último check-out) de QUOTE_MAX_WINDOW_DAYS."""
+        windows = []
+        start = end = None
+        for i in sorted(range(len(stays)), key=lambda i: stays[i][1]):
+            _, check_in, check_out = stays[i]
+            if windows and (max(end, check_out) - start).days <= QUOTE_MAX_WINDOW_DAYS:
+                windows[-1].append(i)
+                end = max(end, check_out)
+            else:
+                windows.append([i])
+                start, end = check_in, check_out
+        return windows
+
+    def __len__(self):
+        return len(self.stays)
+
+    def pricing(self, i: int) -> dict:
+        """subtotal, taxes, service_fee y total_amount de la estancia i como Decimal con 2 decimales."""
+        return {key: cents_to_decimal(values[i]) for key, values in self.amounts.items()}
+
+    def nightly_rates(self, i: int) -> list[int]:
+        return self.calendars[self.window_of[i]].nightly(*self.stays[i]).tolist()
+
+
+def quote_stay(db: Session, room, check_in: date, check_out: date) -> dict:
+    """Precio de una sola estancia (altas de reservas) con el calendario de tarifas."""
+    return QuoteBatch(db, {room.id: room.price_per_night}, [(room.id, check_in, check_out)]).pricing(0)
@@ -0,0 +1,193 @@
+import time
+
+from utils.pool_metrics import LatencyHistogram
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+QUANTILES       = (0.5, 0.95, 0.99)
+STATUS_CLASSES  = ("1xx", "2xx", "3xx", "4xx", "5xx")
+HTTP_METHODS    = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+UNMATCHED_ROUTE = "unmatched"     # 404 y preflights de CORS: sin ruta, sin el path real
+
+
+class RouteStats:
+    __slots__ = ("statuses", "latency")
+
+    def __init__(self):
+        self.statuses = [0] * len(STATUS_CLASSES)
+        self.latency  = LatencyHistogram()
+
+
+class RequestMetrics:
+    """
+    Peticiones HTTP por (método, plantilla de ruta): cuántas por clase de
+    status e histograma de latencia, más las peticiones en curso.
+
+    La ruta es la plantilla ('/guests/{guest_id}'), no el path, para que los
+    ids no disparen el número de series. Solo lo toca MetricsMiddleware en
+    el event loop, así que no hay lock: una petición cuesta un par de
+    lookups en dicts y un bisect. Los contadores son de este worker y desde
+    que arrancó.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self._routes   = {}     # (método, ruta) -> RouteStats
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key   = (method if method in HTTP_METHODS else "OTHER", route)
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes[key] = RouteStats()
+        stats.statuses[min(max(status // 100, 1), 5) - 1] += 1
+        stats.latency.observe(seconds * 1000)
+
+    def lines(self) -> list[str]:
+        routes = sorted(self._routes.items())
+        lines  = _family(
+            "http_requests_in_flight", "gauge", "Requests being served by this worker.",
+            [({}, self.in_flight)],
+        )
+        lines += _family(
+            "http_requests_total", "counter", "Requests by route template and status class.",
+            [
+                ({"method": method, "route": route, "status": status_class}, count)
+                for (method, route), stats in routes
+                for status_class, count in zip(STATUS_CLASSES, stats.statuses)
+                if count
+            ],
+        )
+        lines += _histogram(
+            "http_request_duration_seconds", "Request latency by route template.",
+            [({"method": method, "route": route}, stats.latency.snapshot()) for (method, route), stats in routes],
+        )
+        lines += _family(
+            "http_request_duration_quantile_seconds", "gauge",
+            "p50/p95/p99 latency by route, estimated from the histogram buckets.",
+            [
+                ({"method": method, "route": route, "quantile": str(q)}, stats.latency.quantile(q) / 1000)
+                for (method, route), stats in routes
+                for q in QUANTILES
+            ],
+        )
+        return lines
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que anota cada petición HTTP en un RequestMetrics.
+
+    La plantilla de ruta la deja el router en scope["route"] al resolverla,
+    así que se lee al terminar. Si la ruta lanza una excepción sin llegar a
+    responder cuenta como 500 y se relanza (uvicorn registra el traceback).
+    Las peticiones con streaming cuentan hasta que se envía el último chunk.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app     = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            metrics.observe(
+                scope["method"], getattr(route, "path", UNMATCHED_ROUTE), status,
+                time.perf_counter() - started,
+            )
+
+
+request_metrics = RequestMetrics()
+
+
+# ── Formato de texto de Prometheus ───────────────────────────────────────────
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _family(name: str, kind: str, help_text: str, samples) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_labels(labels)} {value}" for labels, value in samples]
+    return lines
+
+
+def _histogram(name: str, help_text: str, series) -> list[str]:
+    """series: (labels, LatencyHistogram.snapshot() en ms); se exporta en segundos."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, snapshot in series:
+        for bound, cumulative in snapshot["buckets"].items():
+            le = bound if bound == "+Inf" else f"{float(bound) / 1000:g}"
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum_ms'] / 1000}")
+        lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+    return lines
+
+
+def pool_lines(pools) -> list[str]:
+    """pools: (PoolMetrics, pool de SQLAlchemy) de cada engine."""
+    snapshots = [({"pool": metrics.name}, metrics.snapshot(pool)) for metrics, pool in pools]
+    lines = []
+    for name, kind, section, key, help_text in (
+        ("db_pool_size",                     "gauge",   "pool",        "size",        "Configured pool size."),
+        ("db_pool_checked_out",              "gauge",   "pool",        "checked_out", "Connections in use."),
+        ("db_pool_overflow",                 "gauge",   "pool",        "overflow",    "Connections open beyond pool_size."),
+        ("db_pool_connections_opened_total", "counter", "connections", "opened",      "Connections opened."),
+        ("db_pool_checkouts_total",          "counter", "connections", "checkouts",   "Connection checkouts."),
+        ("db_pool_invalidated_total",        "counter", "connections", "invalidated", "Connections invalidated."),
+        ("db_pool_timeouts_total",           "counter", "connections", "timeouts",    "Checkouts that hit pool_timeout."),
+    ):
+        lines += _family(name, kind, help_text, [(labels, snap[section][key]) for labels, snap in snapshots])
+    lines += _histogram(
+        "db_pool_wait_seconds", "Time to get a connection from the pool.",
+        [(labels, snap["wait_ms"]) for labels, snap in snapshots],
+    )
+    lines += _histogram(
+        "db_pool_connect_seconds", "Time to open a new database connection.",
+        [(labels, snap["connect_ms"]) for labels, snap in snapshots],
+    )
+    return lines
+
+
+def token_cache_lines(stats: dict) -> list[str]:
+    """stats: TokenClaimsCache.stats()."""
+    lines = _family("token_cache_entries", "gauge", "Verified JWTs cached.", [({}, stats["entries"])])
+    for key in ("hits", "misses", "expired"):
+        lines += _family(f"token_cache_{key}_total", "counter", f"Token cache {key}.", [({}, stats[key])])
+    return lines
+
+
+def password_hasher_lines(hasher) -> list[str]:
+    """hasher: PasswordHasher."""
+    return _family(
+        "password_hash_pending", "gauge", "bcrypt operations running or queued.", [({}, hasher.pending)],
+    ) + _family(
+        "password_hash_rejected_total", "counter", "bcrypt operations refused with 503.", [({}, hasher.rejected)],
+    )
+
+
+def render_prometheus(*sections: list[str]) -> str:
+    return "\n".join(line for section in sections for line in section) + "\n"
@@ -0,0 +1,66 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import settings
+
+CATALOG_MAX_ENTRIES = 256
+
+
+class RoomCatalogCache:
+    """
+    Respuestas ya serializadas de GET /rooms, por combinación de filtros.
+
+    Cada entrada guarda el cuerpo JSON y su ETag (hash del cuerpo). Las
+    escrituras de routers/rooms.py llaman a bump(), que sube la versión y
+    vacía la caché; 'ttl_seconds' acota cuánto tarda en verse un cambio
+    hecho desde otro worker.
+    """
+
+    def __init__(self, ttl_seconds: int = 30, max_entries: int = CATALOG_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version     = 0
+        self._entries    = OrderedDict()    # key -> (version, expira, body, etag)
+        self._lock       = threading.Lock()
+
+    def get(self, key) -> tuple[Optional[bytes], Optional[str], int]:
+        """(body, etag, version); body None si no hay entrada vigente."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == self.version and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[2], entry[3], self.version
+            return None, None, self.version
+
+    def put(self, key, body: bytes, version: int) -> str:
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        with self._lock:
+            # Si hubo un bump mientras se consultaba la BD, no se cachea
+            if version == self.version:
+                self._entries[key] = (version, time.monotonic() + self.ttl_seconds, body, etag)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return etag
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara If-None-Match (lista, '*' o ETags débiles W/"...") con el ETag actual."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+room_catalog = RoomCatalogCache(ttl_seconds=settings.ROOM_CATALOG_TTL_SECONDS)
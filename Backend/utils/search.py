@@ -0,0 +1,102 @@
+import re
+
+from sqlalchemy import case, func, literal, literal_column, or_
+from sqlalchemy.orm import Session
+
+from models.guest import Guest
+from models.user import User
+
+# Las expresiones deben coincidir con las de los índices GIN de la migración
+# e4b7d2a91c55 para que PostgreSQL los use (pg_trgm)
+# Entre paréntesis: <% y || tienen la misma precedencia en PostgreSQL
+GUEST_FULL_NAME = (Guest.first_name + literal_column("' '") + Guest.last_name).self_group()
+GUEST_PHONE_DIGITS = func.regexp_replace(Guest.phone, literal_column("'[^0-9]'"), literal_column("''"), literal_column("'g'"))
+GUEST_DOCUMENT = func.upper(Guest.document_number)
+
+MIN_PHONE_DIGITS = 3        # un trigrama; con menos no hay índice que sirva
+TYPEAHEAD_MAX_RESULTS = 20
+
+
+def escape_like(term: str) -> str:
+    """Escapa los comodines de LIKE; usar con escape="\\"."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _guest_conditions(term: str) -> tuple[list, list]:
+    """
+    (filtros, puntuaciones) de una búsqueda de huéspedes.
+
+    Nombre y email: subcadena (ILIKE) o parecido por trigramas (<%), así una
+    errata como "gonzales" sigue encontrando "González". Teléfono: solo
+    dígitos, como subcadena. Documento: prefijo exacto sin distinguir
+    mayúsculas, y puntúa más alto que cualquier parecido de nombre.
+    """
+    like    = f"%{escape_like(term)}%"
+    filters = [
+        GUEST_FULL_NAME.ilike(like, escape="\\"),
+        Guest.email.ilike(like, escape="\\"),
+        literal(term).op("<%")(GUEST_FULL_NAME),
+    ]
+    scores  = [
+        func.word_similarity(term, GUEST_FULL_NAME),
+        func.word_similarity(term, Guest.email),
+    ]
+
+    digits = re.sub(r"\D", "", term)
+    if len(digits) >= MIN_PHONE_DIGITS:
+        phone_match = GUEST_PHONE_DIGITS.like(f"%{digits}%")
+        filters.append(phone_match)
+        scores.append(case((phone_match, 0.9), else_=0.0))
+
+    document = term.strip().upper()
+    if document:
+        document_match = GUEST_DOCUMENT.like(f"{escape_like(document)}%", escape="\\")
+        filters.append(document_match)
+        scores.append(case((GUEST_DOCUMENT == document, 1.0), (document_match, 0.95), else_=0.0))
+
+    return filters, scores
+
+
+def search_guests(query, term: str):
+    """Filtra y ordena por relevancia (mejor coincidencia primero)."""
+    filters, scores = _guest_conditions(term)
+    return query.filter(or_(*filters)).order_by(func.greatest(*scores).desc(), Guest.id)
+
+
+def search_users(query, term: str):
+    like = f"%{escape_like(term)}%"
+    return query.filter(or_(
+        User.name.ilike(like, escape="\\"),
+        User.email.ilike(like, escape="\\"),
+        literal(term).op("<%")(User.name),
+    )).order_by(
+        func.greatest(func.word_similarity(term, User.name), func.word_similarity(term, User.email)).desc(),
+        User.id,
+    )
+
+
+def guest_typeahead(db: Session, term: str, limit: int = 8) -> list[dict]:
+    """Top-k huéspedes para autocompletar: solo las columnas que muestra el desplegable."""
+    filters, scores = _guest_conditions(term)
+    score = func.greatest(*scores).label("score")
+    rows  = (
+        db.query(
+            Guest.id, Guest.first_name, Guest.last_name, Guest.email,
+            Guest.phone, Guest.document_number, score,
+        )
+        .filter(or_(*filters))
+        .order_by(score.desc(), Guest.id)
+        .limit(min(limit, TYPEAHEAD_MAX_RESULTS))
+        .all()
+    )
+    return [
+        {
+            "id": str(r.id),
+            "name": f"{r.first_name} {r.last_name}",
+            "email": r.email,
+            "phone": r.phone,
+            "document_number": r.document_number,
+            "score": round(float(r.score), 3),
+        }
+        for r in rows
+    ]
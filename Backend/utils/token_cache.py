@@ -0,0 +1,122 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import settings
+
+TOKEN_CACHE_MAX_ENTRIES = 4096
+
+
+def _digest(token: str) -> bytes:
+    # No se guarda el token: solo su hash
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class TokenClaimsCache:
+    """
+    Claims ya verificados de cada JWT, para no repetir jwt.decode (HMAC +
+    JSON) en cada petición autenticada. LRU acotada por 'max_entries' cuyas
+    entradas caducan en el 'exp' del token; los tokens sin 'exp' no se
+    cachean.
+
+    invalidate_user() revoca los tokens emitidos hasta ese momento a un
+    usuario: saca sus entradas y rechaza los que tengan 'iat' de ese mismo
+    segundo o anterior (también los que no tengan 'iat'). La revocación
+    vive en memoria de cada worker y se olvida pasados 'token_ttl_seconds'
+    (la vida de un token): para entonces todos los afectados han caducado.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES, token_ttl_seconds: int = 1800):
+        self.max_entries       = max_entries
+        self.token_ttl_seconds = token_ttl_seconds
+        self.hits              = 0
+        self.misses            = 0
+        self.expired           = 0
+        self._entries          = OrderedDict()    # digest -> (exp, claims)
+        self._by_user          = {}               # sub -> set de digests
+        self._revoked_at       = OrderedDict()    # sub -> segundo de la revocación, la más antigua primero
+        self._lock             = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = _digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._discard(key)
+                self.expired += 1
+                self.misses  += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token: str, claims: dict):
+        exp = claims.get("exp")
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+            return
+        key, sub = _digest(token), claims.get("sub")
+        with self._lock:
+            # Revocado mientras se verificaba: no se cachea
+            if self.is_revoked(claims):
+                return
+            self._entries[key] = (exp, claims)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(sub, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: bytes):
+        _, claims = self._entries.pop(key)
+        digests   = self._by_user.get(claims.get("sub"))
+        if digests is not None:
+            digests.discard(key)
+            if not digests:
+                del self._by_user[claims.get("sub")]
+
+    def is_revoked(self, claims: dict) -> bool:
+        revoked_at = self._revoked_at.get(claims.get("sub"))
+        return revoked_at is not None and claims.get("iat", 0) <= revoked_at
+
+    def invalidate_user(self, user_id) -> int:
+        """Revoca los tokens actuales del usuario; devuelve cuántas entradas se sacaron."""
+        sub = str(user_id)
+        with self._lock:
+            now = int(time.time())
+            self._revoked_at[sub] = now
+            self._revoked_at.move_to_end(sub)
+            self._prune_revocations(now)
+            digests = self._by_user.pop(sub, set())
+            for key in digests:
+                self._entries.pop(key, None)
+            return len(digests)
+
+    def _prune_revocations(self, now: int):
+        # Un token revocado tiene iat <= revoked_at, así que caduca antes de revoked_at + ttl
+        while self._revoked_at:
+            sub, revoked_at = next(iter(self._revoked_at.items()))
+            if revoked_at + self.token_ttl_seconds >= now:
+                break
+            del self._revoked_at[sub]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._prune_revocations(int(time.time()))
+            return {
+                "entries":       len(self._entries),
+                "max_entries":   self.max_entries,
+                "hits":          self.hits,
+                "misses":        self.misses,
+                "expired":       self.expired,
+                "revoked_users": len(self._revoked_at),
+            }
+
+
+token_cache = TokenClaimsCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    token_ttl_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
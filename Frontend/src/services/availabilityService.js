@@ -4,3 +4,8 @@ export const fetchRoomAvailability = ({ roomId, checkIn, checkOut }) =>
   api.get(`/rooms/${roomId}/availability`, {
     params: { check_in: checkIn, check_out: checkOut },
   });
+
+export const searchAvailability = ({ checkIn, checkOut, adults = 1, children = 0 }) =>
+  api.get("/availability/search", {
+    params: { check_in: checkIn, check_out: checkOut, adults, children },
+  });